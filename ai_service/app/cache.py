@@ -0,0 +1,114 @@
+"""
+Response cache for the AI endpoints.
+
+Requests are fingerprinted by a canonical hash of their payload (plus a
+time bucket for endpoints whose answer depends on `datetime.now()`).
+Concurrent identical requests are coalesced so only one computes while the
+others wait for its result.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import orjson
+
+from .metrics import CACHE_REQUESTS, record_cache
+
+
+def fingerprint(endpoint: str, payload: Any, bucket_seconds: Optional[int] = None, *extra: Any) -> str:
+    """Canonical hash of an endpoint call; key order in the payload does not matter"""
+    parts = [endpoint, payload, list(extra)]
+    if bucket_seconds:
+        parts.append(int(time.time() // bucket_seconds))
+    canonical = orjson.dumps(parts, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.blake2b(canonical, digest_size=16).hexdigest()
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class ResultCache:
+    """Thread-safe TTL + LRU cache with single-flight computation.
+
+    Entries are keyed by (endpoint, fingerprint) so a whole endpoint can be
+    invalidated at once. Failed computations are not cached; their error is
+    raised in every caller that was waiting on them.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[float, Any]]' = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], _InFlight] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, endpoint: str, key: str, compute: Callable[[], Any]) -> Any:
+        cache_key = (endpoint, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(cache_key)
+                record_cache('results', 1, 0)
+                return entry[1]
+            if entry is not None:
+                del self._entries[cache_key]
+
+            flight = self._in_flight.get(cache_key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[cache_key] = _InFlight()
+
+        if not leader:
+            CACHE_REQUESTS.labels('results', 'coalesced').inc()
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        record_cache('results', 0, 1)
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None:
+                    self._store(cache_key, flight.value)
+                del self._in_flight[cache_key]
+            flight.done.set()
+        return flight.value
+
+    def invalidate(self, endpoint: Optional[str] = None) -> int:
+        """Drop all entries, or only those of one endpoint; returns how many were dropped"""
+        with self._lock:
+            if endpoint is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                return dropped
+            keys = [key for key in self._entries if key[0] == endpoint]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'inFlight': len(self._in_flight),
+                'maxEntries': self.max_entries,
+                'ttlSeconds': self.ttl_seconds
+            }
+
+    def _store(self, cache_key: Tuple[str, str], value: Any):
+        self._entries[cache_key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -6,8 +6,50 @@ load_dotenv()
 class Settings(BaseSettings):
     api_key: str
     model_path: str = "models/task_model"
+    # SentenceTransformer name or local directory used for task embeddings
+    embedding_model: str = "all-MiniLM-L6-v2"
+    # The text-classification pipeline is optional; disable it for offline or load-test runs
+    load_nlp_pipeline: bool = True
+    # Compiled tree models from train_model.py, only loaded when enabled (priority predictions change scores)
+    load_ml_models: bool = False
+    ml_models_path: str = "models/ml_models.npz"
+    # Pickled sklearn models of the same run; batches too large for the compiled models go to them.
+    # Empty or missing means every batch runs compiled, which is slower from a few hundred rows on.
+    ml_fallback_path: str = "models/ml_models.pkl"
+    # Embedding projection from train_model.py; skipped when missing
+    projection_path: str = "models/projection.npz"
+    # Comma-separated operations run on projected embeddings: grouping, hierarchy, similarity, batching.
+    # Empty (the default) keeps every operation on full embeddings; "grouping,hierarchy" is the cheap win.
+    # Similarity and batching compare against a fixed cosine threshold, which projection shifts.
+    projection_operations: str = ""
     port: int = 8000
     nestjs_url: str = "http://localhost:3000"
+    result_cache_size: int = 1024
+    result_cache_ttl_seconds: float = 60.0
+    # Width of the "now" window within which time-dependent results are reused
+    result_cache_time_bucket_seconds: int = 60
+    # auto | dbscan | birch (see app/models/clustering.py)
+    clustering_engine: str = "auto"
+    clustering_n_jobs: int = 0
+    job_storage_path: str = "jobs"
+    job_workers: int = 2
+    job_queue_size: int = 100
+    job_retention_seconds: float = 86400.0
+    # Users whose materialized task ranking is kept in memory
+    ranking_max_users: int = 10000
+    # Comma-separated ai_service base URLs behind the shard router (app/router.py)
+    shard_nodes: str = ""
+    shard_vnodes: int = 128
+    shard_timeout_seconds: float = 120.0
+    # Preforking server (app/serve.py); 0 workers means one per CPU
+    serve_workers: int = 0
+    serve_threads_per_worker: int = 1
+    # Recycle a worker after this many requests / seconds (0 disables)
+    serve_max_requests: int = 0
+    serve_max_worker_age_seconds: float = 0.0
+    serve_graceful_timeout_seconds: float = 30.0
+    # Append every API request to this JSON-lines file for replay (app/traces.py); empty disables
+    trace_record_path: str = ""
     
     class Config:
         env_file = ".env"
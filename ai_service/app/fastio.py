@@ -0,0 +1,116 @@
+"""
+High-throughput request/response path for the AI endpoints.
+
+Request bodies are decoded with orjson and checked field by field straight
+into `TaskBatch`, skipping the Pydantic `Task` models and their `.dict()`
+copies; responses are encoded with orjson without being re-validated
+against a response model. Validation errors use FastAPI's 422 layout so
+clients see the same errors as on the regular endpoints.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter, ValidationError
+
+from .models.batch import TaskBatch
+from .schemas.tasks import TaskPriority, TaskStatus, TaskType
+
+_ENUMS = {
+    'type': frozenset(member.value for member in TaskType),
+    'priority': frozenset(member.value for member in TaskPriority),
+    'status': frozenset(member.value for member in TaskStatus),
+}
+_OPTIONAL_STRINGS = ('description', 'dueDate')
+# Lax-mode int coercion of the `Task` model ("5", 5.0, True), for values that are not plain ints
+_INT = TypeAdapter(int)
+
+
+def _error(loc: List, error_type: str, msg: str, value: Any = None) -> Dict:
+    return {'type': error_type, 'loc': loc, 'msg': msg, 'input': value}
+
+
+def _check_int(task: Dict, field: str, loc: List, errors: List[Dict]):
+    """Coerce `task[field]` in place the way pydantic would, or record its error"""
+    value = task[field]
+    if type(value) is int:
+        return
+    try:
+        task[field] = _INT.validate_python(value)
+    except ValidationError as e:
+        error = e.errors()[0]
+        errors.append(_error(loc + [field], error['type'], error['msg'], value))
+
+
+def validate_tasks(records: Any, loc: Optional[List] = None) -> List[Dict]:
+    """Check raw JSON task objects against the `Task` schema, returning clean task dicts.
+
+    Unknown keys are dropped, missing optional fields become None and
+    integer fields are coerced as they would be through `Task(**record).dict()`.
+    """
+    loc = loc or ['body', 'tasks']
+    if not isinstance(records, list):
+        raise RequestValidationError([_error(loc, 'list_type', 'Input should be a valid list', records)])
+
+    tasks = []
+    errors = []
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors.append(_error(loc + [i], 'model_type', 'Input should be a valid dictionary', record))
+            continue
+        task = {
+            'id': record.get('id'),
+            'title': record.get('title'),
+            'description': record.get('description'),
+            'type': record.get('type'),
+            'priority': record.get('priority'),
+            'status': record.get('status'),
+            'dueDate': record.get('dueDate'),
+            'estimatedDuration': record.get('estimatedDuration')
+        }
+
+        for field in ('id', 'title', 'type', 'priority', 'status'):
+            if field not in record:
+                errors.append(_error(loc + [i, field], 'missing', 'Field required'))
+        if 'id' in record:
+            _check_int(task, 'id', loc + [i], errors)
+        if 'title' in record and not isinstance(task['title'], str):
+            errors.append(_error(loc + [i, 'title'], 'string_type', 'Input should be a valid string', task['title']))
+        for field, allowed in _ENUMS.items():
+            if field in record and task[field] not in allowed:
+                errors.append(_error(
+                    loc + [i, field], 'enum',
+                    f"Input should be {', '.join(repr(v) for v in sorted(allowed))}", task[field]
+                ))
+        for field in _OPTIONAL_STRINGS:
+            if task[field] is not None and not isinstance(task[field], str):
+                errors.append(_error(loc + [i, field], 'string_type', 'Input should be a valid string', task[field]))
+        if task['estimatedDuration'] is not None:
+            _check_int(task, 'estimatedDuration', loc + [i], errors)
+        tasks.append(task)
+
+    if errors:
+        raise RequestValidationError(errors)
+    return tasks
+
+
+async def read_task_batch(request: Request, key: str = 'tasks') -> TaskBatch:
+    """Decode a `{"tasks": [...]}` body straight into a TaskBatch"""
+    body = await request.body()
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise RequestValidationError([_error(['body'], 'json_invalid', f"JSON decode error: {e}")])
+    if not isinstance(payload, dict):
+        raise RequestValidationError([_error(['body'], 'model_type', 'Input should be a valid dictionary', payload)])
+    if key not in payload:
+        raise RequestValidationError([_error(['body', key], 'missing', 'Field required')])
+    return TaskBatch(validate_tasks(payload[key], ['body', key]))
+
+
+def fast_response(content: Any) -> ORJSONResponse:
+    """Encode a result without response-model validation"""
+    return ORJSONResponse(content)
@@ -0,0 +1,290 @@
+"""
+Background jobs for requests too large to answer within an HTTP timeout.
+
+Jobs are queued by priority in a bounded queue and run by a small pool of
+worker threads sharing the already loaded models. Progress is reported per
+pipeline stage (via `metrics.stage_listener`), cancellation is checked at
+every stage boundary, and each job's state and result are persisted as JSON
+so they survive until collected even if the worker process restarts.
+"""
+
+import itertools
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import JOB_QUEUE_DEPTH, JOBS_FINISHED, stage_listener
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job at the next stage boundary after cancellation"""
+
+
+class Job:
+    def __init__(self, kind: str, priority: str = 'normal', job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.priority = priority
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.current_stage: Optional[str] = None
+        self.stages: List[Dict] = []
+        self.cancel_requested = False
+        self.payload: Any = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'jobId': self.id,
+            'kind': self.kind,
+            'priority': self.priority,
+            'status': self.status,
+            'error': self.error,
+            'createdAt': self.created_at,
+            'startedAt': self.started_at,
+            'finishedAt': self.finished_at,
+            'currentStage': self.current_stage,
+            'stages': list(self.stages)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Job':
+        job = cls(data['kind'], data.get('priority', 'normal'), data['jobId'])
+        job.status = data['status']
+        job.error = data.get('error')
+        job.created_at = data.get('createdAt', job.created_at)
+        job.started_at = data.get('startedAt')
+        job.finished_at = data.get('finishedAt')
+        job.current_stage = data.get('currentStage')
+        job.stages = data.get('stages', [])
+        return job
+
+
+class JobManager:
+    """Bounded priority queue of jobs executed by a local worker thread pool"""
+
+    def __init__(self, storage_path: str, workers: int = 2, max_queued: int = 100,
+                 retention_seconds: float = 24 * 3600):
+        self.storage_path = storage_path
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self._handlers: Dict[str, Callable[[Any], Any]] = {}
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._queued = 0
+        self._sequence = itertools.count()
+        self._threads: List[threading.Thread] = []
+        os.makedirs(storage_path, exist_ok=True)
+        self._load()
+
+    def register(self, kind: str, handler: Callable[[Any], Any]):
+        self._handlers[kind] = handler
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """Stop the worker threads, leaving no job persisted as queued or running.
+
+        Queued jobs fail right away. Running jobs get `timeout` seconds to
+        finish; the ones still running then are failed (and cancelled at their
+        next stage), so other processes reading storage_path never report
+        them as running forever.
+        """
+        with self._lock:
+            queued = [job for job in self._jobs.values() if job.status == QUEUED]
+            for job in queued:
+                self._queued -= 1
+                job.error = 'Worker shut down before the job started'
+                self._finish(job, FAILED)
+        JOB_QUEUE_DEPTH.dec(len(queued))
+
+        for _ in self._threads:
+            self._queue.put((float('inf'), next(self._sequence), None))
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status == RUNNING:
+                    job.cancel_requested = True
+                    job.error = 'Interrupted by a worker shutdown'
+                    self._finish(job, FAILED)
+
+    def submit(self, kind: str, payload: Any, priority: str = 'normal') -> Job:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown job priority: {priority}")
+
+        job = Job(kind, priority)
+        job.payload = payload
+        with self._lock:
+            if self._queued >= self.max_queued:
+                raise QueueFullError(f"Job queue is full ({self.max_queued} queued)")
+            self._queued += 1
+            self._jobs[job.id] = job
+        JOB_QUEUE_DEPTH.inc()
+        self._persist(job)
+        self._queue.put((PRIORITIES[priority], next(self._sequence), job.id))
+        self._expire()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and job_id.isalnum():
+            # Submitted through another worker process sharing storage_path (app/serve.py)
+            job = self._read(job_id)
+        return job
+
+    def result(self, job_id: str) -> Any:
+        with open(self._result_path(job_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued job immediately, or a running one at its next stage boundary"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return job
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                self._queued -= 1
+                JOB_QUEUE_DEPTH.dec()
+                self._finish(job, CANCELLED)
+        return job
+
+    def _work(self):
+        while True:
+            _, _, job_id = self._queue.get()
+            if job_id is None:
+                return
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.status != QUEUED:
+                    continue
+                self._queued -= 1
+                job.status = RUNNING
+                job.started_at = time.time()
+            JOB_QUEUE_DEPTH.dec()
+            self._persist(job)
+            self._run(job)
+
+    def _run(self, job: Job):
+        def on_stage(name: str, seconds: Optional[float]):
+            if seconds is None:
+                if job.cancel_requested:
+                    raise JobCancelled()
+                job.current_stage = name
+            else:
+                job.stages.append({'stage': name, 'seconds': seconds})
+
+        try:
+            with stage_listener(on_stage):
+                result = self._handlers[job.kind](job.payload)
+            if job.cancel_requested:
+                raise JobCancelled()
+            self._write_json(self._result_path(job.id), result)
+            status = SUCCEEDED
+        except JobCancelled:
+            status = CANCELLED
+        except Exception as e:
+            logger.error(f"Error in job {job.id} ({job.kind}): {str(e)}")
+            job.error = str(e)
+            status = FAILED
+        with self._lock:
+            # Already failed by a shutdown that stopped waiting for it
+            if job.status == RUNNING:
+                self._finish(job, status)
+
+    def _finish(self, job: Job, status: str):
+        job.status = status
+        job.current_stage = None
+        job.finished_at = time.time()
+        job.payload = None
+        JOBS_FINISHED.labels(job.kind, status).inc()
+        self._persist(job)
+
+    def _expire(self):
+        """Forget finished jobs (and their stored results) past the retention period"""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.status in FINISHED_STATES and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        for job_id in expired:
+            for path in (self._job_path(job_id), self._result_path(job_id)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _load(self):
+        """Reload persisted jobs; those interrupted by a restart are marked failed"""
+        for name in os.listdir(self.storage_path):
+            if not name.endswith('.job.json'):
+                continue
+            try:
+                with open(os.path.join(self.storage_path, name), 'r', encoding='utf-8') as f:
+                    job = Job.from_dict(json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Error loading job {name}: {str(e)}")
+                continue
+            if job.status not in FINISHED_STATES:
+                job.status = FAILED
+                job.error = 'Interrupted by a service restart'
+                job.finished_at = time.time()
+                self._persist(job)
+            self._jobs[job.id] = job
+
+    def _read(self, job_id: str) -> Optional[Job]:
+        try:
+            with open(self._job_path(job_id), 'r', encoding='utf-8') as f:
+                return Job.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _persist(self, job: Job):
+        self._write_json(self._job_path(job.id), job.to_dict())
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.storage_path, f"{job_id}.job.json")
+
+    def _result_path(self, job_id: str) -> str:
+        return os.path.join(self.storage_path, f"{job_id}.result.json")
+
+    def _write_json(self, path: str, data: Any):
+        fd, tmp_path = tempfile.mkstemp(dir=self.storage_path, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp_path, path)
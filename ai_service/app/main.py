@@ -1,16 +1,28 @@
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
 import os
 from .schemas.tasks import (
     Task, SimilarTaskGroup, InferredTask,
-    GroupTasksRequest, InferDependenciesRequest,
-    PrioritizeRequest, PomodoroRequest
+    GroupTasksRequest, HierarchicalGroupRequest, InferDependenciesRequest,
+    PrioritizeRequest, PomodoroRequest,
+    RecordOutcomesRequest, SubmitJobRequest, TaskEventType, TaskEventsRequest, EmbeddingSegment
 )
 from .models.task_model import TaskModel
 from .models.embeddings import TaskEmbedder
+from .models.projection import EmbeddingProjection
+from .models.ranking import RankingStore
 from .config import settings
+from .metrics import REGISTRY, BATCH_SIZE, MODEL_LOAD_SECONDS, MetricsMiddleware
+from .profiling import profiler, allocation_tracker
+from .traces import TraceRecorder
+from .cache import ResultCache, fingerprint
+from .fastio import read_task_batch, fast_response
+from .jobs import JobManager, QueueFullError, SUCCEEDED
 import logging
+import time
 from typing import List,Dict
 
 # Set up logging
@@ -28,9 +40,99 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
+if settings.trace_record_path:
+    app.add_middleware(TraceRecorder, path=settings.trace_record_path)
+
 # Initialize models
-embedder = TaskEmbedder()
-task_model = TaskModel(embedder)
+_load_start = time.perf_counter()
+projection_operations = [op.strip() for op in settings.projection_operations.split(',') if op.strip()]
+embedder = TaskEmbedder(settings.embedding_model)
+# Projection is opt-in: only loaded when some operation is configured to use it
+if projection_operations and os.path.exists(settings.projection_path):
+    embedder.set_projection(EmbeddingProjection.load(settings.projection_path))
+MODEL_LOAD_SECONDS.labels('embedder').set(time.perf_counter() - _load_start)
+
+_load_start = time.perf_counter()
+task_model = TaskModel(
+    embedder,
+    load_nlp_pipeline=settings.load_nlp_pipeline,
+    clustering_engine=settings.clustering_engine,
+    clustering_n_jobs=settings.clustering_n_jobs or None,
+    projection_operations=projection_operations
+)
+if settings.load_ml_models:
+    fallback_path = settings.ml_fallback_path if os.path.exists(settings.ml_fallback_path) else None
+    if fallback_path is None:
+        logger.warning(f"No sklearn models at {settings.ml_fallback_path!r}; large batches run on the compiled models")
+    task_model.load_ml_models(settings.ml_models_path, fallback_path)
+MODEL_LOAD_SECONDS.labels('task_model').set(time.perf_counter() - _load_start)
+
+rankings = RankingStore(task_model, max_users=settings.ranking_max_users)
+
+result_cache = ResultCache(settings.result_cache_size, settings.result_cache_ttl_seconds)
+
+async def cached_result(endpoint: str, payload, compute, time_dependent: bool = False):
+    """Serve from the result cache, computing at most once per identical in-flight request"""
+    bucket = settings.result_cache_time_bucket_seconds if time_dependent else None
+    # The model version is part of the key so newly learned models are never masked by old results
+    key = fingerprint(endpoint, payload, bucket, task_model.model_version)
+    return await run_in_threadpool(result_cache.get_or_compute, endpoint, key, compute)
+
+job_manager = JobManager(
+    settings.job_storage_path,
+    workers=settings.job_workers,
+    max_queued=settings.job_queue_size,
+    retention_seconds=settings.job_retention_seconds
+)
+job_manager.register('group_tasks', task_model.group_similar_tasks)
+job_manager.register('prioritize_tasks', task_model.prioritize_tasks)
+job_manager.register('create_pomodoro_schedule', task_model.create_pomodoro_schedule)
+
+# Small request run through every model before serving (negative ids never collide with real tasks)
+WARM_UP_TASKS = [
+    {'id': -1, 'title': 'Prepare quarterly report', 'description': 'Collect figures', 'type': 'work',
+     'priority': 'high', 'status': 'todo', 'dueDate': None, 'estimatedDuration': 60},
+    {'id': -2, 'title': 'Review contract draft', 'description': None, 'type': 'work',
+     'priority': 'medium', 'status': 'todo', 'dueDate': None, 'estimatedDuration': 30},
+    {'id': -3, 'title': 'Schedule team meeting', 'description': 'Agenda and invites', 'type': 'meeting',
+     'priority': 'low', 'status': 'in_progress', 'dueDate': None, 'estimatedDuration': 15}
+]
+warmed_up = False
+# Readiness gate for /ready: set once this process can serve, cleared at shutdown
+ready = False
+
+def warm_up():
+    """Run every model once so lazy initialization (torch kernels, first-call imports) happens now"""
+    global warmed_up
+    if warmed_up:
+        return
+    start = time.perf_counter()
+    embedder.model.encode(['warm up'])
+    task_model.group_similar_tasks(WARM_UP_TASKS)
+    task_model.prioritize_tasks(WARM_UP_TASKS)
+    task_model.create_pomodoro_schedule(WARM_UP_TASKS)
+    task_model.infer_dependencies(WARM_UP_TASKS[0])
+    # Leave no trace of the warm-up tasks in the embedding store
+    embedder.assign_segment('__warm_up__', [task['id'] for task in WARM_UP_TASKS])
+    embedder.drop_segment('__warm_up__')
+    warmed_up = True
+    MODEL_LOAD_SECONDS.labels('warm_up').set(time.perf_counter() - start)
+
+@app.on_event("startup")
+def start_serving():
+    global ready
+    # Job threads start per serving process, so forked workers get their own
+    job_manager.start()
+    warm_up()
+    ready = True
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    global ready
+    ready = False
+    job_manager.shutdown(timeout=5)
 
 # Security dependency
 async def verify_api_key(api_key: str = Header(...)):
@@ -41,6 +143,15 @@ async def verify_api_key(api_key: str = Header(...)):
         )
     return api_key
 
+async def tenant_id(x_tenant_id: Optional[str] = Header(None)) -> Optional[str]:
+    """Tenant set by the shard router (app/router.py); None when called directly"""
+    return x_tenant_id
+
+def track_tenant(tenant: Optional[str], task_ids):
+    """Remember whose tasks these are so their embeddings can move with the tenant"""
+    if tenant is not None:
+        embedder.assign_segment(tenant, task_ids)
+
 @app.post("/protected-endpoint")
 async def protected_route(
     api_key: str = Depends(verify_api_key)
@@ -50,17 +161,50 @@ async def protected_route(
 @app.post("/group_tasks", response_model=List[SimilarTaskGroup])
 async def group_tasks(
     request: GroupTasksRequest,
-    api_key: str = Depends(verify_api_key)
+    api_key: str = Depends(verify_api_key),
+    tenant: Optional[str] = Depends(tenant_id)
 ):
     """Group similar tasks together"""
+    BATCH_SIZE.labels('group_tasks').observe(len(request.tasks))
     try:
         tasks_data = [task.dict() for task in request.tasks]
-        groups = task_model.group_similar_tasks(tasks_data)
+        track_tenant(tenant, [task['id'] for task in tasks_data])
+        groups = await cached_result(
+            'group_tasks', tasks_data, lambda: task_model.group_similar_tasks(tasks_data)
+        )
         return groups
     except Exception as e:
         logger.error(f"Error in group_tasks: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/group_tasks/hierarchical")
+async def group_tasks_hierarchical(
+    request: HierarchicalGroupRequest,
+    api_key: str = Depends(verify_api_key),
+    tenant: Optional[str] = Depends(tenant_id)
+):
+    """Coarse and fine task groups from one cached cluster tree"""
+    BATCH_SIZE.labels('group_tasks_hierarchical').observe(len(request.tasks))
+    try:
+        tasks_data = [task.dict() for task in request.tasks]
+        track_tenant(tenant, [task['id'] for task in tasks_data])
+        return await run_in_threadpool(task_model.group_tasks_hierarchical, tasks_data, request.nGroups)
+    except Exception as e:
+        logger.error(f"Error in group_tasks_hierarchical: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/group_tasks/hierarchical/{tree_id}")
+async def cut_task_hierarchy(
+    tree_id: str,
+    n_groups: List[int] = Query(...),
+    api_key: str = Depends(verify_api_key)
+):
+    """Other granularities of a tree built by POST /group_tasks/hierarchical"""
+    result = task_model.cut_task_hierarchy(tree_id, n_groups)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Task tree not found; resubmit the tasks")
+    return result
+
 @app.post("/infer_dependencies", response_model=List[InferredTask])
 async def infer_dependencies(
     request: InferDependenciesRequest,
@@ -78,12 +222,17 @@ async def infer_dependencies(
 @app.post("/prioritize_tasks", response_model=List[Dict])
 async def prioritize_tasks(
     request: PrioritizeRequest,
-    api_key: str = Depends(verify_api_key)
+    api_key: str = Depends(verify_api_key),
+    tenant: Optional[str] = Depends(tenant_id)
 ):
     """Prioritize a list of tasks"""
+    BATCH_SIZE.labels('prioritize_tasks').observe(len(request.tasks))
     try:
         tasks_data = [task.dict() for task in request.tasks]
-        prioritized = task_model.prioritize_tasks(tasks_data)
+        track_tenant(tenant, [task['id'] for task in tasks_data])
+        prioritized = await cached_result(
+            'prioritize_tasks', tasks_data, lambda: task_model.prioritize_tasks(tasks_data), time_dependent=True
+        )
         return prioritized
     except Exception as e:
         logger.error(f"Error in prioritize_tasks: {str(e)}")
@@ -92,22 +241,356 @@ async def prioritize_tasks(
 @app.post("/create_pomodoro_schedule", response_model=List[Dict])
 async def create_pomodoro_schedule(
     request: PomodoroRequest,
-    api_key: str = Depends(verify_api_key)
+    api_key: str = Depends(verify_api_key),
+    tenant: Optional[str] = Depends(tenant_id)
 ):
     """Create a pomodoro schedule"""
+    BATCH_SIZE.labels('create_pomodoro_schedule').observe(len(request.tasks))
     try:
         tasks_data = [task.dict() for task in request.tasks]
-        schedule = task_model.create_pomodoro_schedule(tasks_data)
+        track_tenant(tenant, [task['id'] for task in tasks_data])
+        schedule = await cached_result(
+            'create_pomodoro_schedule', tasks_data, lambda: task_model.create_pomodoro_schedule(tasks_data), time_dependent=True
+        )
         return schedule
     except Exception as e:
         logger.error(f"Error in create_pomodoro_schedule: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/fast/group_tasks", response_class=ORJSONResponse)
+async def fast_group_tasks(
+    request: Request,
+    api_key: str = Depends(verify_api_key),
+    tenant: Optional[str] = Depends(tenant_id)
+):
+    """Group similar tasks; orjson I/O, and groups keep their priority/duration fields"""
+    batch = await read_task_batch(request)
+    track_tenant(tenant, batch.id_list())
+    BATCH_SIZE.labels('fast/group_tasks').observe(len(batch))
+    try:
+        groups = await cached_result(
+            'group_tasks', batch.tasks, lambda: task_model.group_similar_tasks(batch)
+        )
+        return fast_response(groups)
+    except Exception as e:
+        logger.error(f"Error in fast_group_tasks: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/fast/prioritize_tasks", response_class=ORJSONResponse)
+async def fast_prioritize_tasks(
+    request: Request,
+    api_key: str = Depends(verify_api_key),
+    tenant: Optional[str] = Depends(tenant_id)
+):
+    """Prioritize a list of tasks; orjson I/O without response-model validation"""
+    batch = await read_task_batch(request)
+    track_tenant(tenant, batch.id_list())
+    BATCH_SIZE.labels('fast/prioritize_tasks').observe(len(batch))
+    try:
+        prioritized = await cached_result(
+            'prioritize_tasks', batch.tasks, lambda: task_model.prioritize_tasks(batch), time_dependent=True
+        )
+        return fast_response(prioritized)
+    except Exception as e:
+        logger.error(f"Error in fast_prioritize_tasks: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/fast/create_pomodoro_schedule", response_class=ORJSONResponse)
+async def fast_create_pomodoro_schedule(
+    request: Request,
+    api_key: str = Depends(verify_api_key),
+    tenant: Optional[str] = Depends(tenant_id)
+):
+    """Create a pomodoro schedule; orjson I/O without response-model validation"""
+    batch = await read_task_batch(request)
+    track_tenant(tenant, batch.id_list())
+    BATCH_SIZE.labels('fast/create_pomodoro_schedule').observe(len(batch))
+    try:
+        schedule = await cached_result(
+            'create_pomodoro_schedule', batch.tasks, lambda: task_model.create_pomodoro_schedule(batch),
+            time_dependent=True
+        )
+        return fast_response(schedule)
+    except Exception as e:
+        logger.error(f"Error in fast_create_pomodoro_schedule: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/record_outcomes")
+async def record_outcomes(
+    request: RecordOutcomesRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Learn from completed-task outcomes (actual duration, final priority)"""
+    BATCH_SIZE.labels('record_outcomes').observe(len(request.outcomes))
+    try:
+        outcomes = [outcome.dict() for outcome in request.outcomes]
+        return task_model.record_task_outcomes(outcomes)
+    except Exception as e:
+        logger.error(f"Error in record_outcomes: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/admin/online_model")
+async def online_model_status(api_key: str = Depends(verify_api_key)):
+    """Published online model versions and their held-out priority error"""
+    return task_model.online_model_status()
+
+@app.post("/admin/online_model/rollback")
+async def rollback_online_model(api_key: str = Depends(verify_api_key)):
+    """Serve the previously published online model version again"""
+    return await run_in_threadpool(task_model.rollback_online_model)
+
+@app.post("/rankings/{user_id}/events")
+async def apply_task_events(
+    user_id: str,
+    request: TaskEventsRequest,
+    api_key: str = Depends(verify_api_key),
+    tenant: Optional[str] = Depends(tenant_id)
+):
+    """Update a user's materialized ranking from task create/update/delete events"""
+    BATCH_SIZE.labels('rankings.events').observe(len(request.events))
+    events = []
+    for i, event in enumerate(request.events):
+        if event.type == TaskEventType.DELETED:
+            task_id = event.taskId if event.taskId is not None else (event.task.id if event.task else None)
+            if task_id is None:
+                raise HTTPException(status_code=400, detail=f"Event {i}: deleted events need taskId")
+            events.append({'type': event.type.value, 'taskId': task_id})
+        else:
+            if event.task is None:
+                raise HTTPException(status_code=400, detail=f"Event {i}: {event.type.value} events need task")
+            events.append({'type': event.type.value, 'task': event.task.dict()})
+    track_tenant(tenant, [event['task']['id'] for event in events if 'task' in event])
+    try:
+        size = await run_in_threadpool(rankings.apply_events, user_id, events)
+        return {"userId": user_id, "applied": len(events), "tasks": size}
+    except Exception as e:
+        logger.error(f"Error in apply_task_events: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.put("/rankings/{user_id}")
+async def replace_ranking(
+    user_id: str,
+    request: PrioritizeRequest,
+    api_key: str = Depends(verify_api_key),
+    tenant: Optional[str] = Depends(tenant_id)
+):
+    """(Re)build a user's ranking from their full task list"""
+    BATCH_SIZE.labels('rankings.replace').observe(len(request.tasks))
+    try:
+        tasks_data = [task.dict() for task in request.tasks]
+        track_tenant(tenant, [task['id'] for task in tasks_data])
+        size = await run_in_threadpool(rankings.replace, user_id, tasks_data)
+        return {"userId": user_id, "tasks": size}
+    except Exception as e:
+        logger.error(f"Error in replace_ranking: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/rankings/{user_id}", response_model=List[Dict])
+async def top_tasks(
+    user_id: str,
+    limit: Optional[int] = Query(None, ge=0),
+    api_key: str = Depends(verify_api_key)
+):
+    """A user's highest-priority tasks now, as /prioritize_tasks would rank them"""
+    ranked = await run_in_threadpool(rankings.top, user_id, limit)
+    if ranked is None:
+        raise HTTPException(status_code=404, detail="No ranking for this user; PUT their tasks first")
+    return ranked
+
+@app.delete("/rankings/{user_id}")
+async def drop_ranking(user_id: str, api_key: str = Depends(verify_api_key)):
+    """Forget a user's materialized ranking"""
+    if not rankings.drop(user_id):
+        raise HTTPException(status_code=404, detail="No ranking for this user")
+    return {"userId": user_id, "dropped": True}
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    request: SubmitJobRequest,
+    api_key: str = Depends(verify_api_key),
+    tenant: Optional[str] = Depends(tenant_id)
+):
+    """Queue a long-running grouping/prioritization/scheduling job"""
+    BATCH_SIZE.labels(f'jobs.{request.kind.value}').observe(len(request.tasks))
+    tasks_data = [task.dict() for task in request.tasks]
+    track_tenant(tenant, [task['id'] for task in tasks_data])
+    try:
+        job = job_manager.submit(request.kind.value, tasks_data, request.priority.value)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, api_key: str = Depends(verify_api_key)):
+    """Job status with per-stage progress"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str, api_key: str = Depends(verify_api_key)):
+    """Result of a succeeded job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    try:
+        return await run_in_threadpool(job_manager.result, job_id)
+    except OSError as e:
+        logger.error(f"Error in job_result: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, api_key: str = Depends(verify_api_key)):
+    """Cancel a queued job, or a running one at its next stage"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/admin/profile/start")
+async def start_profile(
+    interval_ms: float = Query(5.0, gt=0),
+    duration_s: float = Query(30.0, gt=0),
+    include_idle: bool = False,
+    api_key: str = Depends(verify_api_key)
+):
+    """Start the sampling profiler on this worker"""
+    try:
+        profiler.start(interval_ms / 1000, duration_s, include_idle)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return profiler.status()
+
+@app.get("/admin/profile/status")
+async def profile_status(api_key: str = Depends(verify_api_key)):
+    """Sampling profiler state on this worker"""
+    return profiler.status()
+
+@app.post("/admin/profile/stop", response_class=PlainTextResponse)
+async def stop_profile(api_key: str = Depends(verify_api_key)):
+    """Stop the profiler and return collapsed stacks (flamegraph.pl / speedscope format)"""
+    return PlainTextResponse(profiler.stop())
+
+@app.post("/admin/tracemalloc/start")
+async def start_tracemalloc(frames: int = Query(25, ge=1), api_key: str = Depends(verify_api_key)):
+    """Start tracking allocations on this worker (the traceback depth of a running trace is kept)"""
+    return {"tracing": True, "frames": allocation_tracker.start(frames)}
+
+@app.get("/admin/tracemalloc/snapshot")
+async def tracemalloc_snapshot(
+    limit: int = Query(20, ge=1),
+    key_type: str = "lineno",
+    compare_to_start: bool = True,
+    api_key: str = Depends(verify_api_key)
+):
+    """Top allocation sites since tracking started (or absolute totals)"""
+    if key_type not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="key_type must be lineno, filename or traceback")
+    try:
+        return allocation_tracker.top(limit, key_type, compare_to_start)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/admin/tracemalloc/stop")
+async def stop_tracemalloc(api_key: str = Depends(verify_api_key)):
+    """Stop tracking allocations"""
+    allocation_tracker.stop()
+    return {"tracing": False}
+
+@app.get("/admin/cache")
+async def cache_stats(api_key: str = Depends(verify_api_key)):
+    """Result cache occupancy"""
+    return result_cache.stats()
+
+@app.post("/admin/cache/invalidate")
+async def invalidate_cache(
+    endpoint: Optional[str] = None,
+    api_key: str = Depends(verify_api_key)
+):
+    """Drop cached results, for one endpoint or all of them"""
+    return {"invalidated": result_cache.invalidate(endpoint)}
+
+@app.get("/admin/segments")
+async def list_segments(api_key: str = Depends(verify_api_key)):
+    """Tenants with embeddings on this node, and how many tasks each"""
+    return embedder.segment_sizes()
+
+@app.get("/admin/segments/{tenant}", response_class=ORJSONResponse)
+async def export_segment(tenant: str, api_key: str = Depends(verify_api_key)):
+    """A tenant's task embeddings, for migrating it to another node"""
+    return fast_response(await run_in_threadpool(embedder.export_segment, tenant))
+
+@app.post("/admin/segments")
+async def import_segment(segment: EmbeddingSegment, api_key: str = Depends(verify_api_key)):
+    """Load a tenant's task embeddings exported by another node"""
+    try:
+        data = segment.dict()
+        data['tasks'] = [task.dict() for task in segment.tasks]
+        imported = await run_in_threadpool(embedder.import_segment, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"tenant": segment.tenant, "imported": imported}
+
+@app.delete("/admin/segments/{tenant}")
+async def drop_segment(tenant: str, api_key: str = Depends(verify_api_key)):
+    """Forget a tenant's task embeddings after it moved to another node"""
+    return {"tenant": tenant, "dropped": embedder.drop_segment(tenant)}
+
+@app.get("/admin/rankings")
+async def ranking_stats(api_key: str = Depends(verify_api_key)):
+    """Materialized rankings held on this node"""
+    return rankings.stats()
+
+@app.get("/admin/ranked_users")
+async def ranked_users(api_key: str = Depends(verify_api_key)):
+    """Users with a materialized ranking on this node"""
+    return rankings.users()
+
+@app.get("/admin/rankings/{user_id}")
+async def export_ranking(user_id: str, api_key: str = Depends(verify_api_key)):
+    """A user's ranked tasks, for moving the ranking to another node"""
+    tasks = await run_in_threadpool(rankings.export, user_id)
+    if tasks is None:
+        raise HTTPException(status_code=404, detail="No ranking for this user")
+    return {"userId": user_id, "tasks": tasks}
+
+@app.post("/admin/rankings/{user_id}")
+async def import_ranking(
+    user_id: str,
+    request: PrioritizeRequest,
+    api_key: str = Depends(verify_api_key),
+    tenant: Optional[str] = Depends(tenant_id)
+):
+    """Merge a ranking exported by another node into this node's ranking for the user"""
+    try:
+        tasks_data = [task.dict() for task in request.tasks]
+        track_tenant(tenant, [task['id'] for task in tasks_data])
+        size = await run_in_threadpool(rankings.merge, user_id, tasks_data)
+        return {"userId": user_id, "tasks": size}
+    except Exception as e:
+        logger.error(f"Error in import_ranking: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "version": "1.0.0"}
 
+@app.get("/ready")
+async def readiness_check():
+    """200 once models are loaded and warm and this process is serving; 503 otherwise"""
+    if not ready:
+        raise HTTPException(status_code=503, detail="Not ready")
+    return {"status": "ready", "pid": os.getpid()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=settings.port)
\ No newline at end of file
@@ -4,12 +4,24 @@ Task Understanding Models
 Exports:
 - TaskModel: Main task understanding and prediction model
 - TaskEmbedder: Handles task embeddings and similarity
+- TaskFeaturePipeline: Shared ML feature extraction for training and serving
+- TaskBatch: Columnar per-request view of tasks used by TaskModel
+- RankingStore: Per-user priority rankings maintained from task change events
+- EmbeddingProjection: Optional PCA/random projection used for clustering and similarity
 """
 
 from .task_model import TaskModel
 from .embeddings import TaskEmbedder
+from .features import TaskFeaturePipeline
+from .batch import TaskBatch
+from .ranking import RankingStore
+from .projection import EmbeddingProjection
 
 __all__ = [
     'TaskModel',
-    'TaskEmbedder'
+    'TaskEmbedder',
+    'TaskFeaturePipeline',
+    'TaskBatch',
+    'RankingStore',
+    'EmbeddingProjection'
 ]
\ No newline at end of file
@@ -0,0 +1,148 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+from scipy import sparse
+
+from .features import (
+    PRIORITY_LEVELS, _TYPE_INDEX, _enum_value, days_until, parse_due_dates
+)
+
+TASK_STATUSES = ['todo', 'in_progress', 'done', 'blocked', 'archived']
+PRIORITY_NAMES = {level: name for name, level in PRIORITY_LEVELS.items()}
+
+_STATUS_INDEX = {status: i for i, status in enumerate(TASK_STATUSES)}
+
+# Target number of pairwise cells held in memory per block
+BLOCK_CELLS = 4_000_000
+
+
+def type_code(task_type: str) -> int:
+    return _TYPE_INDEX.get(task_type, -1)
+
+
+def status_code(status: str) -> int:
+    return _STATUS_INDEX.get(status, -1)
+
+
+class TaskBatch:
+    """Columnar (struct-of-arrays) view of one request's tasks.
+
+    Built once per request: enums become small integer codes, due dates are
+    parsed once into datetime64 and missing durations become NaN, so model
+    code works on whole columns instead of calling `task.get(...)` per task.
+    It still behaves as a read-only sequence of the original task dicts for
+    the code that needs them (embedding, feature extraction).
+    """
+
+    def __init__(self, tasks: Sequence[Dict]):
+        self.tasks: List[Dict] = list(tasks)
+        self.ids = np.array([task['id'] for task in self.tasks])
+        self.titles = [task.get('title') or '' for task in self.tasks]
+        self.descriptions = [task.get('description') or '' for task in self.tasks]
+        self.types = [_enum_value(task.get('type')) or 'other' for task in self.tasks]
+        self.type_codes = np.array([type_code(t) for t in self.types], dtype=np.int8)
+        self.priority_levels = np.array(
+            [PRIORITY_LEVELS.get(_enum_value(task.get('priority')), 2) for task in self.tasks],
+            dtype=np.int8
+        )
+        self.status_codes = np.array(
+            [status_code(_enum_value(task.get('status'))) for task in self.tasks], dtype=np.int8
+        )
+        self.due_dates = parse_due_dates([task.get('dueDate') for task in self.tasks])
+        self.durations = np.array(
+            [np.nan if task.get('estimatedDuration') is None else task['estimatedDuration']
+             for task in self.tasks],
+            dtype=np.float64
+        )
+
+    @classmethod
+    def of(cls, tasks: Union['TaskBatch', Sequence[Dict]]) -> 'TaskBatch':
+        return tasks if isinstance(tasks, TaskBatch) else cls(tasks)
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.tasks)
+
+    def __getitem__(self, index: int) -> Dict:
+        return self.tasks[index]
+
+    def take(self, indices: Sequence[int]) -> 'TaskBatch':
+        """Subset (or reorder) the batch without re-parsing anything"""
+        indices = np.asarray(indices, dtype=np.int64)
+        subset = TaskBatch.__new__(TaskBatch)
+        subset.tasks = [self.tasks[i] for i in indices]
+        subset.titles = [self.titles[i] for i in indices]
+        subset.descriptions = [self.descriptions[i] for i in indices]
+        subset.types = [self.types[i] for i in indices]
+        for column in ('ids', 'type_codes', 'priority_levels', 'status_codes', 'due_dates', 'durations'):
+            setattr(subset, column, getattr(self, column)[indices])
+        return subset
+
+    def id_list(self) -> List:
+        """Task ids as plain Python values, for responses"""
+        return self.ids.tolist()
+
+    def days_until_due(self, now: Optional[datetime] = None) -> np.ndarray:
+        return days_until(self.due_dates, now)
+
+    def durations_or(self, default: float) -> np.ndarray:
+        return np.where(np.isnan(self.durations), default, self.durations)
+
+    def is_type(self, *task_types: str) -> np.ndarray:
+        return np.isin(self.type_codes, [type_code(t) for t in task_types if t in _TYPE_INDEX])
+
+    def is_status(self, status: str) -> np.ndarray:
+        return self.status_codes == status_code(status)
+
+    def title_word_matrix(self) -> sparse.csr_matrix:
+        """Binary task x word matrix of the distinct lowercase words in each title"""
+        vocabulary: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        for title in self.titles:
+            words = {vocabulary.setdefault(word, len(vocabulary)) for word in title.lower().split()}
+            indices.extend(words)
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.int32)
+        return sparse.csr_matrix(
+            (data, np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(self), max(1, len(vocabulary)))
+        )
+
+
+def shared_word_counts(words: sparse.csr_matrix, min_shared: int = 2) -> np.ndarray:
+    """For each row, how many rows (itself included) share at least `min_shared` words with it"""
+    n = words.shape[0]
+    counts = np.zeros(n, dtype=np.int64)
+    transposed = words.T.tocsc()
+    step = max(1, BLOCK_CELLS // max(1, n))
+    for start in range(0, n, step):
+        overlap = (words[start:start + step] @ transposed).tocsr()
+        overlap.data = (overlap.data >= min_shared).astype(np.int32)
+        counts[start:start + step] = np.asarray(overlap.sum(axis=1)).ravel()
+    return counts
+
+
+def similar_counts(embeddings: np.ndarray, groups: np.ndarray, ids: np.ndarray,
+                   threshold: float) -> np.ndarray:
+    """For each row, how many rows of the same group with a different id have cosine similarity > threshold"""
+    counts = np.zeros(len(embeddings), dtype=np.int64)
+    if not len(embeddings):
+        return counts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        unit = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    for group in np.unique(groups):
+        members = np.nonzero(groups == group)[0]
+        vectors = unit[members]
+        member_ids = ids[members]
+        step = max(1, BLOCK_CELLS // len(members))
+        for start in range(0, len(members), step):
+            block = slice(start, start + step)
+            similar = (vectors[block] @ vectors.T) > threshold
+            similar &= member_ids[block, None] != member_ids[None, :]
+            counts[members[block]] = similar.sum(axis=1)
+    return counts
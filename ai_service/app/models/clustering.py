@@ -0,0 +1,216 @@
+"""
+Pluggable clustering engines for task grouping.
+
+Every engine takes an embedding matrix plus DBSCAN-style `eps` and
+`min_samples` and returns one integer label per row, -1 meaning noise, with
+clusters numbered 0..k-1 in order of their first member.
+
+- `BlockedDBSCAN`: exact DBSCAN computed block by block. It never holds the
+  neighbourhood graph: a first pass counts neighbours to find core points,
+  a second pass merges core-core edges into connected components and
+  attaches border points, so memory stays O(block) instead of O(n^2).
+  Blocks are processed by `n_jobs` threads (the distance products release
+  the GIL).
+- `StreamingBirch`: Birch fed in chunks through `partial_fit`, for inputs
+  too large for any pairwise pass; subclusters smaller than `min_samples`
+  become noise.
+- `AutoEngine`: blocked DBSCAN up to `max_dbscan_tasks` rows, Birch beyond.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial.distance import pdist
+from sklearn.cluster import Birch
+
+# Target number of pairwise distances held in memory per block
+BLOCK_CELLS = 4_000_000
+
+# Pairwise distances are sampled from at most this many tasks to pick eps
+EPS_SAMPLE_SIZE = 2000
+EPS_PERCENTILE = 30
+DEFAULT_EPS = 0.5
+
+# min_samples grows with n/10 for small inputs but stops growing here, so
+# large backlogs are not forced into a handful of huge clusters
+MAX_MIN_SAMPLES = 10
+
+
+def estimate_eps(embeddings: np.ndarray, percentile: float = EPS_PERCENTILE,
+                 sample_size: int = EPS_SAMPLE_SIZE, seed: int = 0) -> float:
+    """Percentile of pairwise distances, exact for small inputs and sampled for large ones"""
+    n = len(embeddings)
+    if n < 2:
+        return DEFAULT_EPS
+    if n > sample_size:
+        rng = np.random.default_rng(seed)
+        embeddings = embeddings[rng.choice(n, sample_size, replace=False)]
+    return float(np.percentile(pdist(np.asarray(embeddings, dtype=np.float64)), percentile))
+
+
+def default_min_samples(n: int) -> int:
+    return max(2, min(n // 10, MAX_MIN_SAMPLES))
+
+
+def _relabel(labels: np.ndarray) -> np.ndarray:
+    """Renumber clusters 0..k-1 by first occurrence, keeping -1 as noise"""
+    clustered = labels >= 0
+    result = np.full(len(labels), -1, dtype=np.int64)
+    if clustered.any():
+        unique, first, inverse = np.unique(labels[clustered], return_index=True, return_inverse=True)
+        rank = np.empty(len(unique), dtype=np.int64)
+        rank[np.argsort(first, kind='stable')] = np.arange(len(unique))
+        result[clustered] = rank[inverse]
+    return result
+
+
+class ClusteringEngine:
+    name = ''
+
+    def fit_predict(self, embeddings: np.ndarray, eps: float, min_samples: int) -> np.ndarray:
+        raise NotImplementedError
+
+
+class BlockedDBSCAN(ClusteringEngine):
+    """Exact euclidean DBSCAN with O(block) memory and threaded blocks"""
+
+    name = 'dbscan'
+
+    def __init__(self, n_jobs: Optional[int] = None, block_cells: int = BLOCK_CELLS):
+        self.n_jobs = n_jobs if n_jobs and n_jobs > 0 else (os.cpu_count() or 1)
+        self.block_cells = block_cells
+
+    def fit_predict(self, embeddings: np.ndarray, eps: float, min_samples: int) -> np.ndarray:
+        points = np.ascontiguousarray(embeddings, dtype=np.float32)
+        n = len(points)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+        norms = np.einsum('ij,ij->i', points, points)
+        step = max(1, self.block_cells // n)
+        starts = list(range(0, n, step))
+        eps_sq = np.float32(eps) ** 2
+
+        def neighbours(start: int) -> np.ndarray:
+            block = points[start:start + step]
+            distances = norms[start:start + step, None] + norms[None, :] - 2 * (block @ points.T)
+            return distances <= eps_sq
+
+        # Pass 1: neighbour counts (including the point itself, as DBSCAN does)
+        counts = np.concatenate(list(self._map(lambda s: neighbours(s).sum(axis=1), starts)))
+        core = counts >= min_samples
+        core_index = np.nonzero(core)[0]
+        if not len(core_index):
+            return np.full(n, -1, dtype=np.int64)
+
+        # Pass 2: fold core-core edges into connected components block by block.
+        # Each core row only needs one edge per distinct neighbouring component,
+        # so edges point at component roots (a slightly stale root is still in
+        # the right component) and stay O(rows x components) per block.
+        nodes = np.arange(n)
+        state = {'root': nodes.copy()}
+        border_of = np.full(n, -1, dtype=np.int64)
+
+        def edges(start: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+            mask = neighbours(start)[:, core]
+            rows = np.arange(start, start + len(mask))
+            block_core = core[rows]
+            core_rows = rows[block_core]
+            # OR the neighbour columns of each component together
+            roots, root_of = np.unique(state['root'][core_index], return_inverse=True)
+            order = np.argsort(root_of, kind='stable')
+            bounds = np.concatenate([[0], np.cumsum(np.bincount(root_of))[:-1]])
+            hits = np.logical_or.reduceat(mask[block_core][:, order], bounds, axis=1)
+            src, dst = np.nonzero(hits)
+            # Border points join the cluster of their first core neighbour
+            border_rows = np.nonzero(~block_core & mask.any(axis=1))[0]
+            border_to = mask[border_rows].argmax(axis=1)
+            return core_rows[src], roots[dst], rows[border_rows], core_index[border_to]
+
+        for src, dst, border_rows, border_cores in self._map(edges, starts):
+            border_of[border_rows] = border_cores
+            graph = sparse.coo_matrix(
+                (np.ones(len(src) + n, dtype=np.int8),
+                 (np.concatenate([src, nodes]), np.concatenate([dst, state['root']]))),
+                shape=(n, n)
+            )
+            _, component = connected_components(graph, directed=False)
+            first = np.full(component.max() + 1, n, dtype=np.int64)
+            np.minimum.at(first, component, nodes)
+            state['root'] = first[component]
+        component = state['root']
+
+        labels = np.full(n, -1, dtype=np.int64)
+        labels[core] = component[core]
+        bordered = border_of >= 0
+        labels[bordered] = component[border_of[bordered]]
+        return _relabel(labels)
+
+    def _map(self, func: Callable, starts: List[int]) -> Iterator:
+        """Ordered results with at most n_jobs blocks in flight"""
+        if self.n_jobs == 1 or len(starts) == 1:
+            for start in starts:
+                yield func(start)
+            return
+        with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+            for i in range(0, len(starts), self.n_jobs):
+                yield from executor.map(func, starts[i:i + self.n_jobs])
+
+
+class StreamingBirch(ClusteringEngine):
+    """Birch over fixed-size chunks; memory is bounded by the CF-tree, not n"""
+
+    name = 'birch'
+
+    def __init__(self, chunk_size: int = 10000, branching_factor: int = 50):
+        self.chunk_size = chunk_size
+        self.branching_factor = branching_factor
+
+    def fit_predict(self, embeddings: np.ndarray, eps: float, min_samples: int) -> np.ndarray:
+        # float64: Birch derives radii from sums of squares, which cancel badly in float32
+        points = np.asarray(embeddings, dtype=np.float64)
+        if len(points) == 0:
+            return np.zeros(0, dtype=np.int64)
+        # Birch bounds a subcluster's RMS radius, which is its typical pairwise
+        # distance over sqrt(2); map DBSCAN's neighbour distance onto it that way
+        birch = Birch(
+            threshold=max(eps / np.sqrt(2), 1e-6), branching_factor=self.branching_factor, n_clusters=None
+        )
+        chunks = [points[i:i + self.chunk_size] for i in range(0, len(points), self.chunk_size)]
+        for chunk in chunks:
+            birch.partial_fit(chunk)
+        labels = np.concatenate([birch.predict(chunk) for chunk in chunks]).astype(np.int64)
+        sizes = np.bincount(labels)
+        labels[sizes[labels] < min_samples] = -1
+        return _relabel(labels)
+
+
+class AutoEngine(ClusteringEngine):
+    """Exact DBSCAN while a pairwise pass is affordable, streaming Birch beyond"""
+
+    name = 'auto'
+
+    def __init__(self, n_jobs: Optional[int] = None, max_dbscan_tasks: int = 20000):
+        self.dbscan = BlockedDBSCAN(n_jobs=n_jobs)
+        self.birch = StreamingBirch()
+        self.max_dbscan_tasks = max_dbscan_tasks
+
+    def fit_predict(self, embeddings: np.ndarray, eps: float, min_samples: int) -> np.ndarray:
+        engine = self.dbscan if len(embeddings) <= self.max_dbscan_tasks else self.birch
+        return engine.fit_predict(embeddings, eps, min_samples)
+
+
+ENGINES: Dict[str, Callable[..., ClusteringEngine]] = {
+    'auto': AutoEngine,
+    'dbscan': BlockedDBSCAN,
+    'birch': lambda n_jobs=None: StreamingBirch(),
+}
+
+
+def make_engine(name: str = 'auto', n_jobs: Optional[int] = None) -> ClusteringEngine:
+    if name not in ENGINES:
+        raise ValueError(f"Unknown clustering engine: {name} (expected one of {', '.join(ENGINES)})")
+    return ENGINES[name](n_jobs=n_jobs)
@@ -1,29 +1,67 @@
 from sentence_transformers import SentenceTransformer
-from sklearn.cluster import DBSCAN
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Iterable, Optional
+import base64
 import pickle
 import os
+import threading
+from .features import task_text
+from .clustering import BlockedDBSCAN
+from .projection import EmbeddingProjection
+from ..metrics import record_cache, timed
 
 class TaskEmbedder:
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', model=None,
+                 projection: Optional[EmbeddingProjection] = None):
+        # `model` lets callers share an already loaded encoder
+        self.model = model if model is not None else SentenceTransformer(model_name)
         self.task_embeddings = {}
         self.task_data = {}
+        # Tenant -> ids of its tasks, the unit moved between shards
+        self.segments: Dict[str, set] = {}
+        # Reduced copies of task_embeddings, computed once when an embedding is stored
+        self.projection = projection
+        self.task_projections = {}
+        # Requests run in a thread pool; encoding happens outside the lock, every read and write inside it
+        self._lock = threading.RLock()
+
+    def set_projection(self, projection: Optional[EmbeddingProjection]):
+        """Use a new projection and re-project the stored embeddings"""
+        with self._lock:
+            self.projection = projection
+            self.task_projections = {}
+            self._project(list(self.task_embeddings))
+
+    def _project(self, task_ids: List[int]):
+        if self.projection is None or not task_ids:
+            return
+        projected = self.projection.transform(np.stack([self.task_embeddings[i] for i in task_ids]))
+        self.task_projections.update(zip(task_ids, projected))
+
+    def _store(self, reduced: bool) -> Dict:
+        return self.task_projections if reduced and self.projection is not None else self.task_embeddings
+
+    def vectors(self, task_ids: List[int], reduced: bool = False) -> np.ndarray:
+        """Stacked embeddings of stored tasks, projected when `reduced` and a projection is set"""
+        with self._lock:
+            store = self._store(reduced)
+            return np.array([store[i] for i in task_ids])
+
+    def stored_vectors(self, task_ids: Iterable[int], reduced: bool = False) -> Dict[int, np.ndarray]:
+        """Task id -> stored embedding (or projection) for those of `task_ids` that have one"""
+        with self._lock:
+            store = self._store(reduced)
+            return {i: store[i] for i in task_ids if i in store}
         
 
+    @timed('embedder.group_similar_tasks')
     def group_similar_tasks(self, tasks: List[Dict], eps: float = 0.5, min_samples: int = 2) -> List[Dict]:
         """Group similar tasks using clustering"""
-        # Add all tasks to the embedder
-        for task in tasks:
-            self.add_task(task)
-            
-        # Get embeddings for all tasks
-        embeddings = np.array([self.task_embeddings[task['id']] for task in tasks])
+        # Add all tasks to the embedder and get their embeddings
+        embeddings = self.embed_tasks(tasks)
         
         # Cluster using DBSCAN
-        clustering = DBSCAN(eps=eps, min_samples=min_samples).fit(embeddings)
-        labels = clustering.labels_
+        labels = BlockedDBSCAN().fit_predict(embeddings, eps, min_samples)
         
         # Create groups
         groups = []
@@ -42,41 +80,124 @@ class TaskEmbedder:
 
     def embed_task(self, task: Dict) -> np.ndarray:
         """Generate embedding for a single task"""
-        text = f"{task['title']} {task['description'] or ''} {task['type']}"
-        return self.model.encode(text)
+        return self.model.encode(task_text(task))
     
     def add_task(self, task: Dict):
         """Add a task to the embedding space"""
-        embedding = self.embed_task(task)
-        self.task_embeddings[task['id']] = embedding
-        self.task_data[task['id']] = task
+        self.add_tasks([task])
+    
+    def add_tasks(self, tasks: List[Dict]):
+        """Add tasks to the embedding space, encoding only new or changed ones in one batch"""
+        self.embed_tasks(tasks)
+
+    def _is_current(self, task_id: int, text: str) -> bool:
+        previous = self.task_data.get(task_id)
+        return previous is not None and task_id in self.task_embeddings and task_text(previous) == text
+
+    @timed('embedder.add_tasks')
+    def embed_tasks(self, tasks: List[Dict], reduced: bool = False) -> np.ndarray:
+        """Add tasks like `add_tasks` and return their embeddings (projected when `reduced`), in order
+
+        A task's data is stored together with its embedding, once encoding is
+        done. Until then a concurrent request for an edited task still sees
+        the old text as stale and encodes it too, instead of reading the old
+        embedding. The returned rows are the embeddings of exactly these
+        texts, even if another request stores a different version meanwhile.
+        """
+        tasks = list(tasks)
+        ids = [task['id'] for task in tasks]
+        texts = [task_text(task) for task in tasks]
+        encoded: Dict[int, np.ndarray] = {}
+        checked = False
+        while True:
+            with self._lock:
+                stale = [i for i in range(len(tasks)) if i not in encoded and not self._is_current(ids[i], texts[i])]
+                if not stale:
+                    self.task_data.update(zip(ids, tasks))
+                    for i, embedding in encoded.items():
+                        self.task_embeddings[ids[i]] = embedding
+                    self._project([ids[i] for i in encoded])
+                    return self.vectors(ids, reduced)
+            if not checked:
+                record_cache('embedding', len(tasks) - len(stale), len(stale))
+                checked = True
+            encoded.update(zip(stale, self.model.encode([texts[i] for i in stale])))
         
-    def find_similar_tasks(self, task_id: int, threshold: float = 0.7) -> List[int]:
+    @timed('embedder.find_similar_tasks')
+    def find_similar_tasks(self, task_id: int, threshold: float = 0.7, reduced: bool = False) -> List[int]:
         """Find similar tasks based on embeddings"""
-        if task_id not in self.task_embeddings:
+        with self._lock:
+            store = self._store(reduced)
+            if task_id not in store:
+                return []
+            other_ids = [other_id for other_id in store if other_id != task_id]
+            target = np.asarray(store[task_id], dtype=np.float32)
+            others = np.array([store[i] for i in other_ids], dtype=np.float32)
+
+        if not other_ids:
             return []
-            
-        target_embedding = self.task_embeddings[task_id]
-        similarities = []
-        
-        for other_id, embedding in self.task_embeddings.items():
-            if other_id == task_id:
-                continue
-                
-            sim = np.dot(target_embedding, embedding) /(np.linalg.norm(target_embedding) * np.linalg.norm(embedding))
-            similarities.append((other_id, sim))
-            
-        # Sort by similarity and filter by threshold
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        return [id for id, sim in similarities if sim > threshold]
+        similarities = others @ target / (np.linalg.norm(others, axis=1) * np.linalg.norm(target))
+
+        # Sort by similarity (ties keep insertion order) and filter by threshold
+        order = np.argsort(-similarities, kind='stable')
+        return [other_ids[i] for i in order if similarities[i] > threshold]
     
+    def assign_segment(self, tenant: str, task_ids: Iterable[int]):
+        """Record which tenant the given tasks belong to"""
+        with self._lock:
+            self.segments.setdefault(tenant, set()).update(task_ids)
+
+    def segment_sizes(self) -> Dict[str, int]:
+        with self._lock:
+            return {tenant: len(ids) for tenant, ids in self.segments.items()}
+
+    def export_segment(self, tenant: str) -> Dict:
+        """A tenant's embedded tasks, with embeddings as base64 float32 rows"""
+        with self._lock:
+            ids = sorted(i for i in self.segments.get(tenant, ()) if i in self.task_embeddings)
+            embeddings = np.array([self.task_embeddings[i] for i in ids], dtype=np.float32)
+            tasks = [self.task_data[i] for i in ids]
+        return {
+            'tenant': tenant,
+            'taskIds': ids,
+            'tasks': tasks,
+            'dimension': int(embeddings.shape[1]) if ids else 0,
+            'embeddings': base64.b64encode(embeddings.astype('<f4').tobytes()).decode('ascii')
+        }
+
+    def import_segment(self, segment: Dict) -> int:
+        """Load a segment produced by `export_segment` on another node"""
+        ids = segment['taskIds']
+        raw = base64.b64decode(segment['embeddings'])
+        embeddings = np.frombuffer(raw, dtype='<f4').reshape(len(ids), segment['dimension'] or 0)
+        with self._lock:
+            for task_id, task, embedding in zip(ids, segment['tasks'], embeddings):
+                self.task_data[task_id] = task
+                self.task_embeddings[task_id] = embedding.astype(np.float32)
+            self._project(ids)
+            self.assign_segment(segment['tenant'], ids)
+        return len(ids)
+
+    def drop_segment(self, tenant: str) -> int:
+        """Forget a tenant's tasks once another node owns them"""
+        with self._lock:
+            ids = self.segments.pop(tenant, set())
+            # Keep tasks some other tenant on this node also submitted
+            shared = set().union(*self.segments.values()) if self.segments else set()
+            for task_id in ids - shared:
+                self.task_embeddings.pop(task_id, None)
+                self.task_projections.pop(task_id, None)
+                self.task_data.pop(task_id, None)
+        return len(ids)
+
     def save(self, path: str):
         """Save the embedder to disk"""
         os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'wb') as f:
+        with self._lock, open(path, 'wb') as f:
             pickle.dump({
                 'embeddings': self.task_embeddings,
-                'data': self.task_data
+                'data': self.task_data,
+                'segments': self.segments
             }, f)
     
     @classmethod
@@ -87,4 +208,5 @@ class TaskEmbedder:
             data = pickle.load(f)
             embedder.task_embeddings = data['embeddings']
             embedder.task_data = data['data']
+            embedder.segments = data.get('segments', {})
         return embedder
\ No newline at end of file
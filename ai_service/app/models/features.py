@@ -0,0 +1,233 @@
+import hashlib
+import threading
+import warnings
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..metrics import record_cache
+
+TASK_TYPES = ['work', 'personal', 'learning', 'admin', 'meeting', 'creative', 'communication', 'other']
+PRIORITY_LEVELS = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
+
+DEFAULT_DURATION = 60
+NO_DUE_DATE_DAYS = 30
+URGENT_DAYS = 7
+LONG_TASK_MINUTES = 120
+
+# Upper bounds of the duration buckets used by the ML models (minutes)
+DURATION_BUCKETS = np.array([60, 180, 360], dtype=np.float32)
+
+_TYPE_INDEX = {task_type: i for i, task_type in enumerate(TASK_TYPES)}
+_SECONDS_PER_DAY = 86400.0
+
+
+def _enum_value(value):
+    # Pydantic hands us TaskType members, whose str() is 'TaskType.WORK'
+    return getattr(value, 'value', value)
+
+
+def task_text(task: Dict) -> str:
+    """Text used to embed a task, shared by training and serving"""
+    task_type = _enum_value(task.get('type')) or ''
+    return f"{task.get('title') or ''} {task.get('description') or ''} {task_type}"
+
+
+def task_duration(task: Dict, default: int = DEFAULT_DURATION) -> float:
+    """Estimated duration of a task, falling back to a default when unset"""
+    duration = task.get('estimatedDuration')
+    return float(default if duration is None else duration)
+
+
+def parse_due_dates(values: Sequence[Optional[str]]) -> np.ndarray:
+    """Parse ISO due dates into a datetime64[s] array (NaT when missing)"""
+    raw = np.array([value if value else 'NaT' for value in values], dtype=object)
+    try:
+        with warnings.catch_warnings():
+            # numpy only warns on timezone offsets; treat those like bad input
+            warnings.simplefilter('error')
+            return raw.astype('datetime64[s]')
+    except (ValueError, TypeError, DeprecationWarning, UserWarning):
+        pass
+
+    parsed = np.empty(len(raw), dtype='datetime64[s]')
+    for i, value in enumerate(values):
+        if not value:
+            parsed[i] = np.datetime64('NaT')
+            continue
+        due = datetime.fromisoformat(value)
+        if due.tzinfo is not None:
+            due = due.astimezone().replace(tzinfo=None)
+        parsed[i] = np.datetime64(due, 's')
+    return parsed
+
+
+def days_until(due_dates: np.ndarray, now: Optional[datetime] = None) -> np.ndarray:
+    """Whole days from `now` until each due date (NaN when missing)"""
+    now64 = np.datetime64(now or datetime.now(), 's')
+    missing = np.isnat(due_dates)
+    seconds = (due_dates - now64).astype(np.float64)
+    seconds[missing] = np.nan
+    # Floor like timedelta.days does for negative deltas
+    return np.floor(seconds / _SECONDS_PER_DAY)
+
+
+def encode_task_types(task_types: Sequence[Optional[str]]) -> np.ndarray:
+    """One-hot encode task types; unknown types map to an all-zero row"""
+    codes = np.array([_TYPE_INDEX.get(task_type, -1) for task_type in task_types], dtype=np.int64)
+    one_hot = np.zeros((len(codes), len(TASK_TYPES)), dtype=np.float32)
+    known = codes >= 0
+    one_hot[np.nonzero(known)[0], codes[known]] = 1.0
+    return one_hot
+
+
+class TaskFeaturePipeline:
+    """Columnar feature extraction shared by `train_model.py` and `TaskModel`.
+
+    Feature layout (float32):
+        embedding | type one-hot | title/description length |
+        duration, long task flag, duration bucket |
+        has due date, days until due, urgent flag
+
+    Everything except the due-date distance is static for a given task, so
+    the static block is memoized per task content and only the temporal
+    columns are recomputed, vectorized, for each batch.
+    """
+
+    STATIC_NAMES = (
+        [f"type_{task_type}" for task_type in TASK_TYPES]
+        + ['title_length', 'description_length', 'duration', 'long_task', 'duration_bucket']
+    )
+    TEMPORAL_NAMES = ['has_due_date', 'days_until_due', 'urgent']
+    # Derived from `estimatedDuration`, so never inputs of a model predicting it
+    DURATION_NAMES = ['duration', 'long_task', 'duration_bucket']
+
+    def __init__(self, encoder, cache_size: int = 50000, batch_size: int = 64):
+        self.encoder = encoder
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self._cache: 'OrderedDict[str, Tuple[np.ndarray, np.datetime64]]' = OrderedDict()
+        # Serving requests and background learners share one pipeline
+        self._lock = threading.RLock()
+
+    @property
+    def feature_names(self) -> List[str]:
+        dim = self.encoder.get_sentence_embedding_dimension()
+        return [f"embedding_{i}" for i in range(dim)] + self.STATIC_NAMES + self.TEMPORAL_NAMES
+
+    @classmethod
+    def without_duration(cls, features: np.ndarray) -> np.ndarray:
+        """Feature view for duration models: the matrix minus the DURATION_NAMES columns"""
+        trailing = cls.STATIC_NAMES + cls.TEMPORAL_NAMES
+        offset = features.shape[1] - len(trailing)
+        dropped = [offset + trailing.index(name) for name in cls.DURATION_NAMES]
+        return np.delete(features, dropped, axis=1)
+
+    @staticmethod
+    def fingerprint(task: Dict) -> str:
+        """Content key for the static part of a task's features"""
+        key = '\x1f'.join(str(_enum_value(task.get(field))) for field in (
+            'title', 'description', 'type', 'dueDate', 'estimatedDuration'
+        ))
+        return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
+    def transform(self, tasks: Sequence[Dict], now: Optional[datetime] = None) -> np.ndarray:
+        """Turn a batch of tasks into a float32 feature matrix"""
+        if not tasks:
+            return np.zeros((0, len(self.feature_names)), dtype=np.float32)
+
+        with self._lock:
+            static, due_dates = self._static_features(tasks)
+        days = days_until(due_dates, now)
+        has_due = ~np.isnan(days)
+
+        temporal = np.empty((len(tasks), len(self.TEMPORAL_NAMES)), dtype=np.float32)
+        temporal[:, 0] = has_due
+        temporal[:, 1] = np.where(has_due, np.maximum(days, 0), NO_DUE_DATE_DAYS)
+        temporal[:, 2] = has_due & (days < URGENT_DAYS)
+
+        return np.hstack([static, temporal])
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def save_cache(self, path: str):
+        """Persist the memoized static rows so a later run can skip re-encoding"""
+        with self._lock:
+            keys = list(self._cache.keys())
+            rows = [self._cache[key] for key in keys]
+        if not keys:
+            return
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                keys=np.array(keys),
+                static=np.vstack([row for row, _ in rows]),
+                due_dates=np.array([due for _, due in rows], dtype='datetime64[s]').astype(np.int64)
+            )
+
+    def load_cache(self, path: str):
+        """Load rows written by `save_cache`; entries already in memory win"""
+        with np.load(path, allow_pickle=False) as data:
+            due_dates = data['due_dates'].astype('datetime64[s]')
+            with self._lock:
+                for key, row, due in zip(data['keys'].tolist(), data['static'], due_dates):
+                    self._cache.setdefault(key, (row, due))
+                self._evict()
+
+    def _static_features(self, tasks: Sequence[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        keys = [self.fingerprint(task) for task in tasks]
+        missing = {}
+        for key, task in zip(keys, tasks):
+            if key in self._cache:
+                self._cache.move_to_end(key)
+            elif key not in missing:
+                missing[key] = task
+
+        record_cache('features', len(keys) - len(missing), len(missing))
+        if missing:
+            self._compute_static(list(missing.keys()), list(missing.values()))
+
+        # Entries computed in this call are pinned until the batch is assembled
+        rows = [self._cache[key] for key in keys]
+        self._evict()
+        static = np.vstack([row for row, _ in rows])
+        due_dates = np.array([due for _, due in rows], dtype='datetime64[s]')
+        return static, due_dates
+
+    def _compute_static(self, keys: List[str], tasks: List[Dict]):
+        embeddings = np.asarray(
+            self.encoder.encode(
+                [task_text(task) for task in tasks],
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            ),
+            dtype=np.float32
+        )
+
+        durations = np.array([task_duration(task) for task in tasks], dtype=np.float32)
+        numeric = np.column_stack([
+            np.array([len(task.get('title') or '') for task in tasks], dtype=np.float32),
+            np.array([len(task.get('description') or '') for task in tasks], dtype=np.float32),
+            durations,
+            durations > LONG_TASK_MINUTES,
+            np.searchsorted(DURATION_BUCKETS, durations, side='left') + 1
+        ]).astype(np.float32)
+
+        static = np.hstack([
+            embeddings,
+            encode_task_types([task.get('type') for task in tasks]),
+            numeric
+        ])
+        due_dates = parse_due_dates([task.get('dueDate') for task in tasks])
+
+        for key, row, due in zip(keys, static, due_dates):
+            self._cache[key] = (row, due)
+
+    def _evict(self):
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
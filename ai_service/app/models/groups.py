@@ -0,0 +1,119 @@
+from typing import Dict, List
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+
+from .batch import PRIORITY_NAMES, TaskBatch
+from .features import DEFAULT_DURATION, PRIORITY_LEVELS
+
+# Words of at least four letters, as the old most-common-word naming used
+KEYWORD_PATTERN = r'(?u)\b[^\W\d_]{4,}\b'
+KEYWORDS_PER_GROUP = 2
+FALLBACK_KEYWORDS = "Related Tasks"
+
+
+def _cluster_indicator(labels: np.ndarray, clusters: int) -> sparse.csr_matrix:
+    """clusters x tasks 0/1 matrix, noise (-1) excluded"""
+    members = np.nonzero(labels >= 0)[0]
+    return sparse.csr_matrix(
+        (np.ones(len(members), dtype=np.float64), (labels[members], members)),
+        shape=(clusters, len(labels))
+    )
+
+
+def rank_keywords(titles: List[str], labels: np.ndarray, clusters: int,
+                  top: int = KEYWORDS_PER_GROUP) -> List[List[str]]:
+    """Top TF-IDF title words per cluster.
+
+    Term frequency is a word's share of the cluster's title words and IDF is
+    computed over all titles, so words that are frequent everywhere
+    ("review", "update") lose to the ones that characterise the cluster.
+    """
+    vectorizer = CountVectorizer(token_pattern=KEYWORD_PATTERN, stop_words='english', lowercase=True)
+    try:
+        counts = vectorizer.fit_transform(titles)
+    except ValueError:  # no usable words in any title
+        return [[] for _ in range(clusters)]
+    vocabulary = vectorizer.get_feature_names_out()
+
+    document_frequency = np.bincount(counts.indices, minlength=len(vocabulary))
+    idf = np.log((1 + len(titles)) / (1 + document_frequency)) + 1
+
+    term_counts = (_cluster_indicator(labels, clusters) @ counts).tocsr()
+    totals = np.asarray(term_counts.sum(axis=1)).ravel()
+    scores = term_counts.multiply(1 / np.maximum(totals, 1)[:, None]).multiply(idf[None, :]).tocsr()
+
+    keywords = []
+    for cluster in range(clusters):
+        start, end = scores.indptr[cluster], scores.indptr[cluster + 1]
+        row_scores = scores.data[start:end]
+        row_words = scores.indices[start:end]
+        # Highest score first, alphabetical among ties so names are stable
+        best = np.lexsort((vocabulary[row_words], -row_scores))[:top]
+        keywords.append([str(vocabulary[row_words[i]]) for i in best])
+    return keywords
+
+
+def summarize_groups(batch: TaskBatch, labels: np.ndarray) -> List[Dict]:
+    """Turn cluster labels into named groups in one vectorized pass.
+
+    Clusters get member ids, summed duration, highest member priority (at
+    least medium), their most common type and top keywords. Noise tasks of
+    high or critical priority become individual groups. Groups are returned
+    in order of their first task.
+    """
+    labels = np.asarray(labels, dtype=np.int64)
+    ids = batch.ids
+    durations = batch.durations_or(DEFAULT_DURATION)
+    clustered = labels >= 0
+    clusters = int(labels.max()) + 1 if clustered.any() else 0
+
+    cluster_labels = labels[clustered]
+    sizes = np.bincount(cluster_labels, minlength=clusters)
+    duration_sums = np.bincount(cluster_labels, weights=durations[clustered], minlength=clusters)
+    priority = np.full(clusters, PRIORITY_LEVELS['medium'], dtype=np.int64)
+    np.maximum.at(priority, cluster_labels, batch.priority_levels[clustered])
+
+    type_names, type_index = np.unique(np.array(batch.types, dtype=object), return_inverse=True)
+    type_counts = np.bincount(
+        cluster_labels * len(type_names) + type_index[clustered],
+        minlength=clusters * len(type_names)
+    ).reshape(clusters, len(type_names))
+    common_types = type_names[type_counts.argmax(axis=1)] if clusters else []
+
+    keywords = rank_keywords(batch.titles, labels, clusters)
+
+    # Member ids per cluster, in task order
+    order = np.argsort(cluster_labels, kind='stable')
+    members = np.split(ids[clustered][order], np.cumsum(sizes)[:-1]) if clusters else []
+    first_index = np.full(clusters, len(labels), dtype=np.int64)
+    np.minimum.at(first_index, cluster_labels, np.nonzero(clustered)[0])
+
+    positioned = []
+    for cluster in range(clusters):
+        if sizes[cluster] > 1:
+            name = f"{common_types[cluster].title()}: {' '.join(k.title() for k in keywords[cluster]) or FALLBACK_KEYWORDS}"
+        else:
+            name = f"Group {cluster}"
+        positioned.append((int(first_index[cluster]), {
+            'name': name,
+            'taskIds': members[cluster].tolist(),
+            'priority': PRIORITY_NAMES[int(priority[cluster])],
+            'estimatedDuration': int(duration_sums[cluster]),
+            'keywords': keywords[cluster]
+        }))
+
+    # Noise - individual groups for important tasks
+    important = np.nonzero(~clustered & (batch.priority_levels >= PRIORITY_LEVELS['high']))[0]
+    for i in important.tolist():
+        positioned.append((i, {
+            'name': f"Individual: {batch.titles[i][:30]}...",
+            'taskIds': [ids[i].item()],
+            'priority': PRIORITY_NAMES[int(batch.priority_levels[i])],
+            'estimatedDuration': int(durations[i]),
+            'keywords': []
+        }))
+
+    positioned.sort(key=lambda item: item[0])
+    return [group for _, group in positioned]
@@ -0,0 +1,140 @@
+"""
+Multi-resolution task grouping from one cached cluster tree.
+
+The tree is a scipy agglomerative linkage (built with the nearest-neighbour
+chain algorithm for ward/average/complete). Above `exact_limit` tasks it is
+built over a random sample and every other task hangs off its nearest
+sampled leaf, so the quadratic part stays bounded. Trees are cached per
+task-set content, and cutting one at any number of groups is O(n).
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy.cluster.hierarchy import fcluster, linkage
+
+from .batch import BLOCK_CELLS, TaskBatch
+from .clustering import _relabel
+from .features import task_text
+from .groups import summarize_groups
+
+
+def nearest_rows(points: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """Index of the nearest candidate (euclidean) for every point, computed in blocks"""
+    candidate_norms = np.einsum('ij,ij->i', candidates, candidates)
+    nearest = np.empty(len(points), dtype=np.int64)
+    step = max(1, BLOCK_CELLS // max(1, len(candidates)))
+    for start in range(0, len(points), step):
+        block = points[start:start + step]
+        # |a-b|^2 up to the per-row constant |a|^2
+        distances = candidate_norms[None, :] - 2 * (block @ candidates.T)
+        nearest[start:start + step] = distances.argmin(axis=1)
+    return nearest
+
+
+def default_levels(n: int) -> List[int]:
+    """A coarse and a fine granularity for n tasks"""
+    fine = max(1, int(round(np.sqrt(n))))
+    return sorted({max(1, fine // 2), fine})
+
+
+class ClusterTree:
+    """Agglomerative tree over (a sample of) a task set, cut at any granularity"""
+
+    def __init__(self, tree_id: str, batch: TaskBatch, merges: np.ndarray, leaf_of: np.ndarray):
+        self.tree_id = tree_id
+        self.batch = batch
+        self.merges = merges
+        # Tree leaf (sampled task) each task belongs to
+        self.leaf_of = leaf_of
+
+    @property
+    def leaves(self) -> int:
+        return len(self.merges) + 1
+
+    def cut(self, n_groups: int) -> np.ndarray:
+        """Labels for (at most) `n_groups` groups, numbered by first task"""
+        n_groups = max(1, min(n_groups, self.leaves))
+        if self.leaves == 1:
+            leaf_labels = np.zeros(1, dtype=np.int64)
+        else:
+            leaf_labels = fcluster(self.merges, n_groups, criterion='maxclust') - 1
+        return _relabel(leaf_labels[self.leaf_of])
+
+    def levels(self, n_groups: Sequence[int], batch: Optional[TaskBatch] = None) -> List[Dict]:
+        """Groups at each requested granularity, coarse to fine.
+
+        Cuts of one tree are nested, so every group after the first level
+        also gets `parent`: the index of the group containing it one level up.
+        `batch` supplies fresher priorities/durations for the same task set.
+        """
+        batch = batch if batch is not None else self.batch
+        levels = []
+        previous = None
+        for count in sorted(set(n_groups)):
+            labels = self.cut(count)
+            groups = summarize_groups(batch, labels)
+            if previous is not None:
+                first_member = np.full(labels.max() + 1, -1, dtype=np.int64)
+                first_member[labels[::-1]] = np.arange(len(labels))[::-1]
+                parents = previous[first_member]
+                for group, parent in zip(groups, parents.tolist()):
+                    group['parent'] = parent
+            levels.append({'nGroups': len(groups), 'requestedGroups': count, 'groups': groups})
+            previous = labels
+        return levels
+
+
+class HierarchicalGrouper:
+    """Builds and caches cluster trees keyed by task-set content"""
+
+    def __init__(self, method: str = 'ward', exact_limit: int = 4000, max_trees: int = 32, seed: int = 0):
+        self.method = method
+        self.exact_limit = exact_limit
+        self.max_trees = max_trees
+        self.seed = seed
+        self._trees: 'OrderedDict[str, ClusterTree]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def tree_id(self, batch: TaskBatch, space: str = '') -> str:
+        # `space` names the embedding space (e.g. a projection) the tree is built in
+        digest = hashlib.blake2b(f"{self.method}{space}".encode('utf-8'), digest_size=16)
+        for task_id, task in zip(batch.id_list(), batch):
+            digest.update(f"{task_id}\x1f{task_text(task)}\x1e".encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, tree_id: str) -> Optional[ClusterTree]:
+        with self._lock:
+            tree = self._trees.get(tree_id)
+            if tree is not None:
+                self._trees.move_to_end(tree_id)
+            return tree
+
+    def tree(self, batch: TaskBatch, embed: Callable[[TaskBatch], np.ndarray], space: str = '') -> ClusterTree:
+        """Cached tree for this task set; `embed` is only called on a miss"""
+        tree_id = self.tree_id(batch, space)
+        tree = self.get(tree_id)
+        if tree is None:
+            tree = self._build(tree_id, batch, np.asarray(embed(batch), dtype=np.float64))
+            with self._lock:
+                self._trees[tree_id] = tree
+                while len(self._trees) > self.max_trees:
+                    self._trees.popitem(last=False)
+        return tree
+
+    def _build(self, tree_id: str, batch: TaskBatch, embeddings: np.ndarray) -> ClusterTree:
+        n = len(embeddings)
+        if n <= self.exact_limit:
+            sample = np.arange(n)
+            leaf_of = np.arange(n)
+        else:
+            rng = np.random.default_rng(self.seed)
+            sample = np.sort(rng.choice(n, self.exact_limit, replace=False))
+            leaf_of = nearest_rows(embeddings, embeddings[sample])
+            # Sampled tasks are their own leaves even if a duplicate is nearer
+            leaf_of[sample] = np.arange(len(sample))
+        merges = linkage(embeddings[sample], method=self.method) if len(sample) > 1 else np.zeros((0, 4))
+        return ClusterTree(tree_id, batch, merges, leaf_of)
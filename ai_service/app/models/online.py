@@ -0,0 +1,258 @@
+import copy
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from sklearn.linear_model import SGDRegressor
+from sklearn.preprocessing import StandardScaler
+
+from .features import PRIORITY_LEVELS, TaskFeaturePipeline
+from ..metrics import ONLINE_MODEL_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+# Priority levels the reference predicts for outcomes' tasks (features, tasks) -> levels
+ReferencePredictor = Callable[[np.ndarray, List[Dict]], np.ndarray]
+
+
+class OnlineModelVersion:
+    """Immutable snapshot of the online models that serving reads from"""
+
+    def __init__(self, version: int, scaler: StandardScaler,
+                 priority_model: Optional[SGDRegressor], duration_model: Optional[SGDRegressor],
+                 samples_seen: int, priority_error: Optional[float] = None,
+                 reference_error: Optional[float] = None, priority_preferred: bool = False,
+                 learner_state: Optional[Dict] = None):
+        self.version = version
+        self.scaler = scaler
+        self.priority_model = priority_model
+        self.duration_model = duration_model
+        self.samples_seen = samples_seen
+        # Held-out mean absolute level error of the priority model and of the reference it replaces
+        self.priority_error = priority_error
+        self.reference_error = reference_error
+        self.priority_preferred = priority_preferred
+        # Sample counts and error windows the learner resumes from when rolled back to this version
+        self.learner_state = learner_state or {}
+        self.published_at = datetime.now()
+
+    @property
+    def serves_priority(self) -> bool:
+        """Whether priority scoring should use this version instead of the reference"""
+        return self.priority_model is not None and self.priority_preferred
+
+    def to_dict(self) -> Dict:
+        return {
+            'version': self.version,
+            'samplesSeen': self.samples_seen,
+            'priorityError': self.priority_error,
+            'referenceError': self.reference_error,
+            'servesPriority': self.serves_priority,
+            'servesDuration': self.duration_model is not None,
+            'publishedAt': self.published_at.isoformat()
+        }
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Priority level prediction (1-4), same scale as the offline priority model"""
+        if self.priority_model is None:
+            raise ValueError("No priority outcomes learned yet")
+        scores = self.priority_model.predict(self.scaler.transform(features))
+        return np.clip(scores, 1, 4)
+
+    def predict_duration(self, features: np.ndarray) -> np.ndarray:
+        """Actual duration prediction in minutes"""
+        if self.duration_model is None:
+            raise ValueError("No duration outcomes learned yet")
+        return np.maximum(self.duration_model.predict(self.scaler.transform(features)), 0)
+
+
+class OnlineTaskLearner:
+    """Incrementally updates priority and duration models from task outcomes.
+
+    Outcomes are buffered and learned in mini-batches with `partial_fit` on a
+    private working copy of the estimators, on a background thread. After
+    each batch a new `OnlineModelVersion` is published by swapping a single
+    reference, so predictions never wait on training and never see a
+    half-updated model.
+
+    Every batch is first scored by the priority model as it was before
+    learning from it, which gives a held-out error. The same outcomes are
+    scored by `reference`, the priority source serving would use otherwise.
+    A version only serves priorities once at least `min_samples` outcomes
+    have been evaluated this way, and only if its error over the most recent
+    `error_window` of them is lower than the reference's.
+    """
+
+    def __init__(self, feature_pipeline: TaskFeaturePipeline, batch_size: int = 32,
+                 min_samples: int = 64, history: int = 5,
+                 reference: Optional[ReferencePredictor] = None, error_window: int = 512):
+        self.feature_pipeline = feature_pipeline
+        self.batch_size = batch_size
+        self.min_samples = min_samples
+        self.history = history
+        self.reference = reference
+        self._priority_errors = deque(maxlen=error_window)
+        self._reference_errors = deque(maxlen=error_window)
+
+        self._scaler = StandardScaler()
+        self._priority_model = self._new_regressor()
+        self._duration_model = self._new_regressor()
+        self._priority_samples = 0
+        self._duration_samples = 0
+        self._outcomes_seen = 0
+
+        self._buffer: List[Dict] = []
+        self._buffer_lock = threading.Lock()
+        self._train_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='online-learner')
+
+        self._version = 0
+        self.published: Optional[OnlineModelVersion] = None
+        self.versions: List[OnlineModelVersion] = []
+
+    def record(self, outcomes: List[Dict]) -> int:
+        """Queue completed-task outcomes; returns the number accepted.
+
+        Each outcome is a dict with a `task` plus `actualDuration` and/or
+        `finalPriority`.
+        """
+        accepted = [o for o in outcomes if o.get('actualDuration') is not None or o.get('finalPriority')]
+        with self._buffer_lock:
+            self._buffer.extend(accepted)
+            ready = len(self._buffer) >= self.batch_size
+        if ready:
+            self._executor.submit(self._drain)
+        return len(accepted)
+
+    def flush(self) -> Optional[OnlineModelVersion]:
+        """Learn everything buffered so far and wait for the new version"""
+        self._executor.submit(self._drain, True).result()
+        return self.published
+
+    def rollback(self) -> Optional[OnlineModelVersion]:
+        """Go back to the previously published version.
+
+        Training resumes from that version's models, so later outcomes do not
+        bring the rejected weights back.
+        """
+        with self._train_lock:
+            if len(self.versions) > 1:
+                self.versions.pop()
+                self.published = self.versions[-1]
+                self._restore(self.published)
+                ONLINE_MODEL_VERSION.set(self.published.version)
+                logger.info(f"Rolled back to online model version {self.published.version}")
+            return self.published
+
+    @staticmethod
+    def _new_regressor() -> SGDRegressor:
+        return SGDRegressor(learning_rate='invscaling', eta0=0.01, random_state=42)
+
+    def _restore(self, snapshot: OnlineModelVersion):
+        """Reset the working models and their bookkeeping to a published snapshot"""
+        state = snapshot.learner_state
+        self._scaler = copy.deepcopy(snapshot.scaler)
+        # A model that was not ready yet at that version restarts from scratch
+        if snapshot.priority_model is not None:
+            self._priority_model = copy.deepcopy(snapshot.priority_model)
+            self._priority_samples = state.get('priority_samples', 0)
+        else:
+            self._priority_model, self._priority_samples = self._new_regressor(), 0
+        if snapshot.duration_model is not None:
+            self._duration_model = copy.deepcopy(snapshot.duration_model)
+            self._duration_samples = state.get('duration_samples', 0)
+        else:
+            self._duration_model, self._duration_samples = self._new_regressor(), 0
+        self._priority_errors = deque(state.get('priority_errors', ()), maxlen=self._priority_errors.maxlen)
+        self._reference_errors = deque(state.get('reference_errors', ()), maxlen=self._reference_errors.maxlen)
+
+    def _drain(self, force: bool = False):
+        while True:
+            with self._buffer_lock:
+                if not self._buffer or (len(self._buffer) < self.batch_size and not force):
+                    return
+                batch, self._buffer = self._buffer[:self.batch_size], self._buffer[self.batch_size:]
+            try:
+                self._learn(batch)
+            except Exception as e:
+                logger.error(f"Online learning batch failed: {str(e)}")
+
+    def _learn(self, outcomes: List[Dict]):
+        with self._train_lock:
+            tasks = [o['task'] for o in outcomes]
+            features = self.feature_pipeline.transform(tasks)
+            self._outcomes_seen += len(outcomes)
+
+            priorities = np.array([
+                PRIORITY_LEVELS.get(getattr(o.get('finalPriority'), 'value', o.get('finalPriority')), 0)
+                for o in outcomes
+            ], dtype=np.float64)
+            has_priority = priorities > 0
+            if has_priority.any() and self._priority_samples:
+                self._evaluate(features[has_priority], [t for t, keep in zip(tasks, has_priority) if keep],
+                               priorities[has_priority])
+
+            self._scaler.partial_fit(features)
+            scaled = self._scaler.transform(features)
+            if has_priority.any():
+                self._priority_model.partial_fit(scaled[has_priority], priorities[has_priority])
+                self._priority_samples += int(has_priority.sum())
+
+            durations = np.array([
+                np.nan if o.get('actualDuration') is None else o['actualDuration'] for o in outcomes
+            ], dtype=np.float64)
+            has_duration = ~np.isnan(durations)
+            if has_duration.any():
+                self._duration_model.partial_fit(scaled[has_duration], durations[has_duration])
+                self._duration_samples += int(has_duration.sum())
+
+            self._publish()
+
+    def _evaluate(self, features: np.ndarray, tasks: List[Dict], priorities: np.ndarray):
+        """Record held-out errors of the current priority model and the reference on unseen outcomes"""
+        predicted = np.clip(self._priority_model.predict(self._scaler.transform(features)), 1, 4)
+        if self.reference is not None:
+            reference = np.asarray(self.reference(features, tasks), dtype=np.float64)
+        else:
+            reference = np.array([
+                PRIORITY_LEVELS.get(getattr(t.get('priority'), 'value', t.get('priority')), 2) for t in tasks
+            ], dtype=np.float64)
+        self._priority_errors.extend(np.abs(predicted - priorities).tolist())
+        self._reference_errors.extend(np.abs(reference - priorities).tolist())
+
+    def _publish(self):
+        priority_ready = self._priority_samples >= self.min_samples
+        duration_ready = self._duration_samples >= self.min_samples
+        if not (priority_ready or duration_ready):
+            return
+
+        evaluated = len(self._priority_errors)
+        priority_error = float(np.mean(self._priority_errors)) if evaluated else None
+        reference_error = float(np.mean(self._reference_errors)) if evaluated else None
+        self._version += 1
+        snapshot = OnlineModelVersion(
+            self._version,
+            copy.deepcopy(self._scaler),
+            copy.deepcopy(self._priority_model) if priority_ready else None,
+            copy.deepcopy(self._duration_model) if duration_ready else None,
+            self._outcomes_seen,
+            priority_error,
+            reference_error,
+            priority_ready and evaluated >= self.min_samples and priority_error < reference_error,
+            {
+                'priority_samples': self._priority_samples,
+                'duration_samples': self._duration_samples,
+                'priority_errors': tuple(self._priority_errors),
+                'reference_errors': tuple(self._reference_errors)
+            }
+        )
+        self.versions = (self.versions + [snapshot])[-self.history:]
+        self.published = snapshot
+        ONLINE_MODEL_VERSION.set(snapshot.version)
+        errors = f", held-out priority error {priority_error:.3f} vs {reference_error:.3f}" if evaluated else ''
+        logger.info(f"Published online model version {snapshot.version} ({snapshot.samples_seen} outcomes{errors})")
@@ -0,0 +1,85 @@
+"""
+Optional low-dimensional projection of task embeddings.
+
+Clustering and similarity costs grow with the embedding width. An
+`EmbeddingProjection` maps the 384-d MiniLM vectors to k dimensions (64 by
+default) with one of:
+
+- PCA fitted on training embeddings (train_model.py). This keeps the
+  directions with the most variance.
+- A seeded random orthonormal projection, which needs no data and
+  approximately preserves distances and angles (Johnson-Lindenstrauss).
+
+Vectors are multiplied by the components without centering. Differences
+between tasks are the same as with centered PCA, so euclidean clustering is
+unaffected, and cosine similarity still compares directions. The embedder
+projects each embedding once when it is stored. TaskModel uses the reduced
+vectors only for the operations listed in its `projection_operations`. The
+service leaves that list empty unless PROJECTION_OPERATIONS is set, so a
+trained projection changes no results until it is enabled.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+PROJECTION_KINDS = ('pca', 'random')
+# Operations that can run on projected embeddings
+PROJECTION_OPERATIONS = ('grouping', 'hierarchy', 'similarity', 'batching')
+DEFAULT_COMPONENTS = 64
+# PCA is fitted on at most this many embeddings
+PCA_SAMPLE_SIZE = 20000
+
+
+class EmbeddingProjection:
+    """Linear map from embedding space to `dim` dimensions"""
+
+    def __init__(self, components: np.ndarray, kind: str, explained_variance: Optional[float] = None):
+        if kind not in PROJECTION_KINDS:
+            raise ValueError(f"Unknown projection kind: {kind} (expected one of {', '.join(PROJECTION_KINDS)})")
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+        self.kind = kind
+        self.explained_variance = explained_variance
+
+    @property
+    def input_dim(self) -> int:
+        return self.components.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[1]
+
+    @classmethod
+    def fit_pca(cls, embeddings: np.ndarray, n_components: int = DEFAULT_COMPONENTS,
+                sample_size: int = PCA_SAMPLE_SIZE, seed: int = 0) -> 'EmbeddingProjection':
+        X = np.asarray(embeddings, dtype=np.float64)
+        if len(X) > sample_size:
+            X = X[np.random.default_rng(seed).choice(len(X), sample_size, replace=False)]
+        n_components = min(n_components, *X.shape)
+        _, singular, rows = np.linalg.svd(X - X.mean(axis=0), full_matrices=False)
+        variance = singular ** 2
+        explained = float(variance[:n_components].sum() / variance.sum()) if variance.sum() else 1.0
+        return cls(rows[:n_components].T, 'pca', explained)
+
+    @classmethod
+    def random(cls, input_dim: int, n_components: int = DEFAULT_COMPONENTS, seed: int = 0) -> 'EmbeddingProjection':
+        gaussian = np.random.default_rng(seed).standard_normal((input_dim, min(n_components, input_dim)))
+        orthonormal, _ = np.linalg.qr(gaussian)
+        return cls(orthonormal, 'random')
+
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        """Project one embedding or a matrix of them"""
+        return np.asarray(embeddings, dtype=np.float32) @ self.components
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            np.savez(
+                f, components=self.components, kind=np.array(self.kind),
+                explained_variance=np.array(np.nan if self.explained_variance is None else self.explained_variance)
+            )
+
+    @classmethod
+    def load(cls, path: str) -> 'EmbeddingProjection':
+        with np.load(path, allow_pickle=False) as data:
+            explained = float(data['explained_variance'])
+            return cls(data['components'], str(data['kind']), None if np.isnan(explained) else explained)
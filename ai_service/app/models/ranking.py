@@ -0,0 +1,449 @@
+"""
+Incrementally maintained per-user priority ranking.
+
+`prioritize_tasks` scores a user's whole task list on every call. A
+`TaskRanking` instead keeps each task's score materialized and updates it
+from task create/update/delete events, producing the same scores and order
+as `prioritize_tasks` over the same tasks (ties go to the task seen first).
+
+A score splits into parts that change for different reasons:
+
+- base: priority, status, duration and due-date urgency, blended with the
+  ML model. This part is recomputed only for changed tasks, or lazily when
+  a task's due date crosses a bucket boundary. The boundaries are 30/7/1
+  days out, or every day while an ML model is active, since the model sees
+  days-until-due. Boundaries live in a min-heap keyed by crossing time.
+- context: +5 per task sharing two title words, and +10 when more than two
+  same-type tasks have similar embeddings. This part is kept with an
+  inverted word index and per-type embedding matrices. Only the changed
+  task and the neighbours it gains or loses are touched.
+- time of day: +10 for a type during its optimal hours. It is the same for
+  every task of a type, so tasks sit in one max-heap per type and the
+  bonus is applied when the heads are merged.
+
+A change costs O(log n) heap work, plus the scan of the changed task's
+word postings and same-type embeddings. Listing the top N costs
+O(N log n). Stale heap entries are skipped and compacted away.
+"""
+
+import heapq
+import itertools
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .batch import TaskBatch, shared_word_counts, similar_counts
+from .task_model import OPTIMAL_HOURS, SIMILARITY_THRESHOLD, TaskModel
+from ..metrics import timed
+
+_SECONDS_PER_DAY = 86400
+# Due-date urgency changes when days-until-due drops to these values
+URGENCY_DAYS = (30, 7, 1)
+
+
+def next_refresh(due: np.datetime64, now: int, daily: bool) -> Optional[int]:
+    """Epoch second after which the task's time-dependent score terms change (None: never)"""
+    if np.isnat(due):
+        return None
+    due_seconds = int(due.astype(np.int64))
+    days = (due_seconds - now) // _SECONDS_PER_DAY
+    if daily:
+        # The model's days-until-due feature is clamped at 0
+        return due_seconds - days * _SECONDS_PER_DAY if days > 0 else None
+    upcoming = [limit for limit in URGENCY_DAYS if limit < days]
+    return due_seconds - (upcoming[0] + 1) * _SECONDS_PER_DAY if upcoming else None
+
+
+def time_of_day_bonus(hour: int) -> Dict[str, float]:
+    bonus: Dict[str, float] = {}
+    for task_type, (first_hour, last_hour) in OPTIMAL_HOURS.items():
+        if first_hour <= hour <= last_hour:
+            bonus[task_type] = bonus.get(task_type, 0) + 10
+    return bonus
+
+
+def _epoch(now: datetime) -> int:
+    return int(np.datetime64(now, 's').astype(np.int64))
+
+
+class _TypeVectors:
+    """Unit embeddings of one type's tasks, in a compact growable matrix"""
+
+    def __init__(self):
+        self.rows: Optional[np.ndarray] = None
+        self.ids: List[int] = []
+        self.index: Dict[int, int] = {}
+
+    def similar(self, vector: np.ndarray, threshold: float) -> List[int]:
+        if not self.ids:
+            return []
+        hits = np.nonzero(self.rows[:len(self.ids)] @ vector > threshold)[0]
+        return [self.ids[i] for i in hits.tolist()]
+
+    def add(self, task_id: int, vector: np.ndarray):
+        if self.rows is None:
+            self.rows = np.empty((16, len(vector)), dtype=np.float32)
+        elif len(self.ids) == len(self.rows):
+            self.rows = np.vstack([self.rows, np.empty_like(self.rows)])
+        self.index[task_id] = len(self.ids)
+        self.rows[len(self.ids)] = vector
+        self.ids.append(task_id)
+
+    def remove(self, task_id: int):
+        row = self.index.pop(task_id)
+        last = len(self.ids) - 1
+        if row != last:
+            self.rows[row] = self.rows[last]
+            self.ids[row] = self.ids[last]
+            self.index[self.ids[row]] = row
+        self.ids.pop()
+
+
+class _Entry:
+    __slots__ = ('task', 'order', 'type', 'words', 'base', 'shared', 'similar', 'version', 'refresh_version')
+
+    def __init__(self, task: Dict, order: int, task_type: str):
+        self.task = task
+        self.order = order
+        self.type = task_type
+        self.words: frozenset = frozenset()
+        self.base = 0.0
+        self.shared = 0
+        self.similar = 0
+        self.version = 0
+        self.refresh_version = 0
+
+    @property
+    def score(self) -> float:
+        """Score without the time-of-day bonus, summed as `_apply_context_adjustments` does"""
+        return self.base + self.shared * 5 + (10 if self.similar > 2 else 0)
+
+
+class TaskRanking:
+    """One user's tasks with materialized priority scores"""
+
+    def __init__(self, model: TaskModel):
+        self.model = model
+        self.entries: Dict[int, _Entry] = {}
+        self._next_order = 0
+        self._heaps: Dict[str, List[Tuple[float, int, int, int]]] = {}
+        self._refresh: List[Tuple[int, int, int]] = []
+        self._word_index: Dict[str, Set[int]] = {}
+        self._vectors: Dict[str, _TypeVectors] = {}
+        self._scored_with = self._model_key()
+        # Versions come from one counter so heap items of a replaced or deleted entry stay stale
+        self._stamps = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def upsert(self, tasks: List[Dict], now: Optional[datetime] = None):
+        """Add or replace tasks"""
+        if not tasks:
+            return
+        now = now or datetime.now()
+        batch = TaskBatch(tasks)
+        vectors = self.model.embedder.embed_tasks(batch, self.model.uses_projection('batching'))
+        embeddings = dict(zip(batch.id_list(), vectors))
+
+        if not self.entries and len(set(batch.id_list())) == len(batch):
+            self._load(batch, embeddings, now)
+            return
+
+        touched: Set[int] = set()
+        for task_id, task, task_type in zip(batch.id_list(), batch.tasks, batch.types):
+            previous = self.entries.get(task_id)
+            if previous is not None:
+                touched |= self._detach(task_id, previous)
+                entry = _Entry(task, previous.order, task_type)
+            else:
+                entry = _Entry(task, self._next_order, task_type)
+                self._next_order += 1
+            self.entries[task_id] = entry
+            touched |= self._attach(task_id, entry, embeddings.get(task_id))
+        changed = batch.id_list()
+        self._rescore_base(changed, now)
+        for task_id in touched.difference(changed):
+            if task_id in self.entries:
+                self._push(task_id)
+
+    def _load(self, batch: TaskBatch, embeddings: Dict, now: datetime):
+        """Fill an empty ranking, counting context for the whole batch at once"""
+        ids = batch.id_list()
+        shared = shared_word_counts(batch.title_word_matrix())
+        similar = np.zeros(len(batch), dtype=np.int64)
+        present = [i for i, task_id in enumerate(ids) if task_id in embeddings]
+        if present:
+            vectors = np.array([embeddings[ids[i]] for i in present], dtype=np.float32)
+            types = np.array([batch.types[i] for i in present])
+            similar[present] = similar_counts(vectors, types, batch.ids[present], SIMILARITY_THRESHOLD)
+
+        for i, (task_id, task, task_type) in enumerate(zip(ids, batch.tasks, batch.types)):
+            entry = self.entries[task_id] = _Entry(task, self._next_order, task_type)
+            self._next_order += 1
+            entry.words = frozenset(batch.titles[i].lower().split())
+            entry.shared = int(shared[i])
+            entry.similar = int(similar[i])
+            for word in entry.words:
+                self._word_index.setdefault(word, set()).add(task_id)
+            if task_id in embeddings:
+                vector = np.asarray(embeddings[task_id], dtype=np.float32)
+                self._vectors.setdefault(task_type, _TypeVectors()).add(task_id, vector / np.linalg.norm(vector))
+        self._rescore_base(ids, now)
+
+    def delete(self, task_ids: Iterable[int]):
+        touched: Set[int] = set()
+        for task_id in task_ids:
+            entry = self.entries.pop(task_id, None)
+            if entry is not None:
+                touched |= self._detach(task_id, entry)
+        for task_id in touched:
+            if task_id in self.entries:
+                self._push(task_id)
+
+    def top(self, limit: Optional[int] = None, now: Optional[datetime] = None) -> List[Dict]:
+        """Highest-priority tasks now, in the `prioritize_tasks` response format"""
+        now = now or datetime.now()
+        self.refresh(now)
+        limit = len(self.entries) if limit is None else min(limit, len(self.entries))
+        bonus = time_of_day_bonus(now.hour)
+
+        heads = []
+        for task_type, heap in self._heaps.items():
+            self._clean(heap)
+            if heap:
+                heads.append((heap[0][0] - bonus.get(task_type, 0), heap[0][1], task_type))
+        heapq.heapify(heads)
+
+        popped: List[Tuple[str, Tuple]] = []
+        ids, scores = [], []
+        while heads and len(ids) < limit:
+            negative_score, _, task_type = heapq.heappop(heads)
+            heap = self._heaps[task_type]
+            item = heapq.heappop(heap)
+            popped.append((task_type, item))
+            ids.append(item[2])
+            scores.append(-negative_score)
+            self._clean(heap)
+            if heap:
+                heapq.heappush(heads, (heap[0][0] - bonus.get(task_type, 0), heap[0][1], task_type))
+        for task_type, item in popped:
+            heapq.heappush(self._heaps[task_type], item)
+
+        if not ids:
+            return []
+        batch = TaskBatch([self.entries[task_id].task for task_id in ids])
+        return self.model.format_ranking(
+            batch, np.array(scores), batch.days_until_due(now), np.arange(len(ids))
+        )
+
+    def refresh(self, now: datetime):
+        """Rescore tasks whose due-date bucket changed, or all of them after a model change"""
+        model_key = self._model_key()
+        if model_key != self._scored_with:
+            self._scored_with = model_key
+            self._refresh = []
+            self._rescore_base(list(self.entries), now)
+            return
+        current = _epoch(now)
+        due = []
+        while self._refresh and self._refresh[0][0] < current:
+            _, task_id, version = heapq.heappop(self._refresh)
+            entry = self.entries.get(task_id)
+            if entry is not None and entry.refresh_version == version:
+                due.append(task_id)
+        if due:
+            self._rescore_base(due, now)
+
+    def _model_key(self) -> Tuple[int, bool]:
+        return self.model.model_version, self.model.uses_priority_model
+
+    def _rescore_base(self, task_ids: List[int], now: datetime):
+        if not task_ids:
+            return
+        batch = TaskBatch([self.entries[task_id].task for task_id in task_ids])
+        base = self.model.base_priority_scores(batch, batch.days_until_due(now), now)
+        current = _epoch(now)
+        daily = self.model.uses_priority_model
+        for task_id, score, due in zip(task_ids, base.tolist(), batch.due_dates):
+            entry = self.entries[task_id]
+            entry.base = score
+            entry.refresh_version = next(self._stamps)
+            refresh_at = next_refresh(due, current, daily)
+            if refresh_at is not None:
+                heapq.heappush(self._refresh, (refresh_at, task_id, entry.refresh_version))
+            self._push(task_id)
+
+    def _push(self, task_id: int):
+        entry = self.entries[task_id]
+        entry.version = next(self._stamps)
+        heap = self._heaps.setdefault(entry.type, [])
+        heapq.heappush(heap, (-entry.score, entry.order, task_id, entry.version))
+        # Drop superseded entries once they outnumber the live ones
+        if len(heap) > 2 * len(self.entries) + 64:
+            self._compact()
+
+    def _compact(self):
+        for task_type, heap in self._heaps.items():
+            live = [item for item in heap if self._is_live(item)]
+            heapq.heapify(live)
+            self._heaps[task_type] = live
+        self._refresh = [
+            item for item in self._refresh
+            if item[1] in self.entries and self.entries[item[1]].refresh_version == item[2]
+        ]
+        heapq.heapify(self._refresh)
+
+    def _is_live(self, item: Tuple[float, int, int, int]) -> bool:
+        entry = self.entries.get(item[2])
+        return entry is not None and entry.version == item[3]
+
+    def _clean(self, heap: List):
+        while heap and not self._is_live(heap[0]):
+            heapq.heappop(heap)
+
+    def _attach(self, task_id: int, entry: _Entry, embedding: Optional[np.ndarray]) -> Set[int]:
+        """Index a task's title words and embedding; returns the tasks whose context changed"""
+        touched = {task_id}
+        entry.words = frozenset((entry.task.get('title') or '').lower().split())
+        overlap = Counter(other for word in entry.words for other in self._word_index.get(word, ()))
+        related = [other for other, shared in overlap.items() if shared >= 2]
+        # A task shares its own words with itself when it has two or more
+        entry.shared = len(related) + (len(entry.words) >= 2)
+        for other in related:
+            self.entries[other].shared += 1
+        touched.update(related)
+        for word in entry.words:
+            self._word_index.setdefault(word, set()).add(task_id)
+
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            vector = vector / np.linalg.norm(vector)
+            vectors = self._vectors.setdefault(entry.type, _TypeVectors())
+            similar = vectors.similar(vector, SIMILARITY_THRESHOLD)
+            entry.similar = len(similar)
+            for other in similar:
+                self.entries[other].similar += 1
+            touched.update(similar)
+            vectors.add(task_id, vector)
+        return touched
+
+    def _detach(self, task_id: int, entry: _Entry) -> Set[int]:
+        """Undo `_attach`; returns the other tasks whose context changed"""
+        touched: Set[int] = set()
+        for word in entry.words:
+            postings = self._word_index[word]
+            postings.discard(task_id)
+            if not postings:
+                del self._word_index[word]
+        overlap = Counter(other for word in entry.words for other in self._word_index.get(word, ()))
+        for other, shared in overlap.items():
+            if shared >= 2:
+                self.entries[other].shared -= 1
+                touched.add(other)
+
+        vectors = self._vectors.get(entry.type)
+        if vectors is not None and task_id in vectors.index:
+            row = vectors.rows[vectors.index[task_id]].copy()
+            vectors.remove(task_id)
+            for other in vectors.similar(row, SIMILARITY_THRESHOLD):
+                self.entries[other].similar -= 1
+                touched.add(other)
+        return touched
+
+
+class RankingStore:
+    """Per-user rankings, least recently used users evicted beyond `max_users`"""
+
+    def __init__(self, model: TaskModel, max_users: int = 10000):
+        self.model = model
+        self.max_users = max_users
+        self._rankings: 'OrderedDict[str, TaskRanking]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _ranking(self, user_id: str, create: bool) -> Optional[TaskRanking]:
+        with self._lock:
+            ranking = self._rankings.get(user_id)
+            if ranking is None and create:
+                ranking = self._rankings[user_id] = TaskRanking(self.model)
+                while len(self._rankings) > self.max_users:
+                    self._rankings.popitem(last=False)
+            if ranking is not None:
+                self._rankings.move_to_end(user_id)
+            return ranking
+
+    @timed('ranking.apply_events')
+    def apply_events(self, user_id: str, events: List[Dict], now: Optional[datetime] = None) -> int:
+        """Apply create/update/delete events in order; the last event per task wins"""
+        latest: Dict[int, Optional[Dict]] = {}
+        for event in events:
+            if event['type'] == 'deleted':
+                latest[event['taskId']] = None
+            else:
+                latest[event['task']['id']] = event['task']
+        ranking = self._ranking(user_id, create=True)
+        with ranking.lock:
+            ranking.delete([task_id for task_id, task in latest.items() if task is None])
+            ranking.upsert([task for task in latest.values() if task is not None], now)
+            return len(ranking)
+
+    @timed('ranking.replace')
+    def replace(self, user_id: str, tasks: List[Dict], now: Optional[datetime] = None) -> int:
+        """Rebuild a user's ranking from their full task list"""
+        ranking = TaskRanking(self.model)
+        ranking.upsert(tasks, now)
+        with self._lock:
+            self._rankings[user_id] = ranking
+            self._rankings.move_to_end(user_id)
+            while len(self._rankings) > self.max_users:
+                self._rankings.popitem(last=False)
+        return len(ranking)
+
+    @timed('ranking.top')
+    def top(self, user_id: str, limit: Optional[int] = None,
+            now: Optional[datetime] = None) -> Optional[List[Dict]]:
+        """Top tasks for a user, or None if nothing is materialized for them"""
+        ranking = self._ranking(user_id, create=False)
+        if ranking is None:
+            return None
+        with ranking.lock:
+            return ranking.top(limit, now)
+
+    def drop(self, user_id: str) -> bool:
+        with self._lock:
+            return self._rankings.pop(user_id, None) is not None
+
+    def users(self) -> List[str]:
+        with self._lock:
+            return list(self._rankings)
+
+    def export(self, user_id: str) -> Optional[List[Dict]]:
+        """A user's ranked tasks in the order they were first seen, for moving the ranking to another node"""
+        ranking = self._ranking(user_id, create=False)
+        if ranking is None:
+            return None
+        with ranking.lock:
+            return [entry.task for entry in sorted(ranking.entries.values(), key=lambda entry: entry.order)]
+
+    @timed('ranking.merge')
+    def merge(self, user_id: str, tasks: List[Dict], now: Optional[datetime] = None) -> int:
+        """Add exported tasks to a user's ranking, keeping tasks it already has.
+
+        Events applied on this node while the ranking was being copied are
+        newer than the export, so they win. A task deleted here during the
+        copy comes back; PUT the user's tasks to rebuild in that case.
+        """
+        ranking = self._ranking(user_id, create=True)
+        with ranking.lock:
+            ranking.upsert([task for task in tasks if task['id'] not in ranking.entries], now)
+            return len(ranking)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            rankings = list(self._rankings.values())
+        return {'users': len(rankings), 'tasks': sum(len(ranking) for ranking in rankings),
+                'maxUsers': self.max_users}
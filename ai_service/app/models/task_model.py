@@ -1,8 +1,17 @@
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterable, Optional, Tuple, Union
 import numpy as np
-from sklearn.cluster import DBSCAN
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
 from .embeddings import TaskEmbedder
+from .features import TaskFeaturePipeline, PRIORITY_LEVELS, DEFAULT_DURATION, task_duration
+from .batch import TaskBatch, shared_word_counts, similar_counts
+from .groups import summarize_groups
+from .hierarchy import HierarchicalGrouper, default_levels
+from .clustering import make_engine, estimate_eps, default_min_samples, DEFAULT_EPS
+from .online import OnlineTaskLearner
+from .trees import compile_ensemble, load_ensembles
+from .projection import PROJECTION_OPERATIONS
+from ..metrics import stage, timed
+import pickle
 import random
 from enum import Enum
 from datetime import datetime, timedelta
@@ -10,20 +19,54 @@ import networkx as nx
 from transformers import pipeline
 import torch
 
+# Requests hand TaskModel either task dicts or an already built TaskBatch
+Tasks = Union[List[Dict], TaskBatch]
+
+# Cosine similarity above which two tasks of the same type can be batched
+SIMILARITY_THRESHOLD = 0.7
+
+# Hours (inclusive) in which each task type gets a time-of-day bonus
+OPTIMAL_HOURS = {'creative': (9, 11), 'admin': (13, 15), 'communication': (10, 12)}
+
+# Score points per priority level; ML level predictions are blended into this term
+PRIORITY_WEIGHT = 25.0
+
+# Training rows re-predicted to check compiled tree models against sklearn
+PARITY_CHECK_ROWS = 512
+# Above this many rows sklearn's boosting loops beat the compiled numpy walk
+BOOSTING_COMPILED_ROWS = 64
+# Forests catch up later: sklearn spreads their trees over threads
+FOREST_COMPILED_ROWS = 256
+
+# Task types that get an extra pomodoro and count as difficult
+COMPLEX_TYPES = ('creative', 'learning', 'development', 'analysis')
+
 class TaskModel:
-    def __init__(self, embedder: TaskEmbedder):
+    def __init__(self, embedder: TaskEmbedder, load_nlp_pipeline: bool = True,
+                 clustering_engine: str = 'auto', clustering_n_jobs: Optional[int] = None,
+                 projection_operations: Iterable[str] = ()):
         self.embedder = embedder
+        unknown = set(projection_operations) - set(PROJECTION_OPERATIONS)
+        if unknown:
+            raise ValueError(f"Unknown projection operations: {', '.join(sorted(unknown))}")
+        # Operations that run on the embedder's projected vectors when it has a projection
+        self.projection_operations = frozenset(projection_operations)
+        self.clustering_n_jobs = clustering_n_jobs
+        self.clustering = make_engine(clustering_engine, clustering_n_jobs)
+        self.hierarchy = HierarchicalGrouper()
         self.dependency_classifier = None
         self.priority_predictor = None
         self.duration_predictor = None
         self.task_graph = nx.DiGraph()
+        self.feature_pipeline = TaskFeaturePipeline(embedder.model)
+        self.online_learner = OnlineTaskLearner(self.feature_pipeline, reference=self._reference_priority_levels)
         
         # Initialize NLP pipeline for advanced understanding
         self.nlp_pipeline = pipeline(
             "text-classification",
             model="microsoft/DialoGPT-medium",
             return_all_scores=True
-        )
+        ) if load_nlp_pipeline else None
         
         # Task patterns for dependency inference
         self.dependency_patterns = {
@@ -37,160 +80,174 @@ class TaskModel:
         
     def train_dependency_model(self, training_data: List[Dict]):
         """Train ML model for dependency prediction"""
-        features = []
-        labels = []
+        labelled = [item for item in training_data if 'dependencies' in item]
         
-        for item in training_data:
-            if 'dependencies' in item:
-                task_features = self._extract_task_features(item)
-                features.append(task_features)
-                labels.append(len(item['dependencies']))
-        
-        if features:
-            self.dependency_classifier = RandomForestClassifier(n_estimators=100)
-            self.dependency_classifier.fit(features, labels)
+        if labelled:
+            features = self._extract_features(labelled)
+            labels = [len(item['dependencies']) for item in labelled]
+            classifier = RandomForestClassifier(n_estimators=100).fit(features, labels)
+            self.dependency_classifier = compile_ensemble(classifier, check=features[:PARITY_CHECK_ROWS])
     
     def train_priority_model(self, training_data: List[Dict]):
         """Train ML model for priority prediction"""
-        features = []
-        priorities = []
-        
-        priority_mapping = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
-        
-        for item in training_data:
-            task_features = self._extract_task_features(item)
-            features.append(task_features)
-            priorities.append(priority_mapping.get(item.get('priority', 'medium'), 2))
-        
-        if features:
-            self.priority_predictor = GradientBoostingRegressor(n_estimators=100)
-            self.priority_predictor.fit(features, priorities)
+        if training_data:
+            features = self._extract_features(training_data)
+            priorities = [PRIORITY_LEVELS.get(item.get('priority', 'medium'), 2) for item in training_data]
+            regressor = GradientBoostingRegressor(n_estimators=100).fit(features, priorities)
+            self.priority_predictor = compile_ensemble(
+                regressor, check=features[:PARITY_CHECK_ROWS], fallback_rows=BOOSTING_COMPILED_ROWS
+            )
+    
+    def load_ml_models(self, path: str, fallback_path: Optional[str] = None):
+        """Load compiled priority/duration/dependency models written by train_model.py
+        
+        The duration model takes `TaskFeaturePipeline.without_duration` features.
+        The .npz only holds node arrays, so the compiled models are only faster
+        for small batches; with `fallback_path` (the pickled sklearn models of
+        the same training run) larger batches are handed to sklearn, as in
+        `train_priority_model`. Without it every batch runs compiled.
+        """
+        models = load_ensembles(path)
+        if fallback_path:
+            with open(fallback_path, 'rb') as f:
+                fallbacks = pickle.load(f)
+            for name, compiled in models.items():
+                if name not in fallbacks:
+                    continue
+                # No training rows at serving time; random rows still catch a pickle from another run
+                check = np.random.default_rng(0).normal(size=(PARITY_CHECK_ROWS, compiled.n_features))
+                boosting = isinstance(fallbacks[name], GradientBoostingRegressor)
+                rows = BOOSTING_COMPILED_ROWS if boosting else FOREST_COMPILED_ROWS
+                compiled.attach_fallback(fallbacks[name], rows, check=check.astype(np.float32))
+        self.priority_predictor = models.get('priority', self.priority_predictor)
+        self.duration_predictor = models.get('duration', self.duration_predictor)
+        self.dependency_classifier = models.get('dependency', self.dependency_classifier)
     
-    def _extract_task_features(self, task: Dict) -> List[float]:
+    @property
+    def model_version(self) -> int:
+        """Published online model version (0 before the first publish)"""
+        published = self.online_learner.published
+        return published.version if published else 0
+
+    def record_task_outcomes(self, outcomes: List[Dict]) -> Dict:
+        """Feed completed-task outcomes to the online priority/duration models"""
+        accepted = self.online_learner.record(outcomes)
+        published = self.online_learner.published
+        return {
+            'accepted': accepted,
+            'modelVersion': published.version if published else None
+        }
+    
+    def online_model_status(self) -> Dict:
+        """Published online model and the versions it can roll back to"""
+        published = self.online_learner.published
+        return {
+            'published': published.to_dict() if published else None,
+            'versions': [version.to_dict() for version in self.online_learner.versions]
+        }
+    
+    def rollback_online_model(self) -> Dict:
+        """Serve the previously published online model version again"""
+        self.online_learner.rollback()
+        return self.online_model_status()
+    
+    @property
+    def uses_priority_model(self) -> bool:
+        """Whether priority scores blend in an ML prediction"""
+        return bool(self._active_priority_predictor())
+    
+    def _active_priority_predictor(self):
+        """Priority model in use: the online one once it beats the offline model on held-out outcomes"""
+        online = self.online_learner.published
+        if online is not None and online.serves_priority:
+            return online
+        return self.priority_predictor
+    
+    def _reference_priority_levels(self, features: np.ndarray, tasks: List[Dict]) -> np.ndarray:
+        """Levels priority scoring uses without the online model: the offline model's, else the stated ones"""
+        if self.priority_predictor:
+            return self.priority_predictor.predict(features)
+        return TaskBatch.of(tasks).priority_levels.astype(np.float64)
+    
+    def _extract_features(self, tasks: Tasks, now: Optional[datetime] = None) -> np.ndarray:
+        """Extract the ML feature matrix for a batch of tasks"""
+        with stage('task_model.extract_features'):
+            return self.feature_pipeline.transform(tasks, now)
+    
+    def _extract_task_features(self, task: Dict) -> np.ndarray:
         """Extract numerical features from task for ML models"""
-        features = []
-        
-        # Text features via embeddings
-        text = f"{task.get('title', '')} {task.get('description', '')}"
-        embedding = self.embedder.model.encode(text)
-        features.extend(embedding.tolist())
-        
-        # Categorical features
-        type_encoding = self._encode_task_type(task.get('type', 'other'))
-        features.extend(type_encoding)
-        
-        # Temporal features
-        due_date = task.get('dueDate')
-        if due_date:
-            days_until_due = (datetime.fromisoformat(due_date) - datetime.now()).days
-            features.append(max(0, days_until_due))
-            features.append(1 if days_until_due < 7 else 0)  # Urgent flag
-        else:
-            features.extend([30, 0])  # Default values
-        
-        # Duration features
-        duration = task.get('estimatedDuration', 60)
-        features.append(duration)
-        features.append(1 if duration > 120 else 0)  # Long task flag
-        
-        return features
+        return self._extract_features([task])[0]
     
-    def _encode_task_type(self, task_type: str) -> List[float]:
-        """One-hot encode task type"""
-        types = ['work', 'personal', 'learning', 'admin', 'meeting', 'creative', 'communication', 'other']
-        encoding = [0.0] * len(types)
-        if task_type in types:
-            encoding[types.index(task_type)] = 1.0
-        return encoding
+    def uses_projection(self, operation: str, reduced: Optional[bool] = None) -> bool:
+        """Whether `operation` runs on projected embeddings; `reduced` overrides the configured choice"""
+        if self.embedder.projection is None:
+            return False
+        return operation in self.projection_operations if reduced is None else reduced
+    
+    def stored_vectors(self, operation: str, task_ids: Iterable[int]) -> Dict[int, np.ndarray]:
+        """Task id -> stored embedding (or its projection) as used by `operation`, for ids that have one"""
+        return self.embedder.stored_vectors(task_ids, self.uses_projection(operation))
     
-    def group_similar_tasks(self, tasks: List[Dict], adaptive_eps: bool = True) -> List[Dict]:
+    @timed('task_model.group_similar_tasks')
+    def group_similar_tasks(self, tasks: Tasks, adaptive_eps: bool = True,
+                            engine: Optional[str] = None, reduced: Optional[bool] = None) -> List[Dict]:
         """Enhanced task grouping with adaptive clustering"""
-        if not tasks:
+        batch = TaskBatch.of(tasks)
+        if not len(batch):
             return []
             
-        # Add all tasks to the embedder
-        for task in tasks:
-            self.embedder.add_task(task)
-            
-        # Get embeddings for all tasks
-        embeddings = np.array([self.embedder.task_embeddings[task['id']] for task in tasks])
-        
-        # Adaptive epsilon based on data characteristics
-        if adaptive_eps:
-            distances = []
-            for i in range(len(embeddings)):
-                for j in range(i+1, len(embeddings)):
-                    dist = np.linalg.norm(embeddings[i] - embeddings[j])
-                    distances.append(dist)
-            
-            eps = np.percentile(distances, 30)  # Use 30th percentile as threshold
-        else:
-            eps = 0.5
-        
-        # Cluster using DBSCAN with adaptive parameters
-        clustering = DBSCAN(eps=eps, min_samples=max(2, len(tasks) // 10)).fit(embeddings)
-        labels = clustering.labels_
-        
-        # Create enhanced groups with metadata
-        groups = {}
-        for task, label in zip(tasks, labels):
-            if label == -1:  # Noise - create individual groups for important tasks
-                if task.get('priority') in ['high', 'critical']:
-                    unique_label = f"individual_{task['id']}"
-                    groups[unique_label] = {
-                        'name': f"Individual: {task['title'][:30]}...",
-                        'taskIds': [task['id']],
-                        'priority': task.get('priority', 'medium'),
-                        'estimatedDuration': task.get('estimatedDuration', 60)
-                    }
-                continue
-                
-            if label not in groups:
-                groups[label] = {
-                    'name': f"Group {label}",
-                    'taskIds': [],
-                    'priority': 'medium',
-                    'estimatedDuration': 0
-                }
-            
-            groups[label]['taskIds'].append(task['id'])
-            groups[label]['estimatedDuration'] += task.get('estimatedDuration', 60)
-            
-            # Upgrade group priority if needed
-            task_priority = task.get('priority', 'medium')
-            if self._priority_level(task_priority) > self._priority_level(groups[label]['priority']):
-                groups[label]['priority'] = task_priority
-        
-        # Generate intelligent group names
-        for group in groups.values():
-            if len(group['taskIds']) > 1:
-                sample_tasks = [t for t in tasks if t['id'] in group['taskIds'][:3]]
-                common_type = self._find_common_type(sample_tasks)
-                common_keywords = self._extract_common_keywords(sample_tasks)
-                group['name'] = f"{common_type.title()}: {common_keywords}"
-            
-        return list(groups.values())
+        with stage('task_model.group_similar_tasks.embed'):
+            embeddings = self._embed_batch(batch, self.uses_projection('grouping', reduced))
+        
+        with stage('task_model.group_similar_tasks.eps_estimation'):
+            # Adaptive epsilon: 30th percentile of (sampled) pairwise distances
+            eps = estimate_eps(embeddings) if adaptive_eps else DEFAULT_EPS
+        
+        with stage('task_model.group_similar_tasks.clustering'):
+            clustering = make_engine(engine, self.clustering_n_jobs) if engine else self.clustering
+            labels = clustering.fit_predict(embeddings, eps, default_min_samples(len(batch)))
+        
+        with stage('task_model.group_similar_tasks.summarize'):
+            return summarize_groups(batch, labels)
+    
+    def _embed_batch(self, batch: TaskBatch, reduced: bool = False) -> np.ndarray:
+        """Embeddings for every task, encoding only ones the embedder has not seen"""
+        return self.embedder.embed_tasks(batch, reduced)
     
-    def _priority_level(self, priority: str) -> int:
-        mapping = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
-        return mapping.get(priority, 2)
+    @timed('task_model.group_tasks_hierarchical')
+    def group_tasks_hierarchical(self, tasks: Tasks, n_groups: Optional[List[int]] = None,
+                                 reduced: Optional[bool] = None) -> Dict:
+        """Coarse-to-fine groupings read from one cached cluster tree"""
+        batch = TaskBatch.of(tasks)
+        if not len(batch):
+            return {'treeId': None, 'levels': []}
+        
+        reduced = self.uses_projection('hierarchy', reduced)
+        with stage('task_model.group_tasks_hierarchical.tree'):
+            tree = self.hierarchy.tree(
+                batch, lambda b: self._embed_batch(b, reduced),
+                f"/{self.embedder.projection.kind}{self.embedder.projection.dim}" if reduced else ''
+            )
+        
+        with stage('task_model.group_tasks_hierarchical.cut'):
+            return {
+                'treeId': tree.tree_id,
+                'levels': tree.levels(n_groups or default_levels(len(batch)), batch)
+            }
     
-    def _find_common_type(self, tasks: List[Dict]) -> str:
-        types = [t.get('type', 'other') for t in tasks]
-        return max(set(types), key=types.count)
+    def find_similar_tasks(self, task_id: int, threshold: float = SIMILARITY_THRESHOLD,
+                           reduced: Optional[bool] = None) -> List[int]:
+        """Stored tasks similar to an already embedded one, most similar first"""
+        return self.embedder.find_similar_tasks(task_id, threshold, self.uses_projection('similarity', reduced))
     
-    def _extract_common_keywords(self, tasks: List[Dict]) -> str:
-        """Extract common keywords from task titles"""
-        words = []
-        for task in tasks:
-            title_words = task.get('title', '').lower().split()
-            words.extend([w for w in title_words if len(w) > 3])
-        
-        if words:
-            common_word = max(set(words), key=words.count)
-            return common_word.title()
-        return "Related Tasks"
+    def cut_task_hierarchy(self, tree_id: str, n_groups: List[int]) -> Optional[Dict]:
+        """More granularities from an already built tree; None once it has been evicted"""
+        tree = self.hierarchy.get(tree_id)
+        if tree is None:
+            return None
+        return {'treeId': tree.tree_id, 'levels': tree.levels(n_groups)}
     
+    @timed('task_model.infer_dependencies')
     def infer_dependencies(self, task: Dict) -> List[Dict]:
         """Advanced dependency inference using patterns and ML"""
         dependencies = []
@@ -201,22 +258,23 @@ class TaskModel:
         
         # Check for keyword patterns
         for pattern_key, deps in self.dependency_patterns.items():
-            if pattern_key in task_title or pattern_key in task.get('description', '').lower():
+            if pattern_key in task_title or pattern_key in (task.get('description') or '').lower():
                 for i, dep_type in enumerate(deps):
                     dependencies.append({
                         'title': f"{dep_type.replace('_', ' ').title()} for {task['title']}",
                         'description': f"Required step {i+1} to complete {task['title']}",
                         'type': task_type,
                         'priority': 'high' if i < 2 else 'medium',
-                        'estimatedDuration': max(30, task.get('estimatedDuration', 60) // len(deps)),
+                        'estimatedDuration': max(30, int(task_duration(task)) // len(deps)),
                         'dependencyType': 'prerequisite'
                     })
                 break
         
         # ML-based inference if model is trained
         if self.dependency_classifier:
-            features = self._extract_task_features(task)
-            predicted_dep_count = self.dependency_classifier.predict([features])[0]
+            with stage('task_model.infer_dependencies.ml_predict'):
+                features = self._extract_task_features(task)
+                predicted_dep_count = self.dependency_classifier.predict([features])[0]
             
             # Generate additional dependencies if ML suggests more
             if predicted_dep_count > len(dependencies):
@@ -263,217 +321,204 @@ class TaskModel:
         
         return deps
     
-    def prioritize_tasks(self, tasks: List[Dict]) -> List[Dict]:
+    @timed('task_model.prioritize_tasks')
+    def prioritize_tasks(self, tasks: Tasks) -> List[Dict]:
         """Advanced ML-based task prioritization"""
-        prioritized = []
+        batch = TaskBatch.of(tasks)
+        if not len(batch):
+            return []
+        
+        now = datetime.now()
+        days = batch.days_until_due(now)
+        scores = self._score_tasks(batch, days, now)
+        
+        with stage('task_model.prioritize_tasks.ranking'):
+            return self.format_ranking(batch, scores, days, np.argsort(-scores, kind='stable'))
+    
+    def format_ranking(self, batch: TaskBatch, scores: np.ndarray, days: np.ndarray,
+                       order: np.ndarray) -> List[Dict]:
+        """Prioritized task rows for `batch`, listed in `order`"""
+        priorities = self._scores_to_priorities(scores)
+        reasoning = self._generate_priority_reasoning(batch, days)
+        ids = batch.id_list()
+        return [{
+            'id': ids[i],
+            'priority': priorities[i],
+            'priorityScore': float(scores[i]),
+            'reasoning': reasoning[i]
+        } for i in order.tolist()]
+    
+    def _score_tasks(self, batch: TaskBatch, days: np.ndarray, now: datetime) -> np.ndarray:
+        """Priority scores for a whole batch: base score, ML blend, then context"""
+        scores = self.base_priority_scores(batch, days, now)
         
-        for task in tasks:
+        with stage('task_model.prioritize_tasks.context'):
+            # Context-aware adjustments
+            return self._apply_context_adjustments(batch, scores, now)
+    
+    def base_priority_scores(self, batch: TaskBatch, days: np.ndarray, now: datetime) -> np.ndarray:
+        """Per-task part of the priority score (rules blended with the ML model), before context"""
+        # ML prediction if available, batched over all tasks
+        ml_priorities = None
+        predictor = self._active_priority_predictor()
+        if predictor:
+            with stage('task_model.prioritize_tasks.ml_predict'):
+                ml_priorities = predictor.predict(self._extract_features(batch, now))
+        
+        with stage('task_model.prioritize_tasks.scoring'):
             # Base priority score
-            priority_score = self._calculate_priority_score(task)
-            
-            # ML prediction if available
-            if self.priority_predictor:
-                features = self._extract_task_features(task)
-                ml_priority = self.priority_predictor.predict([features])[0]
-                priority_score = (priority_score + ml_priority) / 2
+            scores = self._calculate_priority_scores(batch, days)
             
-            # Context-aware adjustments
-            priority_score = self._apply_context_adjustments(task, tasks, priority_score)
+            if ml_priorities is not None:
+                # Models predict a level (1-4): average it with the stated level in the priority term
+                scores += (ml_priorities - batch.priority_levels) * PRIORITY_WEIGHT / 2
             
-            prioritized.append({
-                'id': task['id'],
-                'priority': self._score_to_priority(priority_score),
-                'priorityScore': priority_score,
-                'reasoning': self._generate_priority_reasoning(task, priority_score)
-            })
-        
-        return sorted(prioritized, key=lambda x: x['priorityScore'], reverse=True)
+            return scores
     
-    def _calculate_priority_score(self, task: Dict) -> float:
-        """Calculate base priority score"""
-        score = 0.0
-        
+    def _calculate_priority_scores(self, batch: TaskBatch, days: np.ndarray) -> np.ndarray:
+        """Calculate base priority scores"""
         # Priority weight
-        priority_weights = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
-        score += priority_weights.get(task.get('priority', 'medium'), 2) * 25
-        
-        # Due date urgency
-        due_date = task.get('dueDate')
-        if due_date:
-            days_until_due = (datetime.fromisoformat(due_date) - datetime.now()).days
-            if days_until_due <= 1:
-                score += 50  # Very urgent
-            elif days_until_due <= 7:
-                score += 30  # Urgent
-            elif days_until_due <= 30:
-                score += 10  # Moderately urgent
-        
-        # Status impact
-        if task.get('status') == 'blocked':
-            score += 40  # Blocked tasks need attention
-        elif task.get('status') == 'in_progress':
-            score += 20  # Continue current work
+        scores = batch.priority_levels * PRIORITY_WEIGHT
+        
+        # Due date urgency (no due date compares false everywhere)
+        scores += np.select(
+            [days <= 1, days <= 7, days <= 30],
+            [50, 30, 10],  # Very urgent, urgent, moderately urgent
+            0
+        )
+        
+        # Status impact: blocked tasks need attention, continue current work
+        scores += np.where(batch.is_status('blocked'), 40, np.where(batch.is_status('in_progress'), 20, 0))
         
         # Duration consideration (longer tasks might need more planning)
-        duration = task.get('estimatedDuration', 60)
-        if duration > 240:  # > 4 hours
-            score += 15
+        scores += np.where(batch.durations_or(DEFAULT_DURATION) > 240, 15, 0)  # > 4 hours
         
-        return score
+        return scores
     
-    def _apply_context_adjustments(self, task: Dict, all_tasks: List[Dict], base_score: float) -> float:
-        """Apply context-aware adjustments to priority score"""
-        adjusted_score = base_score
-        
-        # Check for task dependencies
-        dependent_tasks = [t for t in all_tasks if self._has_dependency_relationship(task, t)]
-        if dependent_tasks:
-            adjusted_score += len(dependent_tasks) * 5
+    def _apply_context_adjustments(self, batch: TaskBatch, scores: np.ndarray, now: datetime) -> np.ndarray:
+        """Apply context-aware adjustments to priority scores"""
+        # Tasks sharing two or more title words are treated as dependent
+        adjusted = scores + shared_word_counts(batch.title_word_matrix()) * 5
         
         # Check for similar tasks (batching opportunity)
-        similar_tasks = [t for t in all_tasks if self._are_similar_tasks(task, t)]
-        if len(similar_tasks) > 2:
-            adjusted_score += 10  # Batching bonus
-        
-        # Time-of-day considerations
-        current_hour = datetime.now().hour
-        task_type = task.get('type', 'other')
+        adjusted += np.where(self._similar_task_counts(batch) > 2, 10, 0)  # Batching bonus
         
-        # Optimal time bonuses
-        if task_type == 'creative' and 9 <= current_hour <= 11:
-            adjusted_score += 10
-        elif task_type == 'admin' and 13 <= current_hour <= 15:
-            adjusted_score += 10
-        elif task_type == 'communication' and 10 <= current_hour <= 12:
-            adjusted_score += 10
+        # Time-of-day considerations: optimal time bonuses
+        for task_type, (first_hour, last_hour) in OPTIMAL_HOURS.items():
+            if first_hour <= now.hour <= last_hour:
+                adjusted += np.where(batch.is_type(task_type), 10, 0)
         
-        return adjusted_score
+        return adjusted
     
-    def _has_dependency_relationship(self, task1: Dict, task2: Dict) -> bool:
-        """Check if tasks have dependency relationship"""
-        # Simple heuristic - can be enhanced with ML
-        title1 = task1.get('title', '').lower()
-        title2 = task2.get('title', '').lower()
-        
-        # Check for common keywords or project names
-        words1 = set(title1.split())
-        words2 = set(title2.split())
-        
-        return len(words1.intersection(words2)) >= 2
+    def _similar_task_counts(self, batch: TaskBatch) -> np.ndarray:
+        """Other tasks of the same type whose stored embeddings are similar (for batching)"""
+        counts = np.zeros(len(batch), dtype=np.int64)
+        ids = batch.id_list()
+        stored = self.stored_vectors('batching', ids)
+        present = [i for i, task_id in enumerate(ids) if task_id in stored]
+        if present:
+            embeddings = np.array([stored[ids[i]] for i in present], dtype=np.float32)
+            types = np.array([batch.types[i] for i in present])
+            counts[present] = similar_counts(embeddings, types, batch.ids[present], SIMILARITY_THRESHOLD)
+        return counts
     
-    def _are_similar_tasks(self, task1: Dict, task2: Dict) -> bool:
-        """Check if tasks are similar for batching"""
-        if task1['id'] == task2['id']:
-            return False
-        
-        # Same type
-        if task1.get('type') != task2.get('type'):
-            return False
-        
-        # Similar embeddings (if available)
-        if task1['id'] in self.embedder.task_embeddings and task2['id'] in self.embedder.task_embeddings:
-            emb1 = self.embedder.task_embeddings[task1['id']]
-            emb2 = self.embedder.task_embeddings[task2['id']]
-            similarity = np.dot(emb1, emb2) / (np.linalg.norm(emb1) * np.linalg.norm(emb2))
-            return similarity > 0.7
-        
-        return False
-    
-    def _score_to_priority(self, score: float) -> str:
-        """Convert numerical score to priority string"""
-        if score >= 80:
-            return 'critical'
-        elif score >= 60:
-            return 'high'
-        elif score >= 40:
-            return 'medium'
-        else:
-            return 'low'
+    def _scores_to_priorities(self, scores: np.ndarray) -> List[str]:
+        """Convert numerical scores to priority strings"""
+        return np.select(
+            [scores >= 80, scores >= 60, scores >= 40],
+            ['critical', 'high', 'medium'],
+            'low'
+        ).tolist()
     
-    def _generate_priority_reasoning(self, task: Dict, score: float) -> str:
+    def _generate_priority_reasoning(self, batch: TaskBatch, days: np.ndarray) -> List[str]:
         """Generate human-readable reasoning for priority assignment"""
-        reasons = []
-        
-        if task.get('priority') in ['high', 'critical']:
-            reasons.append("high base priority")
-        
-        due_date = task.get('dueDate')
-        if due_date:
-            days_until_due = (datetime.fromisoformat(due_date) - datetime.now()).days
-            if days_until_due <= 1:
+        high_priority = (batch.priority_levels >= PRIORITY_LEVELS['high']).tolist()
+        due_tomorrow = (days <= 1).tolist()
+        due_this_week = (days <= 7).tolist()
+        blocked = batch.is_status('blocked').tolist()
+        
+        reasoning = []
+        for i in range(len(batch)):
+            reasons = []
+            if high_priority[i]:
+                reasons.append("high base priority")
+            if due_tomorrow[i]:
                 reasons.append("due tomorrow")
-            elif days_until_due <= 7:
+            elif due_this_week[i]:
                 reasons.append("due this week")
+            if blocked[i]:
+                reasons.append("currently blocked")
+            reasoning.append("; ".join(reasons) if reasons else "standard prioritization")
+        return reasoning
+    
+    @timed('task_model.create_pomodoro_schedule')
+    def create_pomodoro_schedule(self, tasks: Tasks) -> List[Dict]:
+        """Enhanced pomodoro scheduling with optimization"""
+        batch = TaskBatch.of(tasks)
+        if not len(batch):
+            return []
         
-        if task.get('status') == 'blocked':
-            reasons.append("currently blocked")
+        # First prioritize and sort by priority score
+        current_time = datetime.now()
+        scores = self._score_tasks(batch, batch.days_until_due(current_time), current_time)
+        ordered = batch.take(np.argsort(-scores, kind='stable'))
         
-        if not reasons:
-            reasons.append("standard prioritization")
+        durations = self._scheduling_durations(ordered)
         
-        return "; ".join(reasons)
-    
-    def create_pomodoro_schedule(self, tasks: List[Dict]) -> List[Dict]:
-        """Enhanced pomodoro scheduling with optimization"""
-        # First prioritize and sort
-        prioritized = self.prioritize_tasks(tasks)
-        task_lookup = {t['id']: t for t in tasks}
+        # Calculate optimal pomodoro count (25 min work + 5 min break = 30 min cycle)
+        pomodoros = np.maximum(1, np.round(durations / 25)).astype(np.int64)
         
-        # Sort by priority score
-        sorted_task_ids = [p['id'] for p in prioritized]
-        sorted_tasks = [task_lookup[tid] for tid in sorted_task_ids]
+        # Add buffer for complex tasks
+        complex_tasks = ordered.is_type(*COMPLEX_TYPES)
+        pomodoros += complex_tasks
         
-        schedule = []
-        current_time = datetime.now()
+        difficulty = self._assess_task_difficulty(ordered, complex_tasks)
+        ids = ordered.id_list()
+        counts = pomodoros.tolist()
         
-        for i, task in enumerate(sorted_tasks):
-            duration = task.get('estimatedDuration', 30)
-            
-            # Calculate optimal pomodoro count (25 min work + 5 min break = 30 min cycle)
-            pomodoros = max(1, round(duration / 25))
-            
-            # Add buffer for complex tasks
-            if task.get('type') in ['creative', 'learning', 'development']:
-                pomodoros += 1
-            
+        schedule = []
+        for i in range(len(ordered)):
             # Schedule timing
             start_time = current_time + timedelta(minutes=i * 30)
-            end_time = start_time + timedelta(minutes=pomodoros * 30)
+            end_time = start_time + timedelta(minutes=counts[i] * 30)
             
-            schedule_item = {
-                'taskId': task['id'],
-                'pomodoroCount': pomodoros,
+            schedule.append({
+                'taskId': ids[i],
+                'pomodoroCount': counts[i],
                 'order': i,
                 'startTime': start_time.isoformat(),
                 'endTime': end_time.isoformat(),
-                'estimatedMinutes': pomodoros * 25,
-                'breakMinutes': pomodoros * 5,
-                'difficulty': self._assess_task_difficulty(task),
-                'energyLevel': self._recommend_energy_level(task, start_time)
-            }
-            
-            schedule.append(schedule_item)
+                'estimatedMinutes': counts[i] * 25,
+                'breakMinutes': counts[i] * 5,
+                'difficulty': difficulty[i],
+                'energyLevel': self._recommend_energy_level(start_time)
+            })
         
         return schedule
     
-    def _assess_task_difficulty(self, task: Dict) -> str:
-        """Assess task difficulty for scheduling"""
-        duration = task.get('estimatedDuration', 30)
-        task_type = task.get('type', 'other')
+    def _scheduling_durations(self, batch: TaskBatch) -> np.ndarray:
+        """Estimated durations, filling gaps from the online duration model"""
+        durations = batch.durations.copy()
+        missing = np.nonzero(np.isnan(durations))[0]
         
-        complex_types = ['development', 'creative', 'learning', 'analysis']
+        online = self.online_learner.published
+        if len(missing) and online is not None and online.duration_model is not None:
+            durations[missing] = online.predict_duration(self._extract_features(batch.take(missing)))
         
-        if duration > 180 or task_type in complex_types:
-            return 'high'
-        elif duration > 90:
-            return 'medium'
-        else:
-            return 'low'
+        return np.where(np.isnan(durations), 30, durations)
+    
+    def _assess_task_difficulty(self, batch: TaskBatch, complex_tasks: np.ndarray) -> List[str]:
+        """Assess task difficulty for scheduling"""
+        durations = batch.durations_or(30)
+        return np.select(
+            [(durations > 180) | complex_tasks, durations > 90],
+            ['high', 'medium'],
+            'low'
+        ).tolist()
     
-    def _recommend_energy_level(self, task: Dict, scheduled_time: datetime) -> str:
+    def _recommend_energy_level(self, scheduled_time: datetime) -> str:
         """Recommend optimal energy level for task timing"""
         hour = scheduled_time.hour
-        task_type = task.get('type', 'other')
         
         # Peak performance hours
         if 9 <= hour <= 11:
@@ -483,4 +528,4 @@ class TaskModel:
         elif 16 <= hour <= 18:
             return 'medium'
         else:
-            return 'low'
\ No newline at end of file
+            return 'low'
@@ -0,0 +1,243 @@
+"""
+Tree ensembles compiled into flat numpy node arrays.
+
+sklearn's `predict` on a forest validates its input, spins up joblib and
+walks every tree separately. That overhead dominates a one-task call such
+as `infer_dependencies`. `compile_ensemble` packs every tree of a fitted
+forest, gradient-boosting regressor or single decision tree into one node
+table:
+
+- feature and threshold per node.
+- absolute left/right child indices. Leaves point at themselves with an
+  infinite threshold, so extra steps are no-ops.
+- leaf values, pre-normalized to probabilities or pre-scaled by the
+  learning rate.
+
+`CompiledEnsemble.predict` then advances every (row, tree) pair one level
+per step, for `depth` steps, in a handful of numpy operations.
+
+Splits compare float32 features against float64 thresholds exactly as
+sklearn does, so leaves match. Compilation is checked against the original
+model on sample rows: class predictions must be identical and regression
+outputs equal up to summation order. Missing-value routing (NaN features)
+is not supported.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+from sklearn.ensemble import (
+    ExtraTreesClassifier, ExtraTreesRegressor, GradientBoostingRegressor,
+    RandomForestClassifier, RandomForestRegressor
+)
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+from .batch import BLOCK_CELLS
+
+_LEAF = -1
+_FORESTS = (RandomForestClassifier, RandomForestRegressor, ExtraTreesClassifier, ExtraTreesRegressor)
+_TREES = (DecisionTreeClassifier, DecisionTreeRegressor)
+_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'baseline', 'classes')
+
+
+class CompiledEnsemble:
+    """Packed node arrays of a tree ensemble, evaluated for whole batches at once"""
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, depth: int, scale: float, baseline: np.ndarray,
+                 classes: Optional[np.ndarray] = None, n_features: int = 0,
+                 fallback=None, fallback_rows: Optional[int] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        # Forests average their trees, boosting sums them
+        self.scale = scale
+        self.baseline = baseline
+        self.classes = classes
+        self.n_features = n_features
+        # Original model, used above `fallback_rows` rows where sklearn's compiled loops win
+        self.fallback = fallback
+        self.fallback_rows = fallback_rows
+        # left and right child interleaved: child of node i is _children[2 * i + went_right]
+        self._children = np.stack([left, right], axis=1).ravel().astype(np.intp)
+
+    @property
+    def is_classifier(self) -> bool:
+        return self.classes is not None
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """(rows, trees) index of the leaf each row reaches in each tree"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got shape {X.shape}")
+        flat = np.ascontiguousarray(X).ravel()
+        row_offsets = (np.arange(len(X), dtype=np.intp) * self.n_features)[:, None]
+        nodes = np.repeat(self.roots[None, :].astype(np.intp), len(X), axis=0)
+        for _ in range(self.depth):
+            goes_right = flat.take(row_offsets + self.feature.take(nodes)) > self.threshold.take(nodes)
+            nodes = self._children.take(2 * nodes + goes_right)
+        return nodes
+
+    def decision(self, X: np.ndarray) -> np.ndarray:
+        """(rows, outputs) combined leaf values: class probabilities or the regression value"""
+        X = np.asarray(X, dtype=np.float32)
+        step = max(1, BLOCK_CELLS // max(1, self.n_trees))
+        if len(X) <= step:
+            return self.value[self.leaves(X)].sum(axis=1) * self.scale + self.baseline
+        return np.vstack([
+            self.value[self.leaves(X[start:start + step])].sum(axis=1) * self.scale + self.baseline
+            for start in range(0, len(X), step)
+        ])
+
+    def attach_fallback(self, model, fallback_rows: int, check: Optional[np.ndarray] = None):
+        """Hand batches larger than `fallback_rows` to `model`, once it is checked to predict alike on `check`"""
+        if check is not None and len(check):
+            verify_parity(model, self, check)
+        self.fallback, self.fallback_rows = model, fallback_rows
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        if self.fallback is not None and self.fallback_rows is not None and len(X) > self.fallback_rows:
+            return self.fallback.predict(X)
+        combined = self.decision(X)
+        if self.is_classifier:
+            return self.classes[combined.argmax(axis=1)]
+        return combined[:, 0]
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if not self.is_classifier:
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self.decision(X)
+
+    def to_arrays(self, prefix: str = '') -> Dict[str, np.ndarray]:
+        arrays = {f"{prefix}{name}": getattr(self, name) for name in _ARRAYS if getattr(self, name) is not None}
+        arrays[f"{prefix}meta"] = np.array([self.depth, self.n_features], dtype=np.int64)
+        arrays[f"{prefix}scale"] = np.array(self.scale, dtype=np.float64)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix: str = '') -> 'CompiledEnsemble':
+        depth, n_features = (int(v) for v in arrays[f"{prefix}meta"])
+        classes = arrays[f"{prefix}classes"] if f"{prefix}classes" in arrays else None
+        return cls(
+            *(arrays[f"{prefix}{name}"] for name in _ARRAYS[:6]),
+            depth=depth, scale=float(arrays[f"{prefix}scale"]), baseline=arrays[f"{prefix}baseline"],
+            classes=classes, n_features=n_features
+        )
+
+
+def _pack(trees, leaf_values, n_features: int, **kwargs) -> CompiledEnsemble:
+    """Concatenate sklearn `Tree` structures into one node table with absolute child indices"""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    depth = 0
+    for tree, tree_values in zip(trees, leaf_values):
+        nodes = np.arange(tree.node_count)
+        leaf = tree.children_left == _LEAF
+        features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(leaf, np.inf, tree.threshold))
+        lefts.append(np.where(leaf, nodes, tree.children_left) + offset)
+        rights.append(np.where(leaf, nodes, tree.children_right) + offset)
+        values.append(tree_values)
+        roots.append(offset)
+        depth = max(depth, tree.max_depth)
+        offset += tree.node_count
+    return CompiledEnsemble(
+        np.concatenate(features), np.concatenate(thresholds).astype(np.float64),
+        np.concatenate(lefts).astype(np.int32), np.concatenate(rights).astype(np.int32),
+        np.concatenate(values).astype(np.float64), np.array(roots, dtype=np.int32),
+        depth=depth, n_features=n_features, **kwargs
+    )
+
+
+def _class_probabilities(tree) -> np.ndarray:
+    """Leaf class distribution, normalized as DecisionTreeClassifier.predict_proba does"""
+    counts = tree.value[:, 0, :]
+    normalizer = counts.sum(axis=1, keepdims=True)
+    normalizer[normalizer == 0.0] = 1.0
+    return counts / normalizer
+
+
+def compile_ensemble(model, check: Optional[np.ndarray] = None,
+                     fallback_rows: Optional[int] = None) -> CompiledEnsemble:
+    """Compile a fitted tree model.
+
+    `check` rows are used to verify parity with sklearn. With `fallback_rows`
+    the compiled model keeps `model` and hands it batches larger than that.
+    """
+    if isinstance(model, _FORESTS):
+        estimators = list(model.estimators_)
+    elif isinstance(model, _TREES):
+        estimators = [model]
+    elif isinstance(model, GradientBoostingRegressor):
+        estimators = list(model.estimators_[:, 0])
+    else:
+        raise TypeError(f"Cannot compile {type(model).__name__}")
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise ValueError("Multi-output tree models are not supported")
+
+    trees = [estimator.tree_ for estimator in estimators]
+    n_features = model.n_features_in_
+    if isinstance(model, GradientBoostingRegressor):
+        if isinstance(model.init_, str):  # init='zero'
+            baseline = np.zeros(1)
+        elif hasattr(model.init_, 'constant_'):
+            baseline = np.asarray(model.init_.constant_, dtype=np.float64).reshape(1)
+        else:
+            raise TypeError(f"Cannot compile a boosting init estimator of type {type(model.init_).__name__}")
+        compiled = _pack(
+            trees, [tree.value[:, 0, :] * model.learning_rate for tree in trees], n_features,
+            scale=1.0, baseline=baseline
+        )
+    elif hasattr(model, 'classes_'):
+        compiled = _pack(
+            trees, [_class_probabilities(tree) for tree in trees], n_features,
+            scale=1.0 / len(trees), baseline=np.zeros(len(model.classes_)), classes=np.asarray(model.classes_)
+        )
+    else:
+        compiled = _pack(
+            trees, [tree.value[:, 0, :] for tree in trees], n_features,
+            scale=1.0 / len(trees), baseline=np.zeros(1)
+        )
+
+    if check is not None and len(check):
+        verify_parity(model, compiled, check)
+    if fallback_rows is not None:
+        compiled.attach_fallback(model, fallback_rows)
+    return compiled
+
+
+def verify_parity(model, compiled: CompiledEnsemble, X: np.ndarray):
+    """Raise ValueError unless the compiled model predicts like the sklearn one on X"""
+    expected = model.predict(X)
+    actual = compiled.predict(X)
+    if compiled.is_classifier:
+        mismatched = int(np.sum(expected != actual))
+    else:
+        # Only the order in which tree outputs are summed differs
+        mismatched = int(np.sum(~np.isclose(expected, actual, rtol=1e-9, atol=1e-9)))
+    if mismatched:
+        raise ValueError(f"Compiled {type(model).__name__} disagrees with sklearn on {mismatched} of {len(X)} rows")
+
+
+def save_ensembles(path: str, ensembles: Dict[str, CompiledEnsemble]):
+    """Write named compiled ensembles to one .npz (no pickle)"""
+    arrays = {}
+    for name, ensemble in ensembles.items():
+        arrays.update(ensemble.to_arrays(f"{name}/"))
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def load_ensembles(path: str) -> Dict[str, CompiledEnsemble]:
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    names = sorted({key.split('/', 1)[0] for key in arrays})
+    return {name: CompiledEnsemble.from_arrays(arrays, f"{name}/") for name in names}
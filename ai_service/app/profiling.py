@@ -0,0 +1,182 @@
+"""
+On-demand profiling of a live worker.
+
+`SamplingProfiler` walks every thread's stack from a background thread at a
+fixed interval and aggregates them as flamegraph-compatible collapsed
+stacks; it never instruments the profiled code, so overhead is bounded by
+the sampling rate. `AllocationTracker` wraps `tracemalloc` to report the
+top allocation sites, optionally relative to when tracking started.
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Leaf functions of threads that are parked rather than doing work
+IDLE_FUNCTIONS = {'wait', 'select', 'poll', 'epoll', 'acquire', 'sleep', '_worker', 'accept', 'get'}
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    for path in sys.path:
+        if path and filename.startswith(path):
+            filename = filename[len(path):].lstrip(os.sep)
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(';', ':')
+
+
+class SamplingProfiler:
+    """Low-overhead wall-clock sampling profiler for all threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stacks: Counter = Counter()
+        self.samples = 0
+        self.interval = 0.0
+        self.include_idle = False
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = 0.005, duration: Optional[float] = 30.0, include_idle: bool = False):
+        """Start sampling; stops by itself after `duration` seconds (None = until stopped)"""
+        with self._lock:
+            if self.running:
+                raise RuntimeError("Profiler is already running")
+            self._stacks = Counter()
+            self.samples = 0
+            self.interval = interval
+            self.include_idle = include_idle
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(duration,), name='sampling-profiler', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> str:
+        """Stop sampling and return the collapsed stacks"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        """`thread;outer;...;inner count` lines, as consumed by flamegraph.pl or speedscope"""
+        with self._lock:
+            items = self._stacks.most_common()
+        return '\n'.join(f"{stack} {count}" for stack, count in items) + ('\n' if items else '')
+
+    def status(self) -> Dict:
+        return {
+            'running': self.running,
+            'samples': self.samples,
+            'intervalSeconds': self.interval,
+            'startedAt': self.started_at,
+            'stoppedAt': self.stopped_at,
+            'pid': os.getpid()
+        }
+
+    def _run(self, duration: Optional[float]):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + duration if duration else None
+        while not self._stop.is_set():
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            self._sample(own_id)
+            self._stop.wait(self.interval)
+        self.stopped_at = time.time()
+
+    def _sample(self, own_id: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        collected = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            if not self.include_idle and frame.f_code.co_name in IDLE_FUNCTIONS:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, str(thread_id)).replace(';', ':').replace(' ', '_'))
+            collected.append(';'.join(reversed(labels)))
+
+        with self._lock:
+            self._stacks.update(collected)
+            self.samples += 1
+
+
+class AllocationTracker:
+    """tracemalloc snapshots with top allocation sites"""
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 25) -> int:
+        """Start tracing (if needed) and reset the baseline; returns the active traceback depth"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._baseline = tracemalloc.take_snapshot()
+        return tracemalloc.get_traceback_limit()
+
+    def stop(self):
+        self._baseline = None
+        tracemalloc.stop()
+
+    def top(self, limit: int = 20, key_type: str = 'lineno', compare_to_start: bool = True) -> Dict:
+        """Top allocation sites, as growth since `start` or as absolute totals"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Allocation tracking is not running")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+
+        if compare_to_start and self._baseline is not None:
+            stats = snapshot.compare_to(self._baseline, key_type)
+            sites = [{
+                'site': self._site(stat.traceback),
+                'sizeBytes': stat.size,
+                'sizeDiffBytes': stat.size_diff,
+                'count': stat.count,
+                'countDiff': stat.count_diff
+            } for stat in stats[:limit]]
+        else:
+            sites = [{
+                'site': self._site(stat.traceback),
+                'sizeBytes': stat.size,
+                'count': stat.count
+            } for stat in snapshot.statistics(key_type)[:limit]]
+
+        return {
+            'pid': os.getpid(),
+            'tracedBytes': current,
+            'peakBytes': peak,
+            'sites': sites
+        }
+
+    @staticmethod
+    def _site(traceback: tracemalloc.Traceback) -> List[str]:
+        return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+
+
+profiler = SamplingProfiler()
+allocation_tracker = AllocationTracker()
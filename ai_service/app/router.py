@@ -0,0 +1,258 @@
+"""
+Tenant-sharded front door for several ai_service nodes.
+
+Every request is forwarded to the node that owns its tenant on a
+consistent-hash ring (app/sharding.py). The tenant comes from the
+`X-Tenant-Id` header (the NestJS backend sends the user id), and requests
+without one share the `default` tenant. `/rankings/{user_id}` requests are
+keyed by their path instead, so a user's ranking lives on the node that owns
+the user as a tenant, whatever header the caller sent.
+
+Nodes keep each tenant's task embeddings as a segment, and each user's
+materialized ranking. When a node joins or leaves, the router moves both
+for every tenant whose owner changed: export from the old node, import into
+the new one, then drop from the old one. Requests keep being served while
+this happens. A tenant that has already been re-routed but not yet migrated
+only pays for re-encoding its tasks. Ranking events that reach the new owner
+before the copy are kept; a ranking that failed to migrate answers 404 until
+the backend PUTs the user's tasks again. Result caches, cluster trees and
+jobs stay on the node that produced them.
+
+Local run, with three nodes on one machine:
+
+    API_KEY=dev uvicorn app.main:app --port 8001
+    API_KEY=dev uvicorn app.main:app --port 8002
+    API_KEY=dev SHARD_NODES=http://127.0.0.1:8001,http://127.0.0.1:8002 python -m app.router --port 8000
+    API_KEY=dev uvicorn app.main:app --port 8003
+    curl -X POST -H 'api-key: dev' 'localhost:8000/router/nodes?url=http://127.0.0.1:8003'
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+import httpx
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.responses import Response
+
+from .config import settings
+from .sharding import DEFAULT_TENANT, DEFAULT_VNODES, TENANT_HEADER, HashRing
+
+logger = logging.getLogger(__name__)
+
+# Connection-level headers that must not be copied between hops
+HOP_BY_HOP = frozenset({
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailers',
+    'transfer-encoding', 'upgrade', 'host', 'content-length', 'content-encoding'
+})
+FORWARDED_METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE']
+# Requests under this prefix are routed by the user id that follows it
+RANKINGS_PREFIX = '/rankings/'
+
+
+def parse_nodes(value: str) -> List[str]:
+    return [node.strip().rstrip('/') for node in value.split(',') if node.strip()]
+
+
+def request_tenant(request: Request) -> str:
+    """Routing key of a request: the user id of ranking paths, else the tenant header"""
+    path = request.scope['path']
+    if path.startswith(RANKINGS_PREFIX):
+        user_id = path[len(RANKINGS_PREFIX):].split('/', 1)[0]
+        if user_id:
+            return user_id
+    return request.headers.get(TENANT_HEADER) or DEFAULT_TENANT
+
+
+class ShardRouter:
+    """Routes tenants to nodes and migrates their segments and rankings on membership changes"""
+
+    def __init__(self, nodes: Iterable[str], api_key: str, vnodes: int = DEFAULT_VNODES,
+                 timeout: float = 120.0, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.ring = HashRing([node.rstrip('/') for node in nodes], vnodes)
+        self.api_key = api_key
+        # `transport` lets nodes be served in-process (e.g. httpx.ASGITransport)
+        self.client = httpx.AsyncClient(timeout=timeout, transport=transport)
+        self._membership = asyncio.Lock()
+
+    def node_for(self, tenant: str) -> str:
+        node = self.ring.node_for(tenant)
+        if node is None:
+            raise HTTPException(status_code=503, detail="No ai_service nodes configured")
+        return node
+
+    async def forward(self, request: Request) -> Response:
+        """Proxy a request to the node owning its tenant"""
+        tenant = request_tenant(request)
+        node = self.node_for(tenant)
+        headers = [
+            (name, value) for name, value in request.headers.items()
+            if name.lower() not in HOP_BY_HOP and name.lower() != TENANT_HEADER.lower()
+        ]
+        headers.append((TENANT_HEADER, tenant))
+        try:
+            upstream = await self.client.request(
+                request.method, node + request.url.path, params=request.url.query,
+                content=await request.body(), headers=headers
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"Error forwarding to {node}: {str(e)}")
+            raise HTTPException(status_code=502, detail=f"Node {node} unavailable")
+        return Response(
+            content=upstream.content,
+            status_code=upstream.status_code,
+            headers={name: value for name, value in upstream.headers.items() if name.lower() not in HOP_BY_HOP}
+        )
+
+    async def add_node(self, node: str) -> Dict:
+        """Put a node on the ring and pull over the tenants it now owns"""
+        node = node.rstrip('/')
+        async with self._membership:
+            sources = self.ring.nodes
+            if node in sources:
+                return {'node': node, 'moved': [], 'failed': []}
+            self.ring.add(node)
+            return {'node': node, **await self._rebalance(sources)}
+
+    async def remove_node(self, node: str) -> Dict:
+        """Take a node off the ring and hand its tenants to their new owners"""
+        node = node.rstrip('/')
+        async with self._membership:
+            if node not in self.ring.nodes:
+                raise HTTPException(status_code=404, detail="Node not on the ring")
+            self.ring.remove(node)
+            return {'node': node, **await self._rebalance([node])}
+
+    async def migrate(self, tenant: str, source: str, target: str,
+                      segment: bool = True, ranking: bool = False) -> Dict:
+        """Copy a tenant's segment and/or ranking to `target`, then drop them from `source`"""
+        quoted = quote(tenant, safe='')
+        moved = {'tasks': 0, 'rankedTasks': 0}
+        if segment:
+            path = f"/admin/segments/{quoted}"
+            exported = await self._admin('GET', source, path)
+            imported = await self._admin(
+                'POST', target, '/admin/segments',
+                content=exported.content, headers={'content-type': 'application/json'}
+            )
+            await self._admin('DELETE', source, path)
+            moved['tasks'] = imported.json()['imported']
+        if ranking:
+            try:
+                exported = await self._admin('GET', source, f"/admin/rankings/{quoted}")
+            except httpx.HTTPStatusError as e:
+                # Evicted from the source since it was listed
+                if e.response.status_code == 404:
+                    return moved
+                raise
+            imported = await self._admin(
+                'POST', target, f"/admin/rankings/{quoted}",
+                content=exported.content, headers={'content-type': 'application/json', TENANT_HEADER: tenant}
+            )
+            await self._admin('DELETE', source, f"/rankings/{quoted}", allow_missing=True)
+            moved['rankedTasks'] = imported.json()['tasks']
+        return moved
+
+    async def _rebalance(self, sources: List[str]) -> Dict:
+        moved, failed = [], []
+        for source in sources:
+            try:
+                segments = set((await self._admin('GET', source, '/admin/segments')).json())
+                ranked = set((await self._admin('GET', source, '/admin/ranked_users')).json())
+            except httpx.HTTPError as e:
+                # Its tenants will simply be re-encoded by their new owners
+                logger.error(f"Error listing segments on {source}: {str(e)}")
+                failed.append({'node': source, 'error': str(e)})
+                continue
+            for tenant in sorted(segments | ranked):
+                target = self.ring.node_for(tenant)
+                if target is None or target == source:
+                    continue
+                try:
+                    counts = await self.migrate(tenant, source, target, tenant in segments, tenant in ranked)
+                except httpx.HTTPError as e:
+                    logger.error(f"Error migrating tenant {tenant} from {source} to {target}: {str(e)}")
+                    failed.append({'tenant': tenant, 'from': source, 'to': target, 'error': str(e)})
+                    continue
+                moved.append({'tenant': tenant, 'from': source, 'to': target, **counts})
+        logger.info(f"Rebalanced {len(moved)} tenants ({len(failed)} failures)")
+        return {'moved': moved, 'failed': failed}
+
+    async def _admin(self, method: str, node: str, path: str, headers: Optional[Dict] = None,
+                     allow_missing: bool = False, **kwargs) -> httpx.Response:
+        response = await self.client.request(
+            method, node + path, headers={'api-key': self.api_key, **(headers or {})}, **kwargs
+        )
+        if not (allow_missing and response.status_code == 404):
+            response.raise_for_status()
+        return response
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_app(router: ShardRouter) -> FastAPI:
+    app = FastAPI(title="Task AI Shard Router", version="1.0.0")
+    app.state.router = router
+
+    async def verify_api_key(api_key: str = Header(...)):
+        if api_key != router.api_key:
+            raise HTTPException(status_code=403, detail="Invalid API Key")
+        return api_key
+
+    @app.on_event("shutdown")
+    async def close_client():
+        await router.close()
+
+    @app.get("/router/nodes")
+    async def list_nodes(api_key: str = Depends(verify_api_key)):
+        """Nodes on the ring and the share of tenants each owns"""
+        return {'nodes': router.ring.nodes, 'ownership': router.ring.ownership()}
+
+    @app.post("/router/nodes")
+    async def add_node(url: str, api_key: str = Depends(verify_api_key)):
+        """Add a node and migrate the tenants it takes over"""
+        return await router.add_node(url)
+
+    @app.delete("/router/nodes")
+    async def remove_node(url: str, api_key: str = Depends(verify_api_key)):
+        """Remove a node after migrating its tenants away"""
+        return await router.remove_node(url)
+
+    @app.get("/router/tenants/{tenant}")
+    async def tenant_node(tenant: str, api_key: str = Depends(verify_api_key)):
+        """Node currently owning a tenant"""
+        return {'tenant': tenant, 'node': router.node_for(tenant)}
+
+    @app.get("/router/health")
+    async def health_check():
+        return {'status': 'healthy', 'nodes': len(router.ring.nodes)}
+
+    @app.api_route("/{path:path}", methods=FORWARDED_METHODS, include_in_schema=False)
+    async def forward(request: Request):
+        return await router.forward(request)
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tenant-sharding router for ai_service nodes")
+    parser.add_argument('--nodes', default=settings.shard_nodes,
+                        help='comma-separated node base URLs (default: SHARD_NODES)')
+    parser.add_argument('--vnodes', type=int, default=settings.shard_vnodes)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=settings.port)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    router = ShardRouter(
+        parse_nodes(args.nodes), settings.api_key, vnodes=args.vnodes, timeout=settings.shard_timeout_seconds
+    )
+    uvicorn.run(create_app(router), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
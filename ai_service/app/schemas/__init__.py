@@ -14,9 +14,19 @@ from .tasks import (
     SimilarTaskGroup,
     InferredTask,
     GroupTasksRequest,
+    HierarchicalGroupRequest,
     InferDependenciesRequest,
     PrioritizeRequest,
-    PomodoroRequest
+    PomodoroRequest,
+    TaskOutcome,
+    RecordOutcomesRequest,
+    JobKind,
+    JobPriority,
+    SubmitJobRequest,
+    TaskEventType,
+    TaskEvent,
+    TaskEventsRequest,
+    EmbeddingSegment
 )
 
 __all__ = [
@@ -27,7 +37,17 @@ __all__ = [
     'SimilarTaskGroup',
     'InferredTask',
     'GroupTasksRequest',
+    'HierarchicalGroupRequest',
     'InferDependenciesRequest',
     'PrioritizeRequest',
-    'PomodoroRequest'
+    'PomodoroRequest',
+    'TaskOutcome',
+    'RecordOutcomesRequest',
+    'JobKind',
+    'JobPriority',
+    'SubmitJobRequest',
+    'TaskEventType',
+    'TaskEvent',
+    'TaskEventsRequest',
+    'EmbeddingSegment'
 ]
\ No newline at end of file
@@ -48,6 +48,10 @@ class InferredTask(BaseModel):
 class GroupTasksRequest(BaseModel):
     tasks: List[Task]
 
+class HierarchicalGroupRequest(BaseModel):
+    tasks: List[Task]
+    nGroups: Optional[List[int]] = None
+
 class InferDependenciesRequest(BaseModel):
     task: Task
 
@@ -55,4 +59,50 @@ class PrioritizeRequest(BaseModel):
     tasks: List[Task]
 
 class PomodoroRequest(BaseModel):
-    tasks: List[Task]
\ No newline at end of file
+    tasks: List[Task]
+
+class TaskOutcome(BaseModel):
+    task: Task
+    actualDuration: Optional[int] = None
+    finalPriority: Optional[TaskPriority] = None
+
+class RecordOutcomesRequest(BaseModel):
+    outcomes: List[TaskOutcome]
+
+class JobKind(str, Enum):
+    GROUP_TASKS = 'group_tasks'
+    PRIORITIZE_TASKS = 'prioritize_tasks'
+    CREATE_POMODORO_SCHEDULE = 'create_pomodoro_schedule'
+
+class JobPriority(str, Enum):
+    HIGH = 'high'
+    NORMAL = 'normal'
+    LOW = 'low'
+
+class SubmitJobRequest(BaseModel):
+    kind: JobKind
+    tasks: List[Task]
+    priority: JobPriority = JobPriority.NORMAL
+
+class TaskEventType(str, Enum):
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+
+class TaskEvent(BaseModel):
+    type: TaskEventType
+    # Required for created/updated
+    task: Optional[Task] = None
+    # Required for deleted
+    taskId: Optional[int] = None
+
+class TaskEventsRequest(BaseModel):
+    events: List[TaskEvent]
+
+class EmbeddingSegment(BaseModel):
+    tenant: str
+    taskIds: List[int]
+    tasks: List[Task]
+    dimension: int
+    # base64 of the float32 embedding rows, in taskIds order
+    embeddings: str
@@ -0,0 +1,399 @@
+"""
+Preforking server. Models are loaded and warmed once, and forked workers share them.
+
+`uvicorn --workers N` imports app.main in every worker, so torch, MiniLM and
+the tree models are loaded N times: N times the boot time and N times the
+memory. `python -m app.serve` instead works as follows:
+
+1. It sizes the BLAS/OpenMP thread pools, disables the cyclic GC and imports
+   app.main in the parent. This loads every model.
+2. It runs `warm_up()`, a dummy encode plus one pass through each model, so
+   lazy torch kernels and first-call imports are initialized once.
+3. It collects garbage and freezes the remaining objects with `gc.freeze()`.
+   Workers' collections then never write to, and so never copy, the parent's
+   pages.
+4. Only then does it bind the listening socket. This is the readiness gate:
+   nothing accepts connections before the models are warm. Workers are forked
+   to serve the socket with uvicorn.
+
+A worker is a fork of a warm process, so it is ready within milliseconds.
+Its private memory is only what it writes after the fork. The parent logs
+both for every worker. Each worker reports its status to the parent over a
+pipe, and answers /ready (200) from the time it is serving until it starts
+draining.
+
+Workers are recycled in two ways:
+
+- After `--max-requests` requests.
+- After `--max-worker-age` seconds.
+
+In both cases the replacement is forked first. The old worker is drained
+only once the replacement is ready, so capacity never drops. Replacements
+run one at a time.
+
+Signals to the parent:
+
+- TERM/INT stop all workers gracefully.
+- HUP recycles the workers one by one.
+- TTIN adds a worker and TTOU removes one.
+
+Result caches, rankings, embedding segments and metrics are per worker.
+Jobs are shared through JOB_STORAGE_PATH. A worker that is recycled or
+stopped fails its queued jobs, and any job still running after 5 seconds,
+so they never stay `running` in storage. POSIX only.
+
+    python -m app.serve --workers 4 --port 8000
+    kill -HUP <parent pid>     # rolling restart of the workers
+"""
+
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import random
+import selectors
+import signal
+import socket
+import time
+from typing import Dict, List, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+THREAD_ENV = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+HANDLED_SIGNALS = (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU, signal.SIGCHLD)
+# Seconds between housekeeping passes of the parent (reaping, age-based recycling)
+TICK_SECONDS = 1.0
+# Stop when this many workers in a row die before becoming ready
+MAX_BOOT_FAILURES = 5
+# Worker -> parent status messages
+READY = b'1'
+RECYCLE = b'r'
+# Recycling limits are spread by up to this fraction so workers do not restart together
+RECYCLE_JITTER = 0.1
+
+
+def process_memory(pid: int) -> Dict[str, int]:
+    """Resident, proportional (PSS) and private kB of a process; empty where /proc has no smaps_rollup"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding='ascii') as f:
+            fields = {line.split(':')[0]: int(line.split()[1]) for line in f if line.rstrip().endswith(' kB')}
+    except OSError:
+        return {}
+    return {
+        'rss_kb': fields.get('Rss', 0),
+        'pss_kb': fields.get('Pss', 0),
+        'private_kb': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+
+class Worker:
+    """Parent-side record of one forked worker"""
+
+    def __init__(self, pid: int, status_fd: int, replaces: Optional[int], max_age: float):
+        self.pid = pid
+        self.status_fd = status_fd
+        self.forked_at = time.monotonic()
+        self.ready_at: Optional[float] = None
+        # Worker this one takes over from once it is ready
+        self.replaces = replaces
+        self.max_age = max_age
+        self.recycle = False
+        self.retiring = False
+
+
+class PreforkServer:
+    """Forks uvicorn workers of an already loaded app onto one shared listening socket"""
+
+    def __init__(self, app, host: str, port: int, workers: int, threads_per_worker: int = 1,
+                 max_requests: int = 0, max_worker_age: float = 0.0, graceful_timeout: float = 30.0,
+                 backlog: int = 2048):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.target = workers
+        self.threads_per_worker = threads_per_worker
+        self.max_requests = max_requests
+        self.max_worker_age = max_worker_age
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.workers: Dict[int, Worker] = {}
+        self.socket: Optional[socket.socket] = None
+        self.selector = selectors.DefaultSelector()
+        self.stopping = False
+        self.kill_deadline = 0.0
+        self.boot_failures = 0
+        self.exit_code = 0
+        self._signals: List[int] = []
+        self._wakeup_fds = (-1, -1)
+
+    def run(self) -> int:
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        self.socket = socket.create_server((self.host, self.port), family=family, backlog=self.backlog)
+        wakeup_read, wakeup_write = os.pipe()
+        os.set_blocking(wakeup_read, False)
+        os.set_blocking(wakeup_write, False)
+        self._wakeup_fds = (wakeup_read, wakeup_write)
+        signal.set_wakeup_fd(wakeup_write)
+        for signum in HANDLED_SIGNALS:
+            signal.signal(signum, self._on_signal)
+        self.selector.register(wakeup_read, selectors.EVENT_READ)
+
+        logger.info(f"Listening on {self.host}:{self.port} with {self.target} workers (parent {os.getpid()})")
+        self._maintain()
+        while self.workers or not self.stopping:
+            for key, _ in self.selector.select(TICK_SECONDS):
+                if key.data is None:
+                    self._drain_wakeups()
+                else:
+                    self._on_worker_message(key.data)
+            self._handle_signals()
+            self._reap()
+            if self.stopping:
+                self._enforce_deadline()
+            else:
+                self._maintain()
+
+        signal.set_wakeup_fd(-1)
+        self.selector.close()
+        for fd in self._wakeup_fds:
+            os.close(fd)
+        self.socket.close()
+        logger.info("All workers stopped")
+        return self.exit_code
+
+    def spawn(self, replaces: Optional[int] = None) -> Worker:
+        status_read, status_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(status_read)
+            code = 1
+            try:
+                self._run_worker(status_write)
+                code = 0
+            except BaseException:
+                logger.exception("Worker crashed")
+            finally:
+                os._exit(code)
+        os.close(status_write)
+        max_age = self.max_worker_age * (1 + random.uniform(0, RECYCLE_JITTER)) if self.max_worker_age else 0.0
+        worker = Worker(pid, status_read, replaces, max_age)
+        self.workers[pid] = worker
+        self.selector.register(status_read, selectors.EVENT_READ, worker)
+        return worker
+
+    def stop(self):
+        if not self.stopping:
+            logger.info("Stopping workers")
+            self.stopping = True
+            self.kill_deadline = time.monotonic() + self.graceful_timeout + 5
+        for worker in self.workers.values():
+            self._signal(worker, signal.SIGTERM)
+
+    def retire(self, worker: Worker):
+        """Let a worker finish its in-flight requests and exit"""
+        worker.retiring = True
+        self._signal(worker, signal.SIGTERM)
+
+    def _run_worker(self, status_fd: int):
+        # Undo the parent's process-wide state inherited over fork()
+        signal.set_wakeup_fd(-1)
+        for signum in HANDLED_SIGNALS:
+            signal.signal(signum, signal.SIG_DFL)
+        self.selector.close()
+        for fd in self._wakeup_fds:
+            os.close(fd)
+        for worker in self.workers.values():
+            if worker.status_fd >= 0:
+                os.close(worker.status_fd)
+        gc.enable()
+        random.seed()
+
+        import numpy as np
+        import torch
+        import uvicorn
+        np.random.seed()
+        torch.set_num_threads(self.threads_per_worker)
+
+        max_requests = None
+        if self.max_requests:
+            max_requests = self.max_requests + random.randint(0, int(self.max_requests * RECYCLE_JITTER))
+        config = uvicorn.Config(self.app, lifespan='on', timeout_graceful_shutdown=int(self.graceful_timeout))
+        asyncio.run(self._serve(uvicorn.Server(config), status_fd, max_requests))
+
+    async def _serve(self, server, status_fd: int, max_requests: Optional[int]):
+        serving = asyncio.ensure_future(server.serve(sockets=[self.socket]))
+        while not server.started and not serving.done():
+            await asyncio.sleep(0.002)
+        if server.started:
+            os.write(status_fd, READY)
+        # Past max_requests the parent starts a replacement and drains this worker once it is ready
+        while max_requests and not serving.done():
+            if server.server_state.total_requests >= max_requests:
+                os.write(status_fd, RECYCLE)
+                break
+            await asyncio.wait({serving}, timeout=0.1)
+        await serving
+
+    def _on_worker_message(self, worker: Worker):
+        messages = os.read(worker.status_fd, 16)
+        if not messages:
+            self._close_status_pipe(worker)  # exited; _reap handles it
+            return
+        if READY in messages:
+            self._on_ready(worker)
+        if RECYCLE in messages and not worker.retiring:
+            logger.info(f"Worker {worker.pid} served its maximum number of requests")
+            worker.recycle = True
+
+    def _on_ready(self, worker: Worker):
+        worker.ready_at = time.monotonic()
+        self.boot_failures = 0
+        memory = process_memory(worker.pid)
+        logger.info(
+            f"Worker {worker.pid} ready in {(worker.ready_at - worker.forked_at) * 1000:.1f}ms"
+            + (f" (rss {memory['rss_kb'] / 1024:.0f}MB, pss {memory['pss_kb'] / 1024:.0f}MB, "
+               f"private {memory['private_kb'] / 1024:.1f}MB)" if memory else "")
+        )
+        previous = self.workers.get(worker.replaces)
+        worker.replaces = None
+        if previous is not None:
+            logger.info(f"Worker {worker.pid} took over from {previous.pid}")
+            self.retire(previous)
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            self._close_status_pipe(worker)
+            for other in self.workers.values():
+                if other.replaces == pid:
+                    other.replaces = None
+            code = os.waitstatus_to_exitcode(status)
+            if self.stopping or worker.retiring:
+                logger.info(f"Worker {pid} exited ({code})")
+            elif worker.ready_at is None:
+                self.boot_failures += 1
+                logger.error(f"Worker {pid} died during startup ({code})")
+                if self.boot_failures >= MAX_BOOT_FAILURES:
+                    logger.error(f"{self.boot_failures} workers in a row failed to start; shutting down")
+                    self.exit_code = 1
+                    self.stop()
+            else:
+                logger.error(f"Worker {pid} exited unexpectedly ({code}); forking a replacement")
+
+    def _maintain(self):
+        """Keep `target` serving workers and run one rolling replacement at a time"""
+        now = time.monotonic()
+        serving = [w for w in self.workers.values() if not w.retiring and w.replaces is None]
+        for _ in range(self.target - len(serving)):
+            self.spawn()
+        for worker in sorted(serving, key=lambda w: w.forked_at)[:max(0, len(serving) - self.target)]:
+            self.retire(worker)
+
+        for worker in serving:
+            if worker.max_age and worker.ready_at is not None and now - worker.forked_at > worker.max_age:
+                worker.recycle = True
+        if any(w.replaces is not None for w in self.workers.values()):
+            return
+        due = [w for w in serving if w.recycle and not w.retiring]
+        if due:
+            self.spawn(replaces=due[0].pid)
+
+    def _handle_signals(self):
+        signals, self._signals = self._signals, []
+        for signum in signals:
+            if signum in (signal.SIGTERM, signal.SIGINT):
+                self.stop()
+            elif signum == signal.SIGHUP and not self.stopping:
+                logger.info("Recycling all workers")
+                for worker in self.workers.values():
+                    worker.recycle = True
+            elif signum == signal.SIGTTIN:
+                self.target += 1
+                logger.info(f"Scaling to {self.target} workers")
+            elif signum == signal.SIGTTOU and self.target > 1:
+                self.target -= 1
+                logger.info(f"Scaling to {self.target} workers")
+
+    def _enforce_deadline(self):
+        if time.monotonic() < self.kill_deadline:
+            return
+        for worker in self.workers.values():
+            logger.error(f"Worker {worker.pid} did not stop in time; killing it")
+            self._signal(worker, signal.SIGKILL)
+        self.kill_deadline = time.monotonic() + TICK_SECONDS * 5
+
+    def _close_status_pipe(self, worker: Worker):
+        if worker.status_fd >= 0:
+            self.selector.unregister(worker.status_fd)
+            os.close(worker.status_fd)
+            worker.status_fd = -1
+
+    def _on_signal(self, signum, frame):
+        self._signals.append(signum)
+
+    def _drain_wakeups(self):
+        try:
+            while os.read(self._wakeup_fds[0], 512):
+                pass
+        except BlockingIOError:
+            pass
+
+    @staticmethod
+    def _signal(worker: Worker, signum: int):
+        try:
+            os.kill(worker.pid, signum)
+        except ProcessLookupError:
+            pass
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Preforking ai_service server with shared warm models")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=settings.port)
+    parser.add_argument('--workers', type=int, default=settings.serve_workers, help='0 = one per CPU')
+    parser.add_argument('--threads-per-worker', type=int, default=settings.serve_threads_per_worker)
+    parser.add_argument('--max-requests', type=int, default=settings.serve_max_requests)
+    parser.add_argument('--max-worker-age', type=float, default=settings.serve_max_worker_age_seconds)
+    parser.add_argument('--graceful-timeout', type=float, default=settings.serve_graceful_timeout_seconds)
+    parser.add_argument('--backlog', type=int, default=2048)
+    args = parser.parse_args(argv)
+
+    # Before numpy/torch are imported, so their pools are sized for one worker
+    for name in THREAD_ENV:
+        os.environ.setdefault(name, str(args.threads_per_worker))
+    gc.disable()
+    start = time.perf_counter()
+    from . import main as service
+    import torch
+    # No parallel region may run before fork(): OpenMP thread pools do not survive it
+    torch.set_num_threads(1)
+    service.warm_up()
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        f"Models loaded and warmed in {time.perf_counter() - start:.1f}s "
+        f"({gc.get_freeze_count()} objects frozen)"
+    )
+
+    server = PreforkServer(
+        service.app, args.host, args.port, args.workers or os.cpu_count() or 1,
+        threads_per_worker=args.threads_per_worker, max_requests=args.max_requests,
+        max_worker_age=args.max_worker_age, graceful_timeout=args.graceful_timeout, backlog=args.backlog
+    )
+    return server.run()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    raise SystemExit(main())
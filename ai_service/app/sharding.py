@@ -0,0 +1,80 @@
+"""
+Consistent hashing of tenants onto ai_service nodes.
+
+Each node is placed on a 64-bit ring at `vnodes` pseudo-random points so
+load spreads evenly and adding or removing a node only moves the tenants
+in the arcs it gains or loses (about 1/N of them).
+"""
+
+import bisect
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_VNODES = 128
+TENANT_HEADER = 'X-Tenant-Id'
+DEFAULT_TENANT = 'default'
+
+
+def ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Thread-safe consistent-hash ring with virtual nodes"""
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = DEFAULT_VNODES):
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        self._nodes: List[str] = []
+        self._lock = threading.Lock()
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> List[str]:
+        with self._lock:
+            return list(self._nodes)
+
+    def add(self, node: str):
+        with self._lock:
+            if node in self._nodes:
+                return
+            self._nodes.append(node)
+            self._rebuild()
+
+    def remove(self, node: str):
+        with self._lock:
+            if node not in self._nodes:
+                return
+            self._nodes.remove(node)
+            self._rebuild()
+
+    def node_for(self, key: str) -> Optional[str]:
+        """Owner of `key`: the first virtual node clockwise from its hash"""
+        with self._lock:
+            if not self._points:
+                return None
+            index = bisect.bisect_right(self._points, ring_hash(key)) % len(self._points)
+            return self._owners[index]
+
+    def ownership(self) -> Dict[str, float]:
+        """Share of the hash space owned by each node"""
+        with self._lock:
+            points, owners = list(self._points), list(self._owners)
+        if not points:
+            return {}
+        space = float(2 ** 64)
+        shares = {node: 0.0 for node in owners}
+        for i, point in enumerate(points):
+            previous = points[i - 1] if i else points[-1] - 2 ** 64
+            shares[owners[i]] += (point - previous) / space
+        return shares
+
+    def _rebuild(self):
+        placed: List[Tuple[int, str]] = sorted(
+            (ring_hash(f"{node}#{i}"), node) for node in self._nodes for i in range(self.vnodes)
+        )
+        self._points = [point for point, _ in placed]
+        self._owners = [node for _, node in placed]
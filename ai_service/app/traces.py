@@ -0,0 +1,68 @@
+"""
+Request trace recording for load-test replay.
+
+With `TRACE_RECORD_PATH` set, every API request is appended to a JSON-lines
+file as it completes. Each line holds:
+
+- arrival time (`ts`, unix seconds)
+- method, path and query string
+- tenant header
+- raw body
+
+benchmarks/loadtest.py replays these traces with their original inter-arrival
+times. Operational routes (/admin, /metrics, /health, docs) are not recorded,
+and neither are credentials. Task payloads are, so only enable recording on
+traffic you are allowed to keep.
+"""
+
+import json
+import os
+import threading
+import time
+
+from .sharding import TENANT_HEADER
+
+SKIPPED_PREFIXES = ('/admin', '/metrics', '/health', '/docs', '/redoc', '/openapi.json')
+
+
+class TraceRecorder:
+    """ASGI middleware appending each request to a JSON-lines trace"""
+
+    def __init__(self, app, path: str):
+        self.app = app
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8', buffering=1)
+        self._lock = threading.Lock()
+        self._tenant_header = TENANT_HEADER.lower().encode('latin-1')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'].startswith(SKIPPED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        arrived = time.time()
+        chunks = []
+
+        async def recording_receive():
+            message = await receive()
+            if message['type'] == 'http.request':
+                chunks.append(message.get('body', b''))
+            return message
+
+        try:
+            await self.app(scope, recording_receive, send)
+        finally:
+            self._write(arrived, scope, b''.join(chunks))
+
+    def _write(self, arrived: float, scope, body: bytes):
+        tenant = next((value for name, value in scope['headers'] if name == self._tenant_header), None)
+        line = json.dumps({
+            'ts': arrived,
+            'method': scope['method'],
+            'path': scope['path'],
+            'query': scope.get('query_string', b'').decode('latin-1'),
+            'tenant': tenant.decode('latin-1') if tenant is not None else None,
+            'body': body.decode('utf-8', errors='replace')
+        })
+        with self._lock:
+            self._file.write(line + '\n')
@@ -0,0 +1,17 @@
+"""
+Training Utilities
+
+Exports:
+- TaskPairFeatures: Columnar task data for scoring training pairs
+- select_pairs: Budgeted positive / hard-negative pair sampling
+- TaskPairDataset: Lazy InputExample stream for the DataLoader
+"""
+
+from .pairs import TaskPairFeatures, TaskPairDataset, iter_pair_blocks, select_pairs
+
+__all__ = [
+    'TaskPairFeatures',
+    'TaskPairDataset',
+    'iter_pair_blocks',
+    'select_pairs'
+]
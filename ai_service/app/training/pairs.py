@@ -0,0 +1,250 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from sentence_transformers import InputExample
+from torch.utils.data import IterableDataset
+
+from ..models.features import PRIORITY_LEVELS, task_duration, task_text
+
+# Similarity criteria weights
+TYPE_WEIGHT = 0.3
+DESCRIPTION_WEIGHT = 0.4
+DURATION_WEIGHT = 0.2
+PRIORITY_WEIGHT = 0.1
+
+POSITIVE_THRESHOLD = 0.6
+
+# Target number of pair scores held in memory per block
+BLOCK_CELLS = 4_000_000
+
+
+class TaskPairFeatures:
+    """Per-task columns needed to score task pairs, tokenized once"""
+
+    def __init__(self, tasks: Sequence[Dict]):
+        self.tasks = tasks
+        self.size = len(tasks)
+
+        _, self.type_codes = np.unique(
+            np.array([str(task.get('type')) for task in tasks], dtype=object),
+            return_inverse=True
+        )
+        self.durations = np.array([task_duration(task) for task in tasks], dtype=np.float64)
+        self.priorities = np.array(
+            [PRIORITY_LEVELS.get(task.get('priority', 'medium'), 2) for task in tasks],
+            dtype=np.float64
+        )
+        self.words, self.word_counts = self._tokenize(tasks)
+
+    @staticmethod
+    def _tokenize(tasks: Sequence[Dict]) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        """Binary task x word matrix over description words"""
+        vocabulary = {}
+        indices = []
+        indptr = [0]
+        for task in tasks:
+            words = set((task.get('description') or '').lower().split())
+            indices.extend(vocabulary.setdefault(word, len(vocabulary)) for word in words)
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float64), indices, indptr),
+            shape=(len(tasks), max(1, len(vocabulary)))
+        )
+        return matrix, np.diff(indptr).astype(np.float64)
+
+    def text(self, index: int) -> str:
+        return task_text(self.tasks[index])
+
+    def score(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Similarity score for every (row, col) combination"""
+        intersection = (self.words[rows] @ self.words[cols].T).toarray()
+        return self._combine(rows[:, None], cols[None, :], intersection)
+
+    def score_pairs(self, i_idx: np.ndarray, j_idx: np.ndarray) -> np.ndarray:
+        """Similarity score for aligned pairs (i_idx[k], j_idx[k])"""
+        intersection = np.asarray(
+            self.words[i_idx].multiply(self.words[j_idx]).sum(axis=1)
+        ).ravel()
+        return self._combine(i_idx, j_idx, intersection)
+
+    def _combine(self, i_idx: np.ndarray, j_idx: np.ndarray, intersection: np.ndarray) -> np.ndarray:
+        # Type similarity
+        score = np.where(self.type_codes[i_idx] == self.type_codes[j_idx], TYPE_WEIGHT, 0.0)
+
+        # Description similarity (Jaccard over keywords)
+        counts_i = self.word_counts[i_idx]
+        counts_j = self.word_counts[j_idx]
+        union = counts_i + counts_j - intersection
+        with np.errstate(divide='ignore', invalid='ignore'):
+            overlap = np.where((counts_i > 0) & (counts_j > 0), intersection / union, 0.0)
+        score = score + DESCRIPTION_WEIGHT * overlap
+
+        # Duration similarity
+        dur_i = self.durations[i_idx]
+        dur_j = self.durations[j_idx]
+        duration_similarity = 1 - np.abs(dur_i - dur_j) / np.maximum(np.maximum(dur_i, dur_j), 60)
+        score = score + DURATION_WEIGHT * duration_similarity
+
+        # Priority similarity
+        priority_similarity = 1 - np.abs(self.priorities[i_idx] - self.priorities[j_idx]) / 3
+        return score + PRIORITY_WEIGHT * priority_similarity
+
+
+def iter_pair_blocks(
+    features: TaskPairFeatures,
+    candidates_per_task: Optional[int] = None,
+    seed: int = 42
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Yield (i, j, score) arrays for task pairs with i < j, one block at a time.
+
+    By default every pair is scored. With `candidates_per_task`, each task is
+    only compared against that many randomly drawn partners, which keeps the
+    work linear in the number of tasks.
+    """
+    n = features.size
+    if n < 2:
+        return
+
+    if candidates_per_task is None or candidates_per_task >= n - 1:
+        block_rows = max(1, BLOCK_CELLS // n)
+        for start in range(0, n - 1, block_rows):
+            rows = np.arange(start, min(start + block_rows, n - 1))
+            cols = np.arange(start + 1, n)
+            scores = features.score(rows, cols)
+            # Keep the upper triangle only, in row-major order
+            i_idx, j_off = np.nonzero(cols[None, :] > rows[:, None])
+            yield rows[i_idx], cols[j_off], scores[i_idx, j_off]
+        return
+
+    rng = np.random.default_rng(seed)
+    block_rows = max(1, BLOCK_CELLS // candidates_per_task)
+    for start in range(0, n, block_rows):
+        rows = np.arange(start, min(start + block_rows, n))
+        # Draw partners from the other n - 1 tasks
+        partners = rng.integers(0, n - 1, size=(len(rows), candidates_per_task))
+        partners += partners >= rows[:, None]
+
+        i_idx = np.repeat(rows, candidates_per_task)
+        j_idx = partners.ravel()
+        yield np.minimum(i_idx, j_idx), np.maximum(i_idx, j_idx), features.score_pairs(i_idx, j_idx)
+
+
+class _Reservoir:
+    """Uniform sample without replacement over a stream, via bottom-k random keys"""
+
+    def __init__(self, capacity: int, rng: np.random.Generator):
+        self.capacity = capacity
+        self.rng = rng
+        self.keys = np.empty(0)
+        self.columns = [np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)]
+
+    def add(self, i_idx: np.ndarray, j_idx: np.ndarray, scores: np.ndarray):
+        if self.capacity == 0 or len(scores) == 0:
+            return
+        self.keys = np.concatenate([self.keys, self.rng.random(len(scores))])
+        self.columns = [
+            np.concatenate([old, new]) for old, new in zip(self.columns, (i_idx, j_idx, scores))
+        ]
+        if len(self.keys) > 2 * self.capacity:
+            self._truncate(self.capacity)
+
+    def take(self, count: int) -> List[np.ndarray]:
+        self._truncate(count)
+        return self.columns
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _truncate(self, count: int):
+        if len(self.keys) <= count:
+            return
+        keep = np.argpartition(self.keys, count)[:count]
+        self.keys = self.keys[keep]
+        self.columns = [column[keep] for column in self.columns]
+
+
+def select_pairs(
+    features: TaskPairFeatures,
+    budget: Optional[int] = None,
+    positive_fraction: float = 0.4,
+    hard_negative_fraction: float = 0.3,
+    hard_margin: float = 0.15,
+    candidates_per_task: Optional[int] = None,
+    seed: int = 42
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pick at most `budget` training pairs as (i, j, score) arrays.
+
+    Pairs are split into positives (score above the threshold), hard
+    negatives (within `hard_margin` below it) and easy negatives, and each
+    class gets its share of the budget. Unused share is handed to the other
+    classes. Memory stays proportional to the budget, not to n².
+    """
+    blocks = iter_pair_blocks(features, candidates_per_task, seed)
+    if budget is None:
+        collected = list(blocks)
+        if not collected:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        return tuple(np.concatenate(column) for column in zip(*collected))
+
+    rng = np.random.default_rng(seed)
+    positives, hard, easy = (_Reservoir(budget, rng) for _ in range(3))
+    for i_idx, j_idx, scores in blocks:
+        positive = scores > POSITIVE_THRESHOLD
+        near = ~positive & (scores > POSITIVE_THRESHOLD - hard_margin)
+        far = ~(positive | near)
+        for reservoir, mask in ((positives, positive), (hard, near), (easy, far)):
+            reservoir.add(i_idx[mask], j_idx[mask], scores[mask])
+
+    quotas = [
+        int(budget * positive_fraction),
+        int(budget * hard_negative_fraction),
+    ]
+    quotas.append(budget - sum(quotas))
+    reservoirs = [positives, hard, easy]
+
+    # Hand budget a class cannot use to the classes that still have pairs
+    spare = sum(max(0, quota - len(reservoir)) for quota, reservoir in zip(quotas, reservoirs))
+    quotas = [min(quota, len(reservoir)) for quota, reservoir in zip(quotas, reservoirs)]
+    for k, reservoir in enumerate(reservoirs):
+        extra = min(spare, len(reservoir) - quotas[k])
+        quotas[k] += extra
+        spare -= extra
+
+    selected = [reservoir.take(quota) for reservoir, quota in zip(reservoirs, quotas)]
+    return tuple(np.concatenate(column) for column in zip(*selected))
+
+
+class TaskPairDataset(IterableDataset):
+    """Lazily materializes InputExamples for the selected pairs.
+
+    Texts are only built when the DataLoader asks for them, and the pair
+    order is reshuffled (deterministically) on every pass.
+    """
+
+    def __init__(self, features: TaskPairFeatures, pairs: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                 shuffle: bool = True, seed: int = 42):
+        self.features = features
+        self.i_idx, self.j_idx, self.scores = pairs
+        self.shuffle = shuffle
+        self.seed = seed
+        self._epoch = 0
+
+    def __len__(self):
+        return len(self.scores)
+
+    def set_epoch(self, epoch: int):
+        """Pin the shuffle order of the next pass, e.g. when resuming training"""
+        self._epoch = epoch
+
+    def __iter__(self) -> Iterator[InputExample]:
+        order = np.arange(len(self.scores))
+        if self.shuffle:
+            np.random.default_rng(self.seed + self._epoch).shuffle(order)
+        self._epoch += 1
+
+        for k in order:
+            i, j = self.i_idx[k], self.j_idx[k]
+            label = 1.0 if self.scores[k] > POSITIVE_THRESHOLD else 0.0
+            yield InputExample(texts=[self.features.text(i), self.features.text(j)], label=label)
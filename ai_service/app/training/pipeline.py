@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(*parts: Any) -> str:
+    """Stable hash of JSON-serializable parts and numpy arrays"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(str((part.dtype, part.shape)).encode('utf-8'))
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()[:24]
+
+
+def _atomic_write(path: str, write: Callable[[str], None]):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class ArtifactStore:
+    """Content-addressed cache for intermediate training artifacts.
+
+    Each stage stores its output under `<root>/<stage>/<key>`, where the key
+    hashes everything the stage depends on, so a rerun only recomputes the
+    stages whose inputs changed.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, stage: str, key: str, suffix: str = '') -> str:
+        return os.path.join(self.root, stage, f"{key}{suffix}")
+
+    def load_arrays(self, stage: str, key: str) -> Optional[Dict[str, np.ndarray]]:
+        path = self.path(stage, key, '.npz')
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+
+    def save_arrays(self, stage: str, key: str, arrays: Dict[str, np.ndarray]):
+        def write(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **arrays)
+        _atomic_write(self.path(stage, key, '.npz'), write)
+
+    def load_object(self, stage: str, key: str) -> Optional[Any]:
+        path = self.path(stage, key, '.pkl')
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def save_object(self, stage: str, key: str, obj: Any):
+        def write(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(obj, f)
+        _atomic_write(self.path(stage, key, '.pkl'), write)
+
+    def cached_arrays(self, stage: str, key: str,
+                      compute: Callable[[], Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """Return the stored arrays for `key`, computing and storing them on a miss"""
+        arrays = self.load_arrays(stage, key)
+        if arrays is not None:
+            logger.info(f"[{stage}] reusing cached artifact {key}")
+            return arrays
+
+        start = time.perf_counter()
+        arrays = compute()
+        self.save_arrays(stage, key, arrays)
+        logger.info(f"[{stage}] computed artifact {key} in {time.perf_counter() - start:.1f}s")
+        return arrays
+
+
+class EpochCheckpoints:
+    """Per-epoch model checkpoints that let fine-tuning resume after a failure.
+
+    Next to the weights, each checkpoint can hold the optimizer and scheduler
+    state, so a resumed run continues the same learning-rate schedule.
+    """
+
+    STATE_FILE = 'state.json'
+    TRAINING_STATE_FILE = 'training_state.pt'
+
+    def __init__(self, directory: str, keep: int = 2):
+        self.directory = directory
+        self.keep = keep
+
+    def latest(self) -> Tuple[int, Optional[str]]:
+        """Number of completed epochs and the checkpoint to resume from"""
+        state_path = os.path.join(self.directory, self.STATE_FILE)
+        if not os.path.exists(state_path):
+            return 0, None
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        path = os.path.join(self.directory, state['checkpoint'])
+        if not os.path.isdir(path):
+            return 0, None
+        return state['completed_epochs'], path
+
+    def training_state(self, path: str) -> Optional[Dict]:
+        """Optimizer/scheduler state saved with the checkpoint at `path`, if any"""
+        state_path = os.path.join(path, self.TRAINING_STATE_FILE)
+        if not os.path.exists(state_path):
+            return None
+        return torch.load(state_path, map_location='cpu')
+
+    def save(self, model, completed_epochs: int, training_state: Optional[Dict] = None) -> str:
+        name = f"epoch-{completed_epochs}"
+        path = os.path.join(self.directory, name)
+        model.save(path)
+        if training_state is not None:
+            torch.save(training_state, os.path.join(path, self.TRAINING_STATE_FILE))
+
+        # The state file is only updated once the checkpoint is complete
+        def write(tmp_path):
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'completed_epochs': completed_epochs, 'checkpoint': name}, f)
+        _atomic_write(os.path.join(self.directory, self.STATE_FILE), write)
+
+        self._prune(completed_epochs)
+        return path
+
+    def _prune(self, completed_epochs: int):
+        for epoch in range(completed_epochs - self.keep + 1):
+            stale = os.path.join(self.directory, f"epoch-{epoch}")
+            if os.path.isdir(stale):
+                shutil.rmtree(stale, ignore_errors=True)
+
+
+def _fit_and_score(name: str, estimator, X_train: np.ndarray, y_train: np.ndarray,
+                   X_test: np.ndarray, y_test: np.ndarray,
+                   metric: Callable[[np.ndarray, np.ndarray], float]) -> Tuple[str, Any, float, float]:
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    score = metric(y_test, estimator.predict(X_test)) if len(y_test) else float('nan')
+    return name, estimator, score, time.perf_counter() - start
+
+
+def fit_models_parallel(specs: Sequence[Tuple[str, Any, np.ndarray, np.ndarray, np.ndarray, np.ndarray, Callable]],
+                        max_workers: Optional[int] = None) -> Dict[str, Tuple[Any, float, float]]:
+    """Fit independent estimators in separate processes.
+
+    `specs` holds (name, estimator, X_train, y_train, X_test, y_test, metric)
+    tuples; the result maps each name to (fitted estimator, test score,
+    fit seconds).
+    """
+    if not specs:
+        return {}
+
+    workers = min(len(specs), max_workers or os.cpu_count() or 1)
+    if workers == 1:
+        results = [_fit_and_score(*spec) for spec in specs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_fit_and_score, *spec) for spec in specs]
+            results = [future.result() for future in futures]
+
+    return {name: (estimator, score, seconds) for name, estimator, score, seconds in results}
+
+
+def split_cores(parallel_fits: int) -> int:
+    """`n_jobs` for each estimator when `parallel_fits` of them train at once"""
+    return max(1, (os.cpu_count() or 1) // max(1, parallel_fits))
@@ -0,0 +1,19 @@
+"""
+ai_service Benchmarks
+
+Exports:
+- SyntheticTaskGenerator: Deterministic task lists shaped like the training data
+- HashingEncoder: Offline stand-in for the sentence encoder
+- BenchmarkRunner: Latency, throughput and peak-memory measurement
+"""
+
+from .synthetic import SyntheticTaskGenerator
+from .encoders import HashingEncoder
+from .harness import BenchmarkRunner, OPERATIONS
+
+__all__ = [
+    'SyntheticTaskGenerator',
+    'HashingEncoder',
+    'BenchmarkRunner',
+    'OPERATIONS'
+]
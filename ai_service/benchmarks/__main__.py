@@ -0,0 +1,81 @@
+"""
+Run the ai_service benchmark suite.
+
+    python -m benchmarks                                  # all operations, all sizes
+    python -m benchmarks --encoder hashing --sizes 100 1000
+    python -m benchmarks --save-baseline main             # store benchmarks/baselines/main.json
+    python -m benchmarks --compare main                   # exit 1 on p50 regressions
+
+benchmarks/baselines/hashing.json is the committed reference run with the
+offline encoder at 100/1k/10k tasks. Check a change against it with
+`--encoder hashing --sizes 100 1000 10000 --compare hashing`, on a machine
+comparable to the one recorded in its `environment`.
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from .encoders import load_encoder
+from .harness import (
+    DEFAULT_SIZES, OPERATIONS, BenchmarkRunner, compare_to_baseline,
+    environment_info, load_baseline, save_baseline
+)
+from .synthetic import SyntheticTaskGenerator
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--operations', nargs='+', choices=sorted(OPERATIONS), default=list(OPERATIONS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--encoder', default='all-MiniLM-L6-v2',
+                        help="SentenceTransformer name/path, or 'hashing' for the offline stand-in")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--max-seconds', type=float, default=60.0,
+                        help='skip larger sizes once a single run takes longer than this')
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced peak-memory run')
+    parser.add_argument('--output', help='write the full JSON report here')
+    parser.add_argument('--save-baseline', metavar='NAME')
+    parser.add_argument('--compare', metavar='NAME', help='compare against a stored baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    generator = SyntheticTaskGenerator(seed=args.seed)
+    datasets = {size: generator.generate(size) for size in args.sizes}
+
+    runner = BenchmarkRunner(
+        load_encoder(args.encoder),
+        repeats=args.repeats,
+        warmup=args.warmup,
+        max_seconds=args.max_seconds,
+        measure_memory=not args.no_memory
+    )
+    results = runner.run([OPERATIONS[name] for name in args.operations], datasets)
+
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'seed': args.seed,
+        'environment': environment_info(args.encoder),
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        save_baseline(args.save_baseline, report)
+
+    if args.compare:
+        comparisons = compare_to_baseline(results, load_baseline(args.compare), args.tolerance)
+        for c in comparisons:
+            flag = 'REGRESSION' if c['regression'] else 'ok'
+            print(f"{c['operation']:<26} n={c['size']:<7} {c['ratio']:6.2f}x baseline  {flag}")
+        if any(c['regression'] for c in comparisons):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
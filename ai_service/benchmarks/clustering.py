@@ -0,0 +1,111 @@
+"""
+Compare clustering engines on labelled synthetic embeddings.
+
+    python -m benchmarks.clustering
+    python -m benchmarks.clustering --sizes 2000 20000 100000 --engines dbscan birch
+
+Data are Gaussian blobs in the sentence-embedding dimension, so quality is
+reported as adjusted Rand index against the true blobs and against
+sklearn's DBSCAN (the previous implementation) where that still fits in
+memory, alongside runtime and traced peak memory.
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from typing import Dict, Optional
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+from sklearn.datasets import make_blobs
+from sklearn.metrics import adjusted_rand_score
+
+from app.models.clustering import ENGINES, default_min_samples, estimate_eps, make_engine
+
+DEFAULT_SIZES = [1000, 5000, 20000]
+
+
+def run_engine(name: str, embeddings: np.ndarray, eps: float, min_samples: int,
+               n_jobs: Optional[int]) -> Dict:
+    if name == 'sklearn':
+        fit = lambda: DBSCAN(eps=eps, min_samples=min_samples).fit(embeddings).labels_
+    else:
+        engine = make_engine(name, n_jobs)
+        fit = lambda: engine.fit_predict(embeddings, eps, min_samples)
+
+    start = time.perf_counter()
+    labels = fit()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        fit()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'labels': labels, 'seconds': seconds, 'peak_memory_bytes': peak}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=['dbscan', 'birch'])
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--clusters', type=int, default=50)
+    parser.add_argument('--eps-percentile', type=float, default=2.0,
+                        help='percentile of pairwise distances used as eps (blobs need a low one)')
+    parser.add_argument('--n-jobs', type=int, default=None)
+    parser.add_argument('--max-reference-size', type=int, default=20000,
+                        help="largest size at which sklearn's DBSCAN is run as the reference")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    rows = []
+    for size in args.sizes:
+        embeddings, truth = make_blobs(
+            size, n_features=args.dimension, centers=args.clusters, random_state=args.seed
+        )
+        embeddings = embeddings.astype(np.float32)
+        eps = estimate_eps(embeddings, percentile=args.eps_percentile)
+        min_samples = default_min_samples(size)
+
+        engines = list(args.engines)
+        if size <= args.max_reference_size:
+            engines.insert(0, 'sklearn')
+
+        reference = None
+        for name in engines:
+            result = run_engine(name, embeddings, eps, min_samples, args.n_jobs)
+            labels = result['labels']
+            if name == 'sklearn':
+                reference = labels
+            row = {
+                'engine': name,
+                'size': size,
+                'seconds': result['seconds'],
+                'peak_memory_bytes': result['peak_memory_bytes'],
+                'clusters': int(labels.max() + 1) if len(labels) else 0,
+                'noise_fraction': float(np.mean(labels == -1)),
+                'ari_truth': float(adjusted_rand_score(truth, labels)),
+                'ari_sklearn': float(adjusted_rand_score(reference, labels)) if reference is not None else None
+            }
+            rows.append(row)
+            ari_sklearn = f"{row['ari_sklearn']:.3f}" if row['ari_sklearn'] is not None else '  n/a'
+            print(
+                f"{name:<8} n={size:<7} {row['seconds']:8.2f}s  peak={row['peak_memory_bytes'] / 2**20:9.1f}MiB  "
+                f"clusters={row['clusters']:<5} noise={row['noise_fraction']:.3f}  "
+                f"ARI(truth)={row['ari_truth']:.3f}  ARI(sklearn)={ari_sklearn}",
+                flush=True
+            )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'results': rows}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
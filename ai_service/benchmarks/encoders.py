@@ -0,0 +1,44 @@
+import hashlib
+from typing import List, Union
+
+import numpy as np
+
+
+class HashingEncoder:
+    """Offline stand-in for SentenceTransformer with the same `encode` API.
+
+    Words are feature-hashed into a fixed-size, L2-normalized vector. It has
+    none of MiniLM's semantics, but it is deterministic and needs no model
+    download, so benchmarks and load tests can run anywhere.
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               convert_to_numpy: bool = True, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                digest = hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], 'little') % self.dimension
+                sign = 1.0 if digest[4] & 1 else -1.0
+                vectors[row, bucket] += sign
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        return vectors[0] if single else vectors
+
+
+def load_encoder(name: str):
+    """'hashing' for the offline stand-in, otherwise a SentenceTransformer name or path"""
+    if name == 'hashing':
+        return HashingEncoder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
@@ -0,0 +1,199 @@
+import json
+import os
+import platform
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.models.embeddings import TaskEmbedder
+from app.models.task_model import TaskModel
+
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+# Number of find_similar_tasks queries timed per run
+SIMILARITY_QUERIES = 10
+
+
+class Operation:
+    """A benchmarked call: `setup` builds fresh state, `run` is what gets timed"""
+
+    def __init__(self, name: str, run: Callable[[TaskModel, List[Dict]], object],
+                 setup: Optional[Callable[[TaskModel, List[Dict]], None]] = None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+
+
+def _prepare_embeddings(model: TaskModel, tasks: List[Dict]):
+    for task in tasks:
+        model.embedder.add_task(task)
+
+
+def _find_similar(model: TaskModel, tasks: List[Dict]):
+    step = max(1, len(tasks) // SIMILARITY_QUERIES)
+    return [model.find_similar_tasks(task['id']) for task in tasks[::step][:SIMILARITY_QUERIES]]
+
+
+OPERATIONS = {
+    op.name: op for op in [
+        Operation('group_similar_tasks', lambda model, tasks: model.group_similar_tasks(tasks)),
+        Operation('prioritize_tasks', lambda model, tasks: model.prioritize_tasks(tasks)),
+        Operation('infer_dependencies', lambda model, tasks: [model.infer_dependencies(t) for t in tasks]),
+        Operation('create_pomodoro_schedule', lambda model, tasks: model.create_pomodoro_schedule(tasks)),
+        Operation('find_similar_tasks', _find_similar, setup=_prepare_embeddings),
+    ]
+}
+
+
+def percentile_summary(latencies: Sequence[float]) -> Dict[str, float]:
+    values = np.asarray(latencies, dtype=np.float64)
+    return {
+        'min': float(values.min()),
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max()),
+        'mean': float(values.mean())
+    }
+
+
+class BenchmarkRunner:
+    """Times each operation at each size and records latency, throughput and peak memory.
+
+    Every timed run starts from a fresh `TaskModel` sharing one loaded
+    encoder, so caches are cold and runs are comparable. Peak memory comes
+    from a separate traced run so tracemalloc does not skew the timings.
+    Larger sizes of an operation are skipped once one run exceeds
+    `max_seconds`, since the next size would only be slower.
+    """
+
+    def __init__(self, encoder, repeats: int = 5, warmup: int = 1, max_seconds: float = 60.0,
+                 measure_memory: bool = True):
+        self.encoder = encoder
+        self.repeats = repeats
+        self.warmup = warmup
+        self.max_seconds = max_seconds
+        self.measure_memory = measure_memory
+
+    def fresh_model(self) -> TaskModel:
+        return TaskModel(TaskEmbedder(model=self.encoder), load_nlp_pipeline=False)
+
+    def run(self, operations: Sequence[Operation], datasets: Dict[int, List[Dict]]) -> List[Dict]:
+        results = []
+        for operation in operations:
+            too_slow = False
+            for size in sorted(datasets):
+                if too_slow:
+                    results.append({'operation': operation.name, 'size': size, 'skipped': True})
+                    continue
+                result = self.measure(operation, datasets[size])
+                results.append(result)
+                print(format_result(result), flush=True)
+                too_slow = result['latency']['max'] > self.max_seconds
+        return results
+
+    def measure(self, operation: Operation, tasks: List[Dict]) -> Dict:
+        latencies = []
+        for iteration in range(self.warmup + self.repeats):
+            model = self._setup(operation, tasks)
+            start = time.perf_counter()
+            operation.run(model, tasks)
+            elapsed = time.perf_counter() - start
+            if iteration >= self.warmup:
+                latencies.append(elapsed)
+            # A single slow run is enough to describe very large sizes
+            if elapsed > self.max_seconds:
+                latencies = latencies or [elapsed]
+                break
+
+        result = {
+            'operation': operation.name,
+            'size': len(tasks),
+            'runs': len(latencies),
+            'latency': percentile_summary(latencies),
+            'throughput': len(tasks) / float(np.median(latencies))
+        }
+        if self.measure_memory:
+            result['peak_memory_bytes'] = self._peak_memory(operation, tasks)
+        return result
+
+    def _setup(self, operation: Operation, tasks: List[Dict]) -> TaskModel:
+        model = self.fresh_model()
+        if operation.setup:
+            operation.setup(model, tasks)
+        return model
+
+    def _peak_memory(self, operation: Operation, tasks: List[Dict]) -> int:
+        model = self._setup(operation, tasks)
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            operation.run(model, tasks)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak
+
+
+def environment_info(encoder_name: str) -> Dict:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'encoder': encoder_name
+    }
+
+
+def format_result(result: Dict) -> str:
+    if result.get('skipped'):
+        return f"{result['operation']:<26} n={result['size']:<7} skipped (previous size too slow)"
+    latency = result['latency']
+    memory = result.get('peak_memory_bytes')
+    memory_text = f"  peak={memory / 2**20:8.1f}MiB" if memory is not None else ''
+    return (
+        f"{result['operation']:<26} n={result['size']:<7} "
+        f"p50={latency['p50'] * 1000:10.2f}ms p95={latency['p95'] * 1000:10.2f}ms "
+        f"p99={latency['p99'] * 1000:10.2f}ms  {result['throughput']:12.1f} tasks/s{memory_text}"
+    )
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINES_DIR, f"{name}.json")
+
+
+def save_baseline(name: str, report: Dict):
+    os.makedirs(BASELINES_DIR, exist_ok=True)
+    with open(baseline_path(name), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def load_baseline(name: str) -> Dict:
+    with open(baseline_path(name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_to_baseline(results: List[Dict], baseline: Dict, tolerance: float = 0.2) -> List[Dict]:
+    """Compare p50 latency per (operation, size); ratio > 1 + tolerance is a regression"""
+    previous = {
+        (r['operation'], r['size']): r for r in baseline.get('results', []) if not r.get('skipped')
+    }
+    comparisons = []
+    for result in results:
+        before = previous.get((result['operation'], result['size']))
+        if result.get('skipped') or before is None:
+            continue
+        ratio = result['latency']['p50'] / before['latency']['p50']
+        comparisons.append({
+            'operation': result['operation'],
+            'size': result['size'],
+            'baseline_p50': before['latency']['p50'],
+            'p50': result['latency']['p50'],
+            'ratio': ratio,
+            'regression': ratio > 1 + tolerance
+        })
+    return comparisons
@@ -0,0 +1,370 @@
+"""
+Replay recorded or synthesized traffic against ai_service and report capacity.
+
+    # NestJS-shaped trace: bursty on-demand calls plus pomodoro page polling
+    python -m benchmarks.loadtest synthesize --duration 120 --rate 15 --output trace.jsonl
+
+    # start a local uvicorn offline (stub API key, local model directory) and replay
+    python -m benchmarks.loadtest replay trace.jsonl --start-server --embedding-model models/task_model
+
+    # same against the preforking server with 4 workers
+    python -m benchmarks.loadtest replay trace.jsonl --start-server --workers 4 --embedding-model models/task_model
+
+    # replay twice as fast against a running service
+    python -m benchmarks.loadtest replay trace.jsonl --url http://127.0.0.1:8000 --api-key dev --speed 2
+
+Replay is open loop. Each request is sent at its trace time divided by
+`--speed`, whether or not earlier requests have finished, so a slow
+service builds a queue instead of slowing the client down. `--concurrency`
+caps the number of open requests, as the backend's HTTP agent does. Latency
+is measured from the scheduled send time, so time spent waiting for a free
+slot is included. Traces recorded with TRACE_RECORD_PATH (app/traces.py)
+and synthesized ones share the same JSON-lines format.
+
+The synthesized mix mirrors the calls TasksService makes per user:
+
+- `batchSimilarTasks`: /group_tasks with the user's batchable tasks.
+- `prioritizeTasks` and `getPomodoroSchedule`: the user's open tasks.
+- `inferDependencies`: a single task.
+
+Users are drawn Zipf-style, so a few heavy users dominate. On-demand
+arrivals are Poisson with burst seconds at `--burst-factor` times the
+base rate. Users with the pomodoro page open poll it every
+`--poll-interval` seconds.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+import numpy as np
+
+from .harness import percentile_summary
+from .synthetic import SyntheticTaskGenerator
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TENANT_HEADER = 'X-Tenant-Id'
+STUB_API_KEY = 'loadtest'
+
+# Share of on-demand (non-polling) requests per NestJS call
+DEFAULT_MIX = {'prioritize': 0.45, 'group': 0.2, 'infer': 0.35}
+ENDPOINTS = {
+    'prioritize': '/prioritize_tasks',
+    'group': '/group_tasks',
+    'infer': '/infer_dependencies',
+    'pomodoro': '/create_pomodoro_schedule'
+}
+# Task ids of user u start at u * USER_ID_STRIDE + 1
+USER_ID_STRIDE = 100000
+
+
+class UserBacklog:
+    """One synthetic user's tasks, lightly edited between requests"""
+
+    def __init__(self, user: int, tasks: List[Dict], rng: np.random.Generator):
+        self.user = user
+        self.tasks = tasks
+        self.rng = rng
+        self.edits = 0
+
+    def edit(self):
+        """Change one task the way a user would (status or title) so payloads drift"""
+        task = self.tasks[int(self.rng.integers(len(self.tasks)))]
+        self.edits += 1
+        if self.rng.random() < 0.5:
+            task['status'] = str(self.rng.choice(['todo', 'in_progress', 'blocked', 'done']))
+        else:
+            task['title'] = f"{task['title'].split(' #')[0]} #{self.edits}"
+
+    def open_tasks(self) -> List[Dict]:
+        return [task for task in self.tasks if task['status'] != 'done']
+
+    def payload(self, kind: str) -> Dict:
+        open_tasks = self.open_tasks() or self.tasks[:1]
+        if kind == 'infer':
+            return {'task': open_tasks[int(self.rng.integers(len(open_tasks)))]}
+        if kind == 'group':
+            # Batchable, not yet batched tasks: roughly half of a backlog
+            return {'tasks': [task for task in open_tasks if task['id'] % 2 == 0] or open_tasks[:1]}
+        return {'tasks': open_tasks}
+
+
+def synthesize_trace(duration: float, rate: float, users: int = 200, pollers: int = 20,
+                     poll_interval: float = 30.0, burst_fraction: float = 0.1, burst_factor: float = 5.0,
+                     edit_probability: float = 0.3, median_tasks: int = 40, max_tasks: int = 500,
+                     mix: Optional[Dict[str, float]] = None, seed: int = 42) -> List[Dict]:
+    """Trace entries (`ts` relative to 0) shaped like the NestJS backend's traffic"""
+    rng = np.random.default_rng(seed)
+    generator = SyntheticTaskGenerator(seed=seed)
+    sizes = np.clip(rng.lognormal(np.log(median_tasks), 0.8, users), 3, max_tasks).astype(int)
+    backlogs = [
+        UserBacklog(user, generator.generate(int(size), start_id=user * USER_ID_STRIDE + 1), rng)
+        for user, size in enumerate(sizes)
+    ]
+    popularity = 1.0 / np.arange(1, users + 1) ** 1.1
+    popularity /= popularity.sum()
+    mix = mix or DEFAULT_MIX
+    kinds = list(mix)
+    weights = np.array([mix[kind] for kind in kinds], dtype=np.float64)
+    weights /= weights.sum()
+
+    # (time, kind, user) for every request
+    arrivals = []
+    base_rate = rate / (1 - burst_fraction + burst_fraction * burst_factor)
+    for second in range(int(np.ceil(duration))):
+        slot_rate = base_rate * (burst_factor if rng.random() < burst_fraction else 1.0)
+        for offset in np.sort(rng.random(rng.poisson(slot_rate))):
+            if second + offset < duration:
+                arrivals.append((second + offset, str(rng.choice(kinds, p=weights)), int(rng.choice(users, p=popularity))))
+    for user in rng.choice(users, size=min(pollers, users), replace=False, p=popularity):
+        poll = rng.random() * poll_interval
+        while poll < duration:
+            arrivals.append((poll, 'pomodoro', int(user)))
+            poll += poll_interval * rng.uniform(0.9, 1.1)
+    arrivals.sort()
+
+    trace = []
+    for ts, kind, user in arrivals:
+        backlog = backlogs[user]
+        if kind != 'pomodoro' and rng.random() < edit_probability:
+            backlog.edit()
+        trace.append({
+            'ts': round(ts, 6),
+            'method': 'POST',
+            'path': ENDPOINTS[kind],
+            'query': '',
+            'tenant': str(user),
+            'body': json.dumps(backlog.payload(kind))
+        })
+    return trace
+
+
+def write_trace(trace: Iterable[Dict], path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        for entry in trace:
+            f.write(json.dumps(entry) + '\n')
+
+
+def read_trace(path: str) -> List[Dict]:
+    with open(path, encoding='utf-8') as f:
+        trace = [json.loads(line) for line in f if line.strip()]
+    trace.sort(key=lambda entry: entry['ts'])
+    return trace
+
+
+async def replay(trace: List[Dict], client: httpx.AsyncClient, api_key: str = STUB_API_KEY,
+                 speed: float = 1.0, concurrency: int = 64) -> List[Dict]:
+    """Send every trace entry at its (scaled) time; one result per request"""
+    slots = asyncio.Semaphore(concurrency)
+    results = []
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    origin = trace[0]['ts'] if trace else 0.0
+
+    async def send(entry: Dict, scheduled: float):
+        headers = {'api-key': api_key, 'content-type': 'application/json'}
+        if entry.get('tenant') is not None:
+            headers[TENANT_HEADER] = entry['tenant']
+        result = {'path': entry['path'], 'scheduled': scheduled}
+        async with slots:
+            result['sent'] = loop.time() - start
+            try:
+                response = await client.request(
+                    entry['method'], entry['path'] + (f"?{entry['query']}" if entry.get('query') else ''),
+                    content=entry.get('body') or None, headers=headers
+                )
+                result['status'] = response.status_code
+            except httpx.HTTPError as e:
+                result['status'] = None
+                result['error'] = type(e).__name__
+        result['done'] = loop.time() - start
+        results.append(result)
+
+    pending = []
+    for entry in trace:
+        scheduled = (entry['ts'] - origin) / speed
+        delay = scheduled - (loop.time() - start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        pending.append(asyncio.ensure_future(send(entry, scheduled)))
+    await asyncio.gather(*pending)
+    return results
+
+
+def _summary(results: List[Dict], wall_seconds: float) -> Dict:
+    ok = [r for r in results if r['status'] is not None and r['status'] < 400]
+    latencies = [(r['done'] - r['scheduled']) * 1000 for r in results]
+    summary = {
+        'requests': len(results),
+        'errors': len(results) - len(ok),
+        'error_rate': (len(results) - len(ok)) / len(results) if results else 0.0,
+        'throughput_rps': len(ok) / wall_seconds if wall_seconds else 0.0,
+        'latency_ms': percentile_summary(latencies) if latencies else None,
+        # Time spent waiting for a connection slot before the request was sent
+        'queue_ms_p99': float(np.percentile([(r['sent'] - r['scheduled']) * 1000 for r in results], 99))
+        if results else None,
+        'status_counts': {}
+    }
+    for r in results:
+        key = str(r['status']) if r['status'] is not None else r['error']
+        summary['status_counts'][key] = summary['status_counts'].get(key, 0) + 1
+    return summary
+
+
+def build_report(results: List[Dict], trace: List[Dict], speed: float) -> Dict:
+    wall = max((r['done'] for r in results), default=0.0)
+    offered = (trace[-1]['ts'] - trace[0]['ts']) / speed if len(trace) > 1 else 0.0
+    return {
+        'offered_rps': len(trace) / offered if offered else None,
+        'wall_seconds': wall,
+        'overall': _summary(results, wall),
+        'endpoints': {
+            path: _summary([r for r in results if r['path'] == path], wall)
+            for path in sorted({r['path'] for r in results})
+        }
+    }
+
+
+def format_summary(name: str, summary: Dict) -> str:
+    latency = summary['latency_ms'] or {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    return (
+        f"{name:<28} n={summary['requests']:<6} {summary['throughput_rps']:8.1f} req/s  "
+        f"p50={latency['p50']:8.1f}ms  p95={latency['p95']:8.1f}ms  p99={latency['p99']:8.1f}ms  "
+        f"errors={summary['error_rate']:.2%}"
+    )
+
+
+def server_command(port: int, workers: int = 0) -> List[str]:
+    """Single uvicorn process, or the preforking server (app/serve.py) with `workers` workers"""
+    if workers:
+        return [sys.executable, '-m', 'app.serve', '--host', '127.0.0.1', '--port', str(port),
+                '--workers', str(workers)]
+    return [sys.executable, '-m', 'uvicorn', 'app.main:app', '--host', '127.0.0.1',
+            '--port', str(port), '--log-level', 'warning']
+
+
+def start_server(command: List[str], url: str, api_key: str, embedding_model: Optional[str],
+                 timeout: float) -> subprocess.Popen:
+    """Start ai_service offline with a stub key and wait until /ready answers"""
+    env = dict(
+        os.environ,
+        API_KEY=api_key,
+        LOAD_NLP_PIPELINE='false',
+        JOB_STORAGE_PATH=tempfile.mkdtemp(prefix='loadtest-jobs-'),
+        HF_HUB_OFFLINE='1',
+        TRANSFORMERS_OFFLINE='1'
+    )
+    if embedding_model:
+        env['EMBEDDING_MODEL'] = embedding_model
+    process = subprocess.Popen(command, cwd=SERVICE_ROOT, env=env)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"ai_service exited during startup with code {process.returncode}")
+        try:
+            if httpx.get(f"{url}/ready", timeout=1.0).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"ai_service did not become healthy within {timeout:.0f}s")
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def run_replay(trace: List[Dict], url: str, api_key: str, speed: float, concurrency: int,
+                     timeout: float) -> List[Dict]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        return await replay(trace, client, api_key, speed, concurrency)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    synth = commands.add_parser('synthesize', help='write a NestJS-shaped trace')
+    synth.add_argument('--output', required=True)
+    synth.add_argument('--duration', type=float, default=60.0, help='trace length in seconds')
+    synth.add_argument('--rate', type=float, default=10.0, help='mean on-demand requests per second')
+    synth.add_argument('--users', type=int, default=200)
+    synth.add_argument('--pollers', type=int, default=20, help='users with the pomodoro page open')
+    synth.add_argument('--poll-interval', type=float, default=30.0)
+    synth.add_argument('--burst-fraction', type=float, default=0.1, help='share of seconds that are bursts')
+    synth.add_argument('--burst-factor', type=float, default=5.0)
+    synth.add_argument('--median-tasks', type=int, default=40, help='median backlog size per user')
+    synth.add_argument('--max-tasks', type=int, default=500)
+    synth.add_argument('--seed', type=int, default=42)
+
+    play = commands.add_parser('replay', help='replay a trace and report latency and throughput')
+    play.add_argument('trace')
+    play.add_argument('--url', default=None, help='running service (default: the one started with --start-server)')
+    play.add_argument('--start-server', action='store_true', help='start a local ai_service for the run')
+    play.add_argument('--port', type=int, default=8765)
+    play.add_argument('--embedding-model', help='local SentenceTransformer directory for --start-server')
+    play.add_argument('--workers', type=int, default=0,
+                      help='with --start-server, run the preforking server with this many workers')
+    play.add_argument('--startup-timeout', type=float, default=300.0)
+    play.add_argument('--api-key', default=STUB_API_KEY)
+    play.add_argument('--speed', type=float, default=1.0, help='replay this many times faster than recorded')
+    play.add_argument('--concurrency', type=int, default=64, help='maximum open requests')
+    play.add_argument('--timeout', type=float, default=120.0, help='per-request timeout in seconds')
+    play.add_argument('--output', help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    if args.command == 'synthesize':
+        trace = synthesize_trace(
+            args.duration, args.rate, users=args.users, pollers=args.pollers, poll_interval=args.poll_interval,
+            burst_fraction=args.burst_fraction, burst_factor=args.burst_factor,
+            median_tasks=args.median_tasks, max_tasks=args.max_tasks, seed=args.seed
+        )
+        write_trace(trace, args.output)
+        print(f"Wrote {len(trace)} requests over {args.duration:.0f}s to {args.output}")
+        return 0
+
+    if not args.start_server and not args.url:
+        parser.error('replay needs --url or --start-server')
+    url = (args.url or f"http://127.0.0.1:{args.port}").rstrip('/')
+    trace = read_trace(args.trace)
+    if not trace:
+        parser.error(f"{args.trace} has no requests")
+
+    server = None
+    if args.start_server:
+        server = start_server(server_command(args.port, args.workers), url, args.api_key, args.embedding_model,
+                              args.startup_timeout)
+    try:
+        results = asyncio.run(run_replay(trace, url, args.api_key, args.speed, args.concurrency, args.timeout))
+    finally:
+        if server is not None:
+            stop_server(server)
+
+    report = build_report(results, trace, args.speed)
+    if report['offered_rps']:
+        print(f"offered {report['offered_rps']:.1f} req/s over {report['wall_seconds']:.1f}s")
+    for path, summary in report['endpoints'].items():
+        print(format_summary(path, summary))
+    print(format_summary('overall', report['overall']))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['overall']['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Measure clustering and similarity on full versus projected embeddings.
+
+    python -m benchmarks.projection
+    python -m benchmarks.projection --encoder hashing --sizes 2000 20000 --kinds pca random
+
+For each backlog size, synthetic tasks are embedded once. Each projection
+kind then runs grouping, the hierarchical tree and `find_similar_tasks`
+with the full and the projected vectors. PCA is fitted on a separate
+synthetic training set, as train_model.py does. Agreement with the
+full-width result is reported as:
+
+- adjusted Rand index of the task -> group assignment (tasks left
+  ungrouped count as singletons), for grouping and for each hierarchy cut.
+- mean Jaccard overlap of the similar-task sets returned per query.
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+from sklearn.metrics import adjusted_rand_score
+
+from app.models.embeddings import TaskEmbedder
+from app.models.features import task_text
+from app.models.hierarchy import default_levels
+from app.models.projection import DEFAULT_COMPONENTS, PROJECTION_KINDS, EmbeddingProjection
+from app.models.task_model import TaskModel
+from .encoders import load_encoder
+from .synthetic import SyntheticTaskGenerator
+
+DEFAULT_SIZES = [1000, 5000, 20000]
+
+
+def timed_call(func: Callable) -> Tuple[object, float]:
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def group_labels(groups: List[Dict], task_ids: List[int]) -> np.ndarray:
+    """Group index per task, ungrouped tasks in singleton labels"""
+    label_of = {task_id: index for index, group in enumerate(groups) for task_id in group['taskIds']}
+    singletons = iter(range(len(groups), len(groups) + len(task_ids)))
+    return np.array([label_of[i] if i in label_of else next(singletons) for i in task_ids])
+
+
+def jaccard(a: List[int], b: List[int]) -> float:
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def make_projection(kind: str, encoder, components: int, fit_tasks: List[Dict], seed: int) -> EmbeddingProjection:
+    if kind == 'random':
+        return EmbeddingProjection.random(encoder.get_sentence_embedding_dimension(), components, seed)
+    embeddings = np.asarray(encoder.encode([task_text(task) for task in fit_tasks]))
+    return EmbeddingProjection.fit_pca(embeddings, components)
+
+
+def compare(model: TaskModel, tasks: List[Dict], queries: List[int]) -> Dict:
+    ids = [task['id'] for task in tasks]
+    full_groups, full_grouping = timed_call(lambda: model.group_similar_tasks(tasks, reduced=False))
+    reduced_groups, reduced_grouping = timed_call(lambda: model.group_similar_tasks(tasks, reduced=True))
+
+    levels = default_levels(len(tasks))
+    full_tree, full_hierarchy = timed_call(lambda: model.group_tasks_hierarchical(tasks, levels, reduced=False))
+    reduced_tree, reduced_hierarchy = timed_call(lambda: model.group_tasks_hierarchical(tasks, levels, reduced=True))
+    full_cut = model.hierarchy.get(full_tree['treeId'])
+    reduced_cut = model.hierarchy.get(reduced_tree['treeId'])
+
+    full_similar, full_similarity = timed_call(
+        lambda: [model.find_similar_tasks(task_id, reduced=False) for task_id in queries]
+    )
+    reduced_similar, reduced_similarity = timed_call(
+        lambda: [model.find_similar_tasks(task_id, reduced=True) for task_id in queries]
+    )
+    return {
+        'grouping_ms': [full_grouping * 1000, reduced_grouping * 1000],
+        'grouping_ari': adjusted_rand_score(group_labels(full_groups, ids), group_labels(reduced_groups, ids)),
+        'hierarchy_ms': [full_hierarchy * 1000, reduced_hierarchy * 1000],
+        'hierarchy_ari': {
+            count: adjusted_rand_score(full_cut.cut(count), reduced_cut.cut(count)) for count in levels
+        },
+        'similarity_ms_per_query': [full_similarity * 1000 / len(queries), reduced_similarity * 1000 / len(queries)],
+        'similarity_jaccard': float(np.mean([jaccard(a, b) for a, b in zip(full_similar, reduced_similar)]))
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--kinds', nargs='+', choices=PROJECTION_KINDS, default=list(PROJECTION_KINDS))
+    parser.add_argument('--components', type=int, default=DEFAULT_COMPONENTS)
+    parser.add_argument('--encoder', default='all-MiniLM-L6-v2',
+                        help="SentenceTransformer name/path, or 'hashing' for the offline stand-in")
+    parser.add_argument('--fit-size', type=int, default=5000, help='synthetic training tasks the PCA is fitted on')
+    parser.add_argument('--queries', type=int, default=50, help='find_similar_tasks queries per size')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    encoder = load_encoder(args.encoder)
+    generator = SyntheticTaskGenerator(seed=args.seed)
+    fit_tasks = generator.generate(args.fit_size, start_id=10 ** 9)
+    projections = {
+        kind: make_projection(kind, encoder, args.components, fit_tasks, args.seed) for kind in args.kinds
+    }
+
+    rows = []
+    for size in args.sizes:
+        tasks = generator.generate(size)
+        embedder = TaskEmbedder(model=encoder)
+        embedder.add_tasks(tasks)
+        step = max(1, size // args.queries)
+        queries = [task['id'] for task in tasks[::step][:args.queries]]
+        for kind, projection in projections.items():
+            _, project_seconds = timed_call(lambda: embedder.set_projection(projection))
+            model = TaskModel(embedder, load_nlp_pipeline=False)
+            row = {
+                'size': size, 'kind': kind, 'components': projection.dim,
+                'explained_variance': projection.explained_variance,
+                'project_ms': project_seconds * 1000,
+                **compare(model, tasks, queries)
+            }
+            rows.append(row)
+            print(
+                f"size={size:<6} {kind:<6} k={projection.dim:<4} project={row['project_ms']:8.1f}ms  "
+                f"grouping {row['grouping_ms'][0]:9.1f} -> {row['grouping_ms'][1]:9.1f}ms (ARI {row['grouping_ari']:.3f})  "
+                f"hierarchy {row['hierarchy_ms'][0]:9.1f} -> {row['hierarchy_ms'][1]:9.1f}ms "
+                f"(ARI {min(row['hierarchy_ari'].values()):.3f}-{max(row['hierarchy_ari'].values()):.3f})  "
+                f"similar {row['similarity_ms_per_query'][0]:7.2f} -> {row['similarity_ms_per_query'][1]:7.2f}ms "
+                f"(Jaccard {row['similarity_jaccard']:.3f})",
+                flush=True
+            )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'results': rows}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Per-task request decode and response encode cost, regular vs fast I/O path.
+
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --sizes 100 10000 --output io.json
+
+The regular path mirrors what FastAPI does for the existing endpoints
+(json.loads, Pydantic request model, `.dict()`, then response-model
+validation, `jsonable_encoder` and json.dumps); the fast path is the one
+used by the /fast endpoints (orjson, direct TaskBatch validation, orjson).
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.fastio import validate_tasks
+from app.models.batch import TaskBatch
+from app.models.embeddings import TaskEmbedder
+from app.models.task_model import TaskModel
+from app.schemas.tasks import PrioritizeRequest
+
+from .encoders import HashingEncoder
+from .synthetic import SyntheticTaskGenerator
+
+DEFAULT_SIZES = [100, 1000, 10000]
+
+_RESPONSE_ADAPTER = TypeAdapter(List[Dict])
+
+
+def decode_regular(body: bytes) -> TaskBatch:
+    request = PrioritizeRequest.model_validate(json.loads(body))
+    return TaskBatch([task.dict() for task in request.tasks])
+
+
+def decode_fast(body: bytes) -> TaskBatch:
+    return TaskBatch(validate_tasks(orjson.loads(body)['tasks']))
+
+
+def encode_regular(result: List[Dict]) -> bytes:
+    content = jsonable_encoder(_RESPONSE_ADAPTER.validate_python(result))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_fast(result: List[Dict]) -> bytes:
+    return orjson.dumps(result)
+
+
+def best_of(func: Callable, arg, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+    return float(np.min(timings))
+
+
+def measure(size: int, tasks: List[Dict], result: List[Dict], repeats: int) -> List[Dict]:
+    body = orjson.dumps({'tasks': tasks})
+    rows = []
+    for step, regular, fast, arg in (
+        ('decode', decode_regular, decode_fast, body),
+        ('encode', encode_regular, encode_fast, result),
+    ):
+        regular_seconds = best_of(regular, arg, repeats)
+        fast_seconds = best_of(fast, arg, repeats)
+        rows.append({
+            'step': step,
+            'size': size,
+            'regular_us_per_task': regular_seconds / size * 1e6,
+            'fast_us_per_task': fast_seconds / size * 1e6,
+            'speedup': regular_seconds / fast_seconds
+        })
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    generator = SyntheticTaskGenerator(seed=args.seed)
+    model = TaskModel(TaskEmbedder(model=HashingEncoder()), load_nlp_pipeline=False)
+
+    rows = []
+    for size in args.sizes:
+        tasks = generator.generate(size)
+        # Responses are encoded from real prioritization output
+        result = model.prioritize_tasks(tasks)
+        for row in measure(size, tasks, result, args.repeats):
+            rows.append(row)
+            print(
+                f"{row['step']:<7} n={size:<7} regular={row['regular_us_per_task']:8.2f}us/task "
+                f"fast={row['fast_us_per_task']:8.2f}us/task  {row['speedup']:5.1f}x",
+                flush=True
+            )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'results': rows}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.schemas.tasks import TaskPriority, TaskStatus, TaskType
+
+TRAIN_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'train_tasks.json')
+
+# Fallback word pools if the training data is unavailable
+_DEFAULT_TITLES = ['Process', 'Review', 'Prepare', 'Update', 'Verify', 'contract', 'report', 'meeting', 'visa']
+_DEFAULT_DESCRIPTIONS = ['Check', 'documents', 'for', 'client', 'template', 'standard', 'review', 'team']
+
+
+class SyntheticTaskGenerator:
+    """Deterministic task generator for benchmarks.
+
+    Field values come from the enums in `app/schemas/tasks.py`; title and
+    description vocabulary, lengths, durations and the share of tasks with a
+    due date mirror `data/train_tasks.json`. Due dates are spread around
+    `now`, by default today, because the models measure urgency against the
+    current date.
+    """
+
+    def __init__(self, seed: int = 42, train_data_path: str = TRAIN_DATA_PATH,
+                 now: Optional[datetime] = None):
+        self.seed = seed
+        self.now = now or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self._load_shape(train_data_path)
+
+    def _load_shape(self, path: str):
+        samples = []
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                samples = json.load(f)
+
+        self.title_words = [w for t in samples for w in t.get('title', '').split()] or _DEFAULT_TITLES
+        self.description_words = (
+            [w for t in samples for w in (t.get('description') or '').split()] or _DEFAULT_DESCRIPTIONS
+        )
+        self.title_lengths = [len(t.get('title', '').split()) for t in samples] or [4, 5, 6]
+        self.description_lengths = [len((t.get('description') or '').split()) for t in samples] or [8, 10, 12]
+        self.durations = [t['estimatedDuration'] for t in samples if t.get('estimatedDuration')] or [15, 30, 60, 120]
+        self.due_date_ratio = (
+            sum(1 for t in samples if t.get('dueDate')) / len(samples) if samples else 0.8
+        )
+
+    def generate(self, count: int, start_id: int = 1) -> List[Dict]:
+        """Generate `count` task dicts shaped like `Task.dict()`; same seed and `now`, same tasks"""
+        rng = random.Random(f"{self.seed}:{count}:{start_id}")
+        types = [t.value for t in TaskType]
+        priorities = [p.value for p in TaskPriority]
+        statuses = [s.value for s in TaskStatus if s != TaskStatus.ARCHIVED]
+
+        tasks = []
+        for i in range(count):
+            title = ' '.join(rng.choices(self.title_words, k=rng.choice(self.title_lengths)))
+            description = ' '.join(rng.choices(self.description_words, k=rng.choice(self.description_lengths)))
+            due_date = None
+            if rng.random() < self.due_date_ratio:
+                due_date = (self.now + timedelta(days=rng.randint(-3, 45))).date().isoformat()
+
+            tasks.append({
+                'id': start_id + i,
+                'title': title,
+                'description': description if rng.random() > 0.1 else None,
+                'type': rng.choice(types),
+                'priority': rng.choice(priorities),
+                'status': rng.choice(statuses),
+                'dueDate': due_date,
+                'estimatedDuration': rng.choice(self.durations)
+            })
+        return tasks
@@ -0,0 +1,97 @@
+"""
+Compare sklearn tree-ensemble prediction with the compiled numpy evaluator.
+
+    python -m benchmarks.trees
+    python -m benchmarks.trees --batch-sizes 1 4 16 --repeats 200
+
+Models use the hyperparameters of train_model.py (priority/dependency
+random forests, duration gradient boosting) on random features of the
+serving feature width. Every compiled model is checked against sklearn
+before timing: identical class predictions, regression within 1e-9.
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Callable, Dict
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestClassifier
+
+from app.models.trees import compile_ensemble
+
+DEFAULT_BATCH_SIZES = [1, 8, 64, 512]
+
+
+def make_models(n_features: int, n_train: int, seed: int) -> Dict:
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_train, n_features)).astype(np.float32)
+    priority = 1 + (X[:, 0] > 0.5) + (X[:, 1] > 0) + (X[:, 2] > 1)
+    duration = 60 + 30 * X[:, 3] + 10 * X[:, 4] ** 2 + rng.normal(size=n_train)
+    dependencies = (X[:, 5] > 0).astype(int) + (X[:, 6] > 0.5)
+    return {
+        'priority': RandomForestClassifier(
+            n_estimators=200, max_depth=10, min_samples_split=5, random_state=42, n_jobs=-1
+        ).fit(X, priority),
+        'duration': GradientBoostingRegressor(
+            n_estimators=200, max_depth=6, learning_rate=0.1, random_state=42
+        ).fit(X, duration),
+        'dependency': RandomForestClassifier(
+            n_estimators=150, max_depth=8, min_samples_split=3, random_state=42, n_jobs=-1
+        ).fit(X, dependencies),
+    }
+
+
+def mean_seconds(func: Callable, repeats: int) -> float:
+    func()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--features', type=int, default=400,
+                        help='feature width (384-d embedding + static and temporal columns)')
+    parser.add_argument('--train-rows', type=int, default=2000)
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed + 1)
+    X = rng.normal(size=(max(args.batch_sizes + [1000]), args.features)).astype(np.float32)
+
+    rows = []
+    for name, model in make_models(args.features, args.train_rows, args.seed).items():
+        compiled = compile_ensemble(model, check=X[:1000])
+        for size in args.batch_sizes:
+            batch = X[:size]
+            sklearn_seconds = mean_seconds(lambda: model.predict(batch), args.repeats)
+            compiled_seconds = mean_seconds(lambda: compiled.predict(batch), args.repeats)
+            row = {
+                'model': name,
+                'batch_size': size,
+                'trees': compiled.n_trees,
+                'sklearn_ms': sklearn_seconds * 1000,
+                'compiled_ms': compiled_seconds * 1000,
+                'speedup': sklearn_seconds / compiled_seconds
+            }
+            rows.append(row)
+            print(
+                f"{name:<10} batch={size:<5} sklearn={row['sklearn_ms']:8.3f}ms  "
+                f"compiled={row['compiled_ms']:8.3f}ms  speedup={row['speedup']:6.1f}x",
+                flush=True
+            )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'results': rows}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+import pytest
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from app.fastio import validate_tasks
+from app.schemas.tasks import PrioritizeRequest
+
+
+def task(**fields):
+    return {'id': 1, 'title': 'Write report', 'type': 'work', 'priority': 'high', 'status': 'todo', **fields}
+
+
+ACCEPTED = [
+    task(estimatedDuration=5),
+    task(estimatedDuration='5'),
+    task(estimatedDuration=5.0),
+    task(estimatedDuration='5.0'),
+    task(estimatedDuration=None),
+    task(id='7', description=None, dueDate='2026-01-01'),
+    task(extra='dropped'),
+]
+
+REJECTED = [
+    task(estimatedDuration=5.5),
+    task(estimatedDuration='five'),
+    task(estimatedDuration=[5]),
+    task(id=1.5),
+    task(title=3),
+    task(type='chore'),
+    {'title': 'No id'},
+]
+
+
+@pytest.mark.parametrize('record', ACCEPTED)
+def test_fast_path_accepts_what_the_model_accepts(record):
+    expected = [model.model_dump() for model in PrioritizeRequest(tasks=[record]).tasks]
+    assert validate_tasks([record]) == expected
+
+
+@pytest.mark.parametrize('record', REJECTED)
+def test_fast_path_rejects_what_the_model_rejects(record):
+    with pytest.raises(ValidationError) as model_error:
+        PrioritizeRequest(tasks=[record])
+    with pytest.raises(RequestValidationError) as fast_error:
+        validate_tasks([record])
+
+    expected = sorted((tuple(['body', *error['loc']]), error['type']) for error in model_error.value.errors())
+    actual = sorted((tuple(error['loc']), error['type']) for error in fast_error.value.errors())
+    assert actual == expected
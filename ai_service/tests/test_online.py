@@ -0,0 +1,49 @@
+import numpy as np
+
+from app.models.features import TaskFeaturePipeline
+from app.models.online import OnlineTaskLearner
+from benchmarks.encoders import HashingEncoder
+from benchmarks.synthetic import SyntheticTaskGenerator
+
+LEVELS = ['low', 'medium', 'high', 'critical']
+
+
+def outcomes(tasks, shift=0):
+    return [{
+        'task': task,
+        'finalPriority': LEVELS[(LEVELS.index(task['priority']) + shift) % 4],
+        'actualDuration': (task.get('estimatedDuration') or 30) * (1 + shift)
+    } for task in tasks]
+
+
+def learner():
+    pipeline = TaskFeaturePipeline(HashingEncoder(dimension=32))
+    return OnlineTaskLearner(pipeline, batch_size=16, min_samples=16)
+
+
+def test_rollback_does_not_resume_from_rejected_weights():
+    tasks = SyntheticTaskGenerator(seed=0).generate(64)
+    good, rejected, later = outcomes(tasks[:32]), outcomes(tasks[32:48], shift=2), outcomes(tasks[48:])
+
+    rolled_back = learner()
+    rolled_back.record(good)
+    kept = rolled_back.flush()
+    rolled_back.record(rejected)
+    rejected_version = rolled_back.flush()
+    assert rolled_back.rollback() is kept
+    rolled_back.record(later)
+    resumed = rolled_back.flush()
+
+    # The same outcomes without the rejected batch
+    reference = learner()
+    reference.record(good)
+    reference.flush()
+    reference.record(later)
+    expected = reference.flush()
+
+    assert resumed.version > rejected_version.version
+    np.testing.assert_allclose(resumed.priority_model.coef_, expected.priority_model.coef_)
+    np.testing.assert_allclose(resumed.duration_model.coef_, expected.duration_model.coef_)
+    np.testing.assert_allclose(resumed.scaler.mean_, expected.scaler.mean_)
+    assert resumed.priority_error == expected.priority_error
+    assert not np.allclose(resumed.priority_model.coef_, rejected_version.priority_model.coef_)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+import train_model
+from app.models.features import TaskFeaturePipeline, task_duration
+from benchmarks.encoders import HashingEncoder
+from benchmarks.synthetic import SyntheticTaskGenerator
+
+
+@pytest.fixture(scope='module')
+def training_data():
+    tasks = SyntheticTaskGenerator(seed=0).generate(300)
+    features = TaskFeaturePipeline(HashingEncoder(dimension=32)).transform(tasks)
+    priorities = np.array([train_model.PRIORITY_LEVELS.get(task.get('priority', 'medium'), 2) for task in tasks])
+    durations = np.array([task_duration(task) for task in tasks])
+    dependencies = np.array([len(task.get('dependencies', [])) for task in tasks])
+    return features, priorities, durations, dependencies
+
+
+def test_without_duration_drops_duration_columns(training_data):
+    features = training_data[0]
+    names = TaskFeaturePipeline(HashingEncoder(dimension=32)).feature_names
+    kept = [name for name in names if name not in TaskFeaturePipeline.DURATION_NAMES]
+    view = TaskFeaturePipeline.without_duration(features)
+    np.testing.assert_array_equal(view, features[:, [names.index(name) for name in kept]])
+
+
+def test_duration_model_input_excludes_its_label(training_data, monkeypatch):
+    features, priorities, durations, dependencies = training_data
+    fitted_specs = []
+    fit = train_model.fit_models_parallel
+
+    def record(specs, max_workers=None):
+        fitted_specs.extend(specs)
+        return fit(specs, max_workers=1)
+
+    monkeypatch.setattr(train_model, 'fit_models_parallel', record)
+    models = train_model.train_ml_models(features, priorities, durations, dependencies)
+
+    name, _, X_train, y_train, X_test, y_test, _ = next(spec for spec in fitted_specs if spec[0] == 'duration')
+    assert models['duration'].n_features_in_ == features.shape[1] - len(TaskFeaturePipeline.DURATION_NAMES)
+    for X, y in ((X_train, y_train), (X_test, y_test)):
+        assert not any(np.allclose(X[:, column], y) for column in range(X.shape[1]))
+    # The other targets keep the full layout serving builds
+    assert models['priority'].n_features_in_ == features.shape[1]
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestClassifier, RandomForestRegressor
+from sklearn.tree import DecisionTreeClassifier
+
+from app.models.trees import compile_ensemble, load_ensembles, save_ensembles, verify_parity
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 12))
+    X[:, 3] = rng.integers(0, 5, size=600)  # repeated values land exactly on thresholds
+    levels = 1 + (X[:, 0] > 0) + (X[:, 1] + X[:, 3] > 2) + (X[:, 2] > 1)
+    durations = 30 + 20 * X[:, 0] ** 2 + 15 * X[:, 3] + rng.normal(scale=5, size=600)
+    return X, levels.astype(int), durations
+
+
+def test_forest_classifier_matches_sklearn(data):
+    X, levels, _ = data
+    model = RandomForestClassifier(n_estimators=40, max_depth=8, random_state=0).fit(X[:400], levels[:400])
+    compiled = compile_ensemble(model, check=X[:100])
+    np.testing.assert_array_equal(compiled.predict(X[400:]), model.predict(X[400:]))
+    np.testing.assert_allclose(compiled.predict_proba(X[400:]), model.predict_proba(X[400:]), rtol=1e-9, atol=1e-12)
+
+
+def test_forest_regressor_matches_sklearn(data):
+    X, _, durations = data
+    model = RandomForestRegressor(n_estimators=30, random_state=0).fit(X[:400], durations[:400])
+    compiled = compile_ensemble(model)
+    np.testing.assert_allclose(compiled.predict(X[400:]), model.predict(X[400:]), rtol=1e-9)
+
+
+def test_boosting_matches_sklearn(data):
+    X, levels, durations = data
+    for target in (levels, durations):
+        model = GradientBoostingRegressor(n_estimators=60, max_depth=4, random_state=0).fit(X[:400], target[:400])
+        compiled = compile_ensemble(model, check=X[:100])
+        np.testing.assert_allclose(compiled.predict(X[400:]), model.predict(X[400:]), rtol=1e-9, atol=1e-9)
+
+
+def test_boosting_fallback_keeps_results(data):
+    X, _, durations = data
+    model = GradientBoostingRegressor(n_estimators=20, random_state=0).fit(X, durations)
+    compiled = compile_ensemble(model, fallback_rows=8)
+    np.testing.assert_allclose(compiled.predict(X[:4]), model.predict(X[:4]), rtol=1e-9)
+    np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=1e-9)
+
+
+def test_string_classes(data):
+    X, levels, _ = data
+    names = np.array(['low', 'medium', 'high', 'critical'])[levels - 1]
+    for model in (RandomForestClassifier(n_estimators=25, random_state=0), DecisionTreeClassifier(random_state=0)):
+        model.fit(X[:400], names[:400])
+        compiled = compile_ensemble(model, check=X[:100])
+        predicted = compiled.predict(X[400:])
+        assert predicted.dtype.kind == 'U'
+        np.testing.assert_array_equal(predicted, model.predict(X[400:]))
+
+
+def test_npz_round_trip(data, tmp_path):
+    X, levels, durations = data
+    names = np.array(['low', 'medium', 'high', 'critical'])[levels - 1]
+    models = {
+        'priority': RandomForestClassifier(n_estimators=20, random_state=0).fit(X, levels),
+        'duration': GradientBoostingRegressor(n_estimators=30, random_state=0).fit(X, durations),
+        'label': RandomForestClassifier(n_estimators=10, random_state=0).fit(X, names),
+    }
+    path = tmp_path / 'ml_models.npz'
+    save_ensembles(str(path), {name: compile_ensemble(model) for name, model in models.items()})
+
+    loaded = load_ensembles(str(path))
+    assert sorted(loaded) == sorted(models)
+    for name, model in models.items():
+        verify_parity(model, loaded[name], X)
+    with np.load(path, allow_pickle=False) as arrays:
+        assert all(arrays[key].dtype != object for key in arrays.files)
+
+
+def test_parity_check_rejects_a_mismatch(data):
+    X, levels, _ = data
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, levels)
+    other = RandomForestClassifier(n_estimators=10, random_state=1).fit(X, (levels % 4) + 1)
+    with pytest.raises(ValueError):
+        verify_parity(model, compile_ensemble(other), X)
+
+
+def test_attached_fallback_serves_large_batches(data, tmp_path):
+    X, levels, _ = data
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, levels)
+    path = tmp_path / 'ml_models.npz'
+    save_ensembles(str(path), {'priority': compile_ensemble(model)})
+    loaded = load_ensembles(str(path))['priority']
+    assert loaded.fallback is None
+
+    other = RandomForestClassifier(n_estimators=20, random_state=1).fit(X, (levels % 4) + 1)
+    with pytest.raises(ValueError):
+        loaded.attach_fallback(other, 16, check=X)
+    assert loaded.fallback is None
+
+    loaded.attach_fallback(model, 16, check=X[:100])
+    loaded.decision = None  # batches above 16 rows must not reach the compiled walk
+    np.testing.assert_array_equal(loaded.predict(X), model.predict(X))
+
+
+def test_rejects_unsupported_models():
+    with pytest.raises(TypeError):
+        compile_ensemble(object())
@@ -9,11 +9,14 @@ from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, mean_squared_error
 from sentence_transformers import SentenceTransformer, InputExample, losses, util
+from sentence_transformers.util import batch_to_device
+from transformers import get_linear_schedule_with_warmup
 from torch.utils.data import DataLoader
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 import random
 import pickle
+import shutil
 from collections import Counter
 
 # Configure logging
@@ -30,13 +33,29 @@ class AdvancedTrainingConfig:
     TRAIN_DATA_PATH = 'data/train_tasks.json'
     MODEL_SAVE_PATH = 'models/task_model'
     EMBEDDER_SAVE_PATH = 'models/embedder.pkl'
-    ML_MODELS_PATH = 'models/ml_models.pkl'
+    ML_MODELS_PATH = 'models/ml_models.pkl'  # Also the service's fallback for large batches (ML_FALLBACK_PATH)
+    # Same models compiled to node arrays; the service loads them with LOAD_ML_MODELS=true (app/models/trees.py)
+    ML_COMPILED_PATH = 'models/ml_models.npz'
+    PARITY_CHECK_ROWS = 1000
+    # Embedding projection for clustering/similarity (see app/models/projection.py)
+    PROJECTION_PATH = 'models/projection.npz'
+    PROJECTION_KIND = 'pca'  # or 'random' (seeded, data-independent)
+    PROJECTION_COMPONENTS = 64
     DEVICE = 'cuda' if torch.cuda.is_available() else 'cpu'
     NUM_WORKERS = 0
     WARMUP_STEPS = 200  # Increased warmup
     LEARNING_RATE = 1e-5  # Lower learning rate for stability
+    WEIGHT_DECAY = 0.01  # sentence-transformers fit() defaults
+    MAX_GRAD_NORM = 1.0
     EVAL_SAMPLE_SIZE = 50
     VALIDATION_SPLIT = 0.2
+    PAIR_BUDGET = 200000  # Max training pairs drawn from the O(n²) pair space
+    CANDIDATES_PER_TASK = None  # Set (e.g. 200) to sample partners instead of scoring all pairs
+    POSITIVE_FRACTION = 0.4
+    HARD_NEGATIVE_FRACTION = 0.3
+    ARTIFACTS_PATH = 'models/artifacts'  # Content-addressed cache of pipeline stages
+    CHECKPOINTS_KEPT = 2
+    PARALLEL_FITS = 3  # sklearn models trained side by side in worker processes
 
 try:
     from .app.models.embeddings import TaskEmbedder
@@ -60,6 +79,23 @@ except ImportError:
                 self.task_embeddings[task['id']] = embedding
                 self.task_data[task['id']] = task
 
+try:
+    from .app.models.features import TaskFeaturePipeline, PRIORITY_LEVELS, task_duration
+    from .app.training.pairs import TaskPairFeatures, TaskPairDataset, select_pairs, POSITIVE_THRESHOLD
+    from .app.training.pipeline import (
+        ArtifactStore, EpochCheckpoints, content_hash, fit_models_parallel, split_cores
+    )
+    from .app.models.trees import compile_ensemble, save_ensembles
+    from .app.models.projection import EmbeddingProjection
+except ImportError:
+    from app.models.features import TaskFeaturePipeline, PRIORITY_LEVELS, task_duration
+    from app.training.pairs import TaskPairFeatures, TaskPairDataset, select_pairs, POSITIVE_THRESHOLD
+    from app.training.pipeline import (
+        ArtifactStore, EpochCheckpoints, content_hash, fit_models_parallel, split_cores
+    )
+    from app.models.trees import compile_ensemble, save_ensembles
+    from app.models.projection import EmbeddingProjection
+
 def load_training_data() -> List[Dict]:
     """Load comprehensive training data"""
     if not os.path.exists(AdvancedTrainingConfig.TRAIN_DATA_PATH):
@@ -73,152 +109,118 @@ def load_training_data() -> List[Dict]:
     return data
 
 def create_enhanced_training_examples(tasks: List[Dict]) -> Tuple[List[InputExample], List[Tuple]]:
-    """Create sophisticated training examples with multiple similarity criteria"""
-    examples = []
-    dependency_pairs = []
-    
-    # Similarity criteria weights
-    type_weight = 0.3
-    description_weight = 0.4
-    duration_weight = 0.2
-    priority_weight = 0.1
-    
-    for i, task1 in enumerate(tasks):
-        for j, task2 in enumerate(tasks[i+1:], i+1):
-            # Calculate multi-dimensional similarity
-            similarity_score = 0.0
-            
-            # Type similarity
-            if task1.get('type') == task2.get('type'):
-                similarity_score += type_weight
-            
-            # Description similarity (using keywords)
-            desc1_words = set(task1.get('description', '').lower().split())
-            desc2_words = set(task2.get('description', '').lower().split())
-            if desc1_words and desc2_words:
-                keyword_overlap = len(desc1_words.intersection(desc2_words)) / len(desc1_words.union(desc2_words))
-                similarity_score += description_weight * keyword_overlap
-            
-            # Duration similarity
-            dur1 = task1.get('estimatedDuration', 60)
-            dur2 = task2.get('estimatedDuration', 60)
-            duration_similarity = 1 - abs(dur1 - dur2) / max(dur1, dur2, 60)
-            similarity_score += duration_weight * duration_similarity
-            
-            # Priority similarity
-            priority_map = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
-            prio1 = priority_map.get(task1.get('priority', 'medium'), 2)
-            prio2 = priority_map.get(task2.get('priority', 'medium'), 2)
-            priority_similarity = 1 - abs(prio1 - prio2) / 3
-            similarity_score += priority_weight * priority_similarity
-            
-            # Create training example
-            text1 = f"{task1['title']} {task1.get('description', '')} {task1.get('type', '')}"
-            text2 = f"{task2['title']} {task2.get('description', '')} {task2.get('type', '')}"
-            
-            # Binary label based on threshold
-            label = 1.0 if similarity_score > 0.6 else 0.0
-            examples.append(InputExample(texts=[text1, text2], label=label))
-            
-            # Store for analysis
-            dependency_pairs.append((task1['id'], task2['id'], similarity_score))
+    """Create sophisticated training examples with multiple similarity criteria
+    
+    Materializes every pair, so only use this on small datasets; training
+    goes through `create_training_pair_datasets` instead.
+    """
+    features = TaskPairFeatures(tasks)
+    i_idx, j_idx, scores = select_pairs(features)
+    
+    examples = [
+        InputExample(
+            texts=[features.text(i), features.text(j)],
+            label=1.0 if score > POSITIVE_THRESHOLD else 0.0
+        )
+        for i, j, score in zip(i_idx, j_idx, scores)
+    ]
+    dependency_pairs = [
+        (tasks[i]['id'], tasks[j]['id'], float(score))
+        for i, j, score in zip(i_idx, j_idx, scores)
+    ]
     
     logger.info(f"Created {len(examples)} training examples")
     return examples, dependency_pairs
 
-def prepare_ml_training_data(tasks: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+def pair_config() -> Dict:
+    return {
+        'budget': AdvancedTrainingConfig.PAIR_BUDGET,
+        'positive_fraction': AdvancedTrainingConfig.POSITIVE_FRACTION,
+        'hard_negative_fraction': AdvancedTrainingConfig.HARD_NEGATIVE_FRACTION,
+        'candidates_per_task': AdvancedTrainingConfig.CANDIDATES_PER_TASK
+    }
+
+def create_training_pair_datasets(tasks: List[Dict], store: Optional[ArtifactStore] = None,
+                                  pairs_key: Optional[str] = None) -> Tuple[TaskPairDataset, TaskPairDataset]:
+    """Sample a fixed budget of training pairs and split them into lazy train/validation streams"""
+    features = TaskPairFeatures(tasks)
+    
+    def compute_pairs() -> Dict[str, np.ndarray]:
+        i_idx, j_idx, scores = select_pairs(features, **pair_config())
+        return {'i': i_idx, 'j': j_idx, 'score': scores}
+    
+    if store is not None:
+        pairs = store.cached_arrays('pairs', pairs_key or content_hash(tasks, pair_config()), compute_pairs)
+    else:
+        pairs = compute_pairs()
+    i_idx, j_idx, scores = pairs['i'], pairs['j'], pairs['score']
+    
+    order = np.random.default_rng(42).permutation(len(scores))
+    train_size = int(len(order) * (1 - AdvancedTrainingConfig.VALIDATION_SPLIT))
+    train_idx, val_idx = order[:train_size], order[train_size:]
+    
+    positives = int((scores > POSITIVE_THRESHOLD).sum())
+    logger.info(f"Selected {len(scores)} training pairs ({positives} positive)")
+    
+    train_dataset = TaskPairDataset(features, (i_idx[train_idx], j_idx[train_idx], scores[train_idx]))
+    val_dataset = TaskPairDataset(features, (i_idx[val_idx], j_idx[val_idx], scores[val_idx]), shuffle=False)
+    return train_dataset, val_dataset
+
+def prepare_ml_training_data(tasks: List[Dict], feature_cache_path: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """Prepare data for ML model training"""
     embedder = TaskEmbedder(AdvancedTrainingConfig.MODEL_NAME)
+    pipeline = TaskFeaturePipeline(embedder.model, cache_size=max(50000, len(tasks)))
+    
+    # Only tasks that are new or changed since the last run get re-encoded
+    if feature_cache_path and os.path.exists(feature_cache_path):
+        pipeline.load_cache(feature_cache_path)
+    
+    # Same feature layout TaskModel builds at serving time
+    features = pipeline.transform(tasks)
+    
+    if feature_cache_path:
+        os.makedirs(os.path.dirname(feature_cache_path) or '.', exist_ok=True)
+        pipeline.save_cache(feature_cache_path)
     
-    features = []
-    priority_labels = []
-    duration_labels = []
-    dependency_counts = []
-    
-    priority_mapping = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
-    
-    for task in tasks:
-        # Extract features
-        embedding = embedder.embed_task(task)
-        
-        # Additional engineered features
-        title_length = len(task.get('title', ''))
-        desc_length = len(task.get('description', ''))
-        has_due_date = 1 if task.get('dueDate') else 0
-        
-        # Duration buckets
-        duration = task.get('estimatedDuration', 60)
-        duration_bucket = 0
-        if duration <= 60:
-            duration_bucket = 1
-        elif duration <= 180:
-            duration_bucket = 2
-        elif duration <= 360:
-            duration_bucket = 3
-        else:
-            duration_bucket = 4
-        
-        # Type encoding
-        type_encoding = [0] * 8
-        types = ['work', 'personal', 'learning', 'admin', 'meeting', 'creative', 'communication', 'other']
-        task_type = task.get('type', 'other')
-        if task_type in types:
-            type_encoding[types.index(task_type)] = 1
-        
-        # Combine all features
-        feature_vector = np.concatenate([
-            embedding,
-            [title_length, desc_length, has_due_date, duration_bucket],
-            type_encoding
-        ])
-        
-        features.append(feature_vector)
-        priority_labels.append(priority_mapping.get(task.get('priority', 'medium'), 2))
-        duration_labels.append(duration)
-        dependency_counts.append(len(task.get('dependencies', [])))
-    
-    return (
-        np.array(features),
-        np.array(priority_labels),
-        np.array(duration_labels),
-        np.array(dependency_counts)
+    priority_labels = np.array(
+        [PRIORITY_LEVELS.get(task.get('priority', 'medium'), 2) for task in tasks]
     )
+    duration_labels = np.array([task_duration(task) for task in tasks])
+    dependency_counts = np.array([len(task.get('dependencies', [])) for task in tasks])
+    
+    return features, priority_labels, duration_labels, dependency_counts
 
-def train_advanced_embedding_model(tasks: List[Dict]) -> SentenceTransformer:
-    """Train embedding model with advanced techniques"""
+def train_advanced_embedding_model(tasks: List[Dict], store: Optional[ArtifactStore] = None,
+                                   pairs_key: Optional[str] = None,
+                                   checkpoint_dir: Optional[str] = None) -> SentenceTransformer:
+    """Train embedding model with advanced techniques
+    
+    With `checkpoint_dir`, a checkpoint (weights plus optimizer and scheduler
+    state) is written after every epoch and an interrupted run resumes from
+    the last completed one.
+    """
     if torch.cuda.is_available():
         torch.cuda.empty_cache()
     
+    checkpoints = EpochCheckpoints(checkpoint_dir, AdvancedTrainingConfig.CHECKPOINTS_KEPT) if checkpoint_dir else None
+    completed_epochs, resume_path = checkpoints.latest() if checkpoints else (0, None)
+    training_state = checkpoints.training_state(resume_path) if resume_path else None
+    if resume_path and training_state is None:
+        logger.warning(f"Checkpoint {resume_path} has no optimizer state; fine-tuning from scratch")
+        completed_epochs, resume_path = 0, None
+    
     model = SentenceTransformer(
-        AdvancedTrainingConfig.MODEL_NAME,
+        resume_path or AdvancedTrainingConfig.MODEL_NAME,
         device=AdvancedTrainingConfig.DEVICE
     )
+    if resume_path:
+        logger.info(f"Resuming fine-tuning from {resume_path} after {completed_epochs} epochs")
     
-    # Create enhanced training examples
-    train_examples, _ = create_enhanced_training_examples(tasks)
-    
-    # Split into train/validation
-    train_size = int(len(train_examples) * (1 - AdvancedTrainingConfig.VALIDATION_SPLIT))
-    train_examples_split = train_examples[:train_size]
-    val_examples = train_examples[train_size:]
+    # Stream a budgeted sample of training pairs
+    train_examples_split, val_examples = create_training_pair_datasets(tasks, store, pairs_key)
     
     logger.info(f"Training on {len(train_examples_split)} examples, validating on {len(val_examples)}")
     
-    # Create data loaders
-    train_dataloader = DataLoader(
-        train_examples_split,
-        batch_size=AdvancedTrainingConfig.BATCH_SIZE,
-        shuffle=True,
-        num_workers=AdvancedTrainingConfig.NUM_WORKERS
-    )
-    
-    val_dataloader = DataLoader(
-        val_examples,
-        batch_size=AdvancedTrainingConfig.BATCH_SIZE,
-        shuffle=False,
-        num_workers=AdvancedTrainingConfig.NUM_WORKERS
-    )
-    
     # Use CosineSimilarityLoss for better semantic understanding
     train_loss = losses.CosineSimilarityLoss(model)
     
@@ -229,74 +231,213 @@ def train_advanced_embedding_model(tasks: List[Dict]) -> SentenceTransformer:
     logger.info(f"- Epochs: {AdvancedTrainingConfig.EPOCHS}")
     logger.info(f"- Learning rate: {AdvancedTrainingConfig.LEARNING_RATE}")
     
-    model.fit(
-        train_objectives=[(train_dataloader, train_loss)],
-        epochs=AdvancedTrainingConfig.EPOCHS,
-        warmup_steps=AdvancedTrainingConfig.WARMUP_STEPS,
-        optimizer_params={'lr': AdvancedTrainingConfig.LEARNING_RATE},
-        show_progress_bar=True,
-        use_amp=False,  # Stable training
-        evaluator=None,  # Can add custom evaluator here
-        evaluation_steps=500,
-        save_best_model=True
-    )
-    
+    fit_embedding_model(model, train_examples_split, train_loss, checkpoints, completed_epochs, training_state)
     return model
 
-def train_ml_models(features: np.ndarray, priority_labels: np.ndarray, 
-                   duration_labels: np.ndarray, dependency_counts: np.ndarray) -> Dict:
-    """Train ML models for priority and duration prediction"""
+def fit_embedding_model(model: SentenceTransformer, train_dataset: TaskPairDataset, train_loss,
+                        checkpoints: Optional[EpochCheckpoints] = None, completed_epochs: int = 0,
+                        training_state: Optional[Dict] = None):
+    """The update of one `model.fit(epochs=EPOCHS, warmup_steps=WARMUP_STEPS)` call, checkpointed per epoch
+    
+    sentence-transformers 2.2.2 builds a new AdamW and schedule on every `fit`
+    call and checkpoints weights only, so a run split into calls (or resumed)
+    would restart warmup and lose the linear decay. Same optimizer, parameter
+    groups, WarmupLinear schedule over all epochs and gradient clipping as
+    `fit`, with their state saved in every checkpoint.
+    """
+    device = torch.device(AdvancedTrainingConfig.DEVICE)
+    model.to(device)
+    train_loss.to(device)
     
-    # Split data
-    X_train, X_test, y_prio_train, y_prio_test = train_test_split(
-        features, priority_labels, test_size=0.2, random_state=42
+    # Pairs are shuffled by the dataset itself, reseeded per epoch
+    train_dataloader = DataLoader(
+        train_dataset,
+        batch_size=AdvancedTrainingConfig.BATCH_SIZE,
+        num_workers=AdvancedTrainingConfig.NUM_WORKERS,
+        collate_fn=model.smart_batching_collate
     )
-    _, _, y_dur_train, y_dur_test = train_test_split(
-        features, duration_labels, test_size=0.2, random_state=42
+    steps_per_epoch = len(train_dataloader)
+    
+    no_decay = ('bias', 'LayerNorm.bias', 'LayerNorm.weight')
+    parameters = list(train_loss.named_parameters())
+    optimizer = torch.optim.AdamW([
+        {'params': [p for n, p in parameters if not any(nd in n for nd in no_decay)],
+         'weight_decay': AdvancedTrainingConfig.WEIGHT_DECAY},
+        {'params': [p for n, p in parameters if any(nd in n for nd in no_decay)], 'weight_decay': 0.0}
+    ], lr=AdvancedTrainingConfig.LEARNING_RATE)
+    scheduler = get_linear_schedule_with_warmup(
+        optimizer, AdvancedTrainingConfig.WARMUP_STEPS, steps_per_epoch * AdvancedTrainingConfig.EPOCHS
     )
-    _, _, y_dep_train, y_dep_test = train_test_split(
-        features, dependency_counts, test_size=0.2, random_state=42
+    if training_state:
+        optimizer.load_state_dict(training_state['optimizer'])
+        scheduler.load_state_dict(training_state['scheduler'])
+    
+    for epoch in range(completed_epochs, AdvancedTrainingConfig.EPOCHS):
+        train_dataset.set_epoch(epoch)
+        train_loss.zero_grad()
+        train_loss.train()
+        epoch_loss = 0.0
+        for features, labels in train_dataloader:
+            labels = labels.to(device)
+            features = [batch_to_device(batch, device) for batch in features]
+            loss = train_loss(features, labels)
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(train_loss.parameters(), AdvancedTrainingConfig.MAX_GRAD_NORM)
+            optimizer.step()
+            optimizer.zero_grad()
+            scheduler.step()
+            epoch_loss += loss.item()
+        logger.info(f"Epoch {epoch + 1}/{AdvancedTrainingConfig.EPOCHS}: "
+                    f"mean loss {epoch_loss / max(1, steps_per_epoch):.4f}, lr {scheduler.get_last_lr()[0]:.2e}")
+        if checkpoints:
+            checkpoints.save(model, epoch + 1, {
+                'optimizer': optimizer.state_dict(),
+                'scheduler': scheduler.state_dict()
+            })
+            logger.info(f"Checkpointed epoch {epoch + 1}/{AdvancedTrainingConfig.EPOCHS}")
+
+def train_ml_models(features: np.ndarray, priority_labels: np.ndarray, 
+                   duration_labels: np.ndarray, dependency_counts: np.ndarray,
+                   store: Optional[ArtifactStore] = None) -> Dict:
+    """Train ML models for priority and duration prediction
+    
+    The three models are independent, so the ones without a cached fit are
+    trained in parallel worker processes.
+    """
+    
+    # Split data (one split shared by all three targets)
+    train_idx, test_idx = train_test_split(
+        np.arange(len(features)), test_size=0.2, random_state=42
     )
+    # The duration columns hold the duration model's own label
+    duration_features = TaskFeaturePipeline.without_duration(features)
+    
+    n_jobs = split_cores(AdvancedTrainingConfig.PARALLEL_FITS)
+    candidates = [
+        # Priority prediction model
+        ('priority', RandomForestClassifier(
+            n_estimators=200,
+            max_depth=10,
+            min_samples_split=5,
+            random_state=42,
+            n_jobs=n_jobs
+        ), features, priority_labels, accuracy_score),
+        # Duration prediction model
+        ('duration', GradientBoostingRegressor(
+            n_estimators=200,
+            max_depth=6,
+            learning_rate=0.1,
+            random_state=42
+        ), duration_features, duration_labels, mean_squared_error),
+        # Dependency count prediction model
+        ('dependency', RandomForestClassifier(
+            n_estimators=150,
+            max_depth=8,
+            min_samples_split=3,
+            random_state=42,
+            n_jobs=n_jobs
+        ), features, dependency_counts, accuracy_score),
+    ]
     
     models = {}
+    scores = {}
+    specs = []
+    keys = {}
+    for name, estimator, X, labels, metric in candidates:
+        params = {k: v for k, v in estimator.get_params().items() if k != 'n_jobs'}
+        keys[name] = content_hash(name, params, X, labels)
+        cached = store.load_object('models', keys[name]) if store else None
+        if cached is not None:
+            logger.info(f"Reusing cached {name} model")
+            models[name], scores[name] = cached
+            continue
+        specs.append((name, estimator, X[train_idx], labels[train_idx], X[test_idx], labels[test_idx], metric))
     
-    # Priority prediction model
-    logger.info("Training priority prediction model...")
-    priority_model = RandomForestClassifier(
-        n_estimators=200,
-        max_depth=10,
-        min_samples_split=5,
-        random_state=42
-    )
-    priority_model.fit(X_train, y_prio_train)
-    prio_pred = priority_model.predict(X_test)
-    prio_accuracy = accuracy_score(y_prio_test, prio_pred)
-    logger.info(f"Priority model accuracy: {prio_accuracy:.3f}")
-    models['priority'] = priority_model
-    
-    # Duration prediction model
-    logger.info("Training duration prediction model...")
-    duration_model = GradientBoostingRegressor(
-        n_estimators=200,
-        max_depth=6,
-        learning_rate=0.1,
-        random_state=42
+    if specs:
+        logger.info(f"Training {', '.join(spec[0] for spec in specs)} model(s) in parallel...")
+    for name, (estimator, score, seconds) in fit_models_parallel(
+        specs, max_workers=AdvancedTrainingConfig.PARALLEL_FITS
+    ).items():
+        logger.info(f"Trained {name} model in {seconds:.1f}s")
+        models[name], scores[name] = estimator, score
+        if store:
+            store.save_object('models', keys[name], (estimator, score))
+    
+    logger.info(f"Priority model accuracy: {scores['priority']:.3f}")
+    logger.info(f"Duration model MSE: {scores['duration']:.2f}")
+    logger.info(f"Dependency model accuracy: {scores['dependency']:.3f}")
+    
+    return models
+
+def fit_projection(features: np.ndarray) -> EmbeddingProjection:
+    """PCA or seeded random projection of the embedding part of the feature matrix"""
+    dim = features.shape[1] - len(TaskFeaturePipeline.STATIC_NAMES) - len(TaskFeaturePipeline.TEMPORAL_NAMES)
+    components = AdvancedTrainingConfig.PROJECTION_COMPONENTS
+    if AdvancedTrainingConfig.PROJECTION_KIND == 'random':
+        return EmbeddingProjection.random(dim, components)
+    projection = EmbeddingProjection.fit_pca(features[:, :dim], components)
+    logger.info(f"PCA projection {dim} -> {projection.dim} keeps {projection.explained_variance:.1%} of the variance")
+    return projection
+
+def run_training_pipeline(tasks: Optional[List[Dict]] = None) -> Dict:
+    """Run all training stages, reusing every stage whose inputs did not change"""
+    start = time.time()
+    tasks = tasks if tasks is not None else load_training_data()
+    store = ArtifactStore(AdvancedTrainingConfig.ARTIFACTS_PATH)
+    
+    dataset_key = content_hash(tasks)
+    pairs_key = content_hash(dataset_key, pair_config())
+    
+    # Stage 1-2: training pairs and embedding fine-tuning
+    finetune_key = content_hash(
+        pairs_key,
+        AdvancedTrainingConfig.MODEL_NAME,
+        AdvancedTrainingConfig.EPOCHS,
+        AdvancedTrainingConfig.BATCH_SIZE,
+        AdvancedTrainingConfig.LEARNING_RATE,
+        AdvancedTrainingConfig.WARMUP_STEPS,
+        AdvancedTrainingConfig.WEIGHT_DECAY,
+        AdvancedTrainingConfig.MAX_GRAD_NORM,
+        AdvancedTrainingConfig.VALIDATION_SPLIT
     )
-    duration_model.fit(X_train, y_dur_train)
-    dur_pred = duration_model.predict(X_test)
-    dur_mse = mean_squared_error(y_dur_test, dur_pred)
-    logger.info(f"Duration model MSE: {dur_mse:.2f}")
-    models['duration'] = duration_model
-    
-    # Dependency count prediction model
-    logger.info("Training dependency prediction model...")
-    dependency_model = RandomForestClassifier(
-        n_estimators=150,
-        max_depth=8,
-        min_samples_split=3,
-        random_state=42
+    finetune_dir = store.path('finetune', finetune_key)
+    final_model_path = os.path.join(finetune_dir, 'final')
+    if os.path.isdir(final_model_path):
+        logger.info(f"Reusing fine-tuned embedding model {finetune_key}")
+    else:
+        model = train_advanced_embedding_model(tasks, store, pairs_key, checkpoint_dir=finetune_dir)
+        model.save(final_model_path)
+    shutil.copytree(final_model_path, AdvancedTrainingConfig.MODEL_SAVE_PATH, dirs_exist_ok=True)
+    
+    # Stage 3: feature matrices; the due-date columns are relative to today
+    static_cache_path = store.path('features', content_hash(AdvancedTrainingConfig.MODEL_NAME), '-static.npz')
+    feature_key = content_hash(dataset_key, AdvancedTrainingConfig.MODEL_NAME, datetime.now().date())
+    arrays = store.cached_arrays('features', feature_key, lambda: dict(zip(
+        ('features', 'priority', 'duration', 'dependencies'),
+        prepare_ml_training_data(tasks, static_cache_path)
+    )))
+    
+    # Stage 4: sklearn models
+    models = train_ml_models(
+        arrays['features'], arrays['priority'], arrays['duration'], arrays['dependencies'], store
     )
-    dependency_model.fit(X_train, y_dep_train)
-    dep_pred = dependency_model.predict(X_test)
-    dep_accuracy = accuracy_score(y_dep_test, dep_pred)
-    logger.info
\ No newline at end of file
+    os.makedirs(os.path.dirname(AdvancedTrainingConfig.ML_MODELS_PATH), exist_ok=True)
+    with open(AdvancedTrainingConfig.ML_MODELS_PATH, 'wb') as f:
+        pickle.dump(models, f)
+    
+    # Compiling re-predicts a sample with sklearn and fails on any disagreement
+    check = arrays['features'][:AdvancedTrainingConfig.PARITY_CHECK_ROWS]
+    save_ensembles(AdvancedTrainingConfig.ML_COMPILED_PATH, {
+        name: compile_ensemble(
+            model, check=TaskFeaturePipeline.without_duration(check) if name == 'duration' else check
+        ) for name, model in models.items()
+    })
+    
+    # Stage 5: projection of the serving embeddings (the leading feature columns)
+    fit_projection(arrays['features']).save(AdvancedTrainingConfig.PROJECTION_PATH)
+    
+    logger.info(f"Training pipeline finished in {time.time() - start:.1f}s")
+    return models
+
+if __name__ == "__main__":
+    run_training_pipeline()